@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Lexer benchmark for LexVi
+Times tokenization of generated, identifier-heavy source code
+"""
+
+import argparse
+import time
+from lexer.core import Lexer, TokenType
+
+SAMPLE = '''def compute_total(items, discount_rate, tax_rate):
+    subtotal = 0
+    for item in items:
+        subtotal = subtotal + item.price * item.quantity
+    if discount_rate > 0:
+        subtotal = subtotal - subtotal * discount_rate
+    return subtotal + subtotal * tax_rate  # total with tax
+'''
+
+class KeywordRegexLexer(Lexer):
+    """Lexer that tries a keyword alternation before identifiers, for comparison"""
+    KEYWORDS = frozenset()
+    TOKEN_PATTERNS = [(TokenType.KEYWORD, r'\b(' + '|'.join(sorted(Lexer.KEYWORDS)) + r')\b')] \
+        + Lexer.TOKEN_PATTERNS
+
+def bench(lexer, code, repeat):
+    """Return the best wall time of tokenizing code, and the token count"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens = lexer.tokenize(code)
+        best = min(best, time.perf_counter() - start)
+    return best, len(tokens)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=2000, help='lines of generated code')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per lexer; best is kept')
+    args = parser.parse_args()
+
+    code = SAMPLE * (args.lines // SAMPLE.count('\n') + 1)
+    results = [(name, *bench(lexer, code, args.repeat))
+               for name, lexer in (('keyword regex', KeywordRegexLexer()),
+                                   ('keyword table', Lexer()))]
+    for name, seconds, count in results:
+        print(f'{name:>14}: {seconds * 1000:8.1f} ms  {count / seconds:12,.0f} tokens/s')
+    print(f'{"speed-up":>14}: {results[0][1] / results[1][1]:8.2f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for LexVi
+Measures GUI import time with -X importtime and checks it against a budget,
+and with --window also the time to build and first draw the main window
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Modules the GUI must not load before the window appears
+DEFERRED_MODULES = ('numpy', 'graphviz', 'lexer.cache', 'visualizer.dfa_visualizer', 'tomllib',
+                    'gui.file_io')
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def import_times(module: str = 'gui.main_window') -> Dict[str, Tuple[int, int]]:
+    """Import module in a fresh interpreter; return {name: (self us, cumulative us)}"""
+    # Bytecode caches must be written, or every run would include compiling the sources
+    env = {key: value for key, value in os.environ.items() if key != 'PYTHONDONTWRITEBYTECODE'}
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+# Run in a fresh interpreter: build the main window, draw it once and report the time
+_WINDOW_SCRIPT = """
+import time
+start = time.perf_counter()
+import tkinter as tk
+from gui.main_window import MainWindow
+root = tk.Tk()
+app = MainWindow(root)
+root.update()
+print((time.perf_counter() - start) * 1000, app.dfa_canvas is None)
+root.destroy()
+"""
+
+def window_time() -> Tuple[float, bool]:
+    """Return (ms to import, build and draw the main window, whether the DFA canvas
+    was left unbuilt); needs a display"""
+    result = subprocess.run([sys.executable, '-c', _WINDOW_SCRIPT], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    elapsed, deferred = result.stdout.split()
+    return float(elapsed), deferred == 'True'
+
+def slowest(times: Dict[str, Tuple[int, int]], count: int) -> List[Tuple[str, int]]:
+    """Return the count modules with the highest self time"""
+    return sorted(((name, own) for name, (own, _) in times.items()),
+                  key=lambda item: item[1], reverse=True)[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--module', default='gui.main_window', help='module to import')
+    parser.add_argument('--repeat', type=int, default=5, help='runs; best is kept')
+    parser.add_argument('--budget-ms', type=float, default=60.0,
+                        help='fail when the best cumulative import time exceeds this')
+    parser.add_argument('--top', type=int, default=10, help='slowest modules to list')
+    parser.add_argument('--window', action='store_true',
+                        help='also time building the main window (needs a display)')
+    args = parser.parse_args()
+
+    # The first run also writes bytecode caches; it is not counted
+    import_times(args.module)
+    runs = [import_times(args.module) for _ in range(args.repeat)]
+    best = min(runs, key=lambda times: times[args.module][1])
+    total_ms = best[args.module][1] / 1000
+    for name, own in slowest(best, args.top):
+        print(f'{name:>32}: {own / 1000:8.2f} ms')
+    print(f'{args.module:>32}: {total_ms:8.2f} ms cumulative (budget {args.budget_ms:.0f} ms)')
+
+    failures = [f'{name} is imported at startup' for name in DEFERRED_MODULES if name in best]
+    if args.window:
+        elapsed, deferred = min(window_time() for _ in range(args.repeat))
+        print(f"{'main window':>32}: {elapsed:8.2f} ms to first draw")
+        if not deferred:
+            failures.append('the DFA canvas is built at startup')
+    if total_ms > args.budget_ms:
+        failures.append(f'import took {total_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget')
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
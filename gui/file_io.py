@@ -0,0 +1,232 @@
+"""
+File I/O module for LexVi
+Reads and writes editor files in chunks, and pages through very large files
+
+ChunkedReader decodes a file on a background thread and hands the text to
+the GUI thread in bounded batches, so the event loop keeps running while a
+large file loads. Saving goes through write_chunks, which streams the text
+into a temporary file and then replaces the target. Files too large to load
+into a text widget can be opened as a PagedFile instead: a read-only view
+over an mmap that decodes one page at a time. FileWatcher notices when
+open files are rewritten by other programs.
+"""
+
+import codecs
+import mmap
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Bytes read from disk per chunk
+CHUNK_SIZE = 1 << 20
+
+# Files larger than this are offered as a read-only paged view
+LARGE_FILE_SIZE = 32 << 20
+
+# Bytes shown per page of a paged view, before rounding to a line end
+PAGE_SIZE = 1 << 20
+
+# Seconds a changed file must keep the same size and mtime before it is reported
+SETTLE_TIME = 0.3
+
+class ChunkedReader:
+    """Decodes a file on a worker thread; poll() collects what has arrived so far"""
+
+    def __init__(self, path: str, encoding: str = 'utf-8', chunk_size: int = CHUNK_SIZE):
+        self.path = path
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+        self.size = os.path.getsize(path)
+        self.bytes_read = 0
+        self.error: Optional[BaseException] = None
+        # Decoded chunks; None marks the end of the file (or a failed read)
+        self._chunks: 'queue.Queue[Optional[str]]' = queue.Queue()
+        self._finished = False
+        self._thread = threading.Thread(target=self._read, name='lexvi-reader', daemon=True)
+
+    def start(self) -> 'ChunkedReader':
+        self._thread.start()
+        return self
+
+    def _read(self):
+        # Strict, so a file in another encoding fails to open instead of being
+        # loaded with replacement characters and corrupted by the next save
+        decoder = codecs.getincrementaldecoder(self.encoding)('strict')
+        try:
+            with open(self.path, 'rb') as f:
+                while True:
+                    data = f.read(self.chunk_size)
+                    if not data:
+                        break
+                    self.bytes_read += len(data)
+                    text = decoder.decode(data)
+                    if text:
+                        self._chunks.put(text)
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                self._chunks.put(tail)
+        except (OSError, UnicodeDecodeError) as e:
+            self.error = e
+        finally:
+            self._chunks.put(None)
+
+    @property
+    def progress(self) -> float:
+        """Fraction of the file read from disk, between 0 and 1"""
+        return self.bytes_read / self.size if self.size else 1.0
+
+    @property
+    def done(self) -> bool:
+        """True once every chunk has been returned by poll()"""
+        return self._finished
+
+    def poll(self, max_chars: int = CHUNK_SIZE) -> str:
+        """Return decoded text that is ready, at most about max_chars of it, without blocking"""
+        parts: List[str] = []
+        size = 0
+        while size < max_chars and not self._finished:
+            try:
+                chunk = self._chunks.get_nowait()
+            except queue.Empty:
+                break
+            if chunk is None:
+                self._finished = True
+                break
+            parts.append(chunk)
+            size += len(chunk)
+        return ''.join(parts)
+
+    def read_all(self) -> str:
+        """Wait for the worker and return the whole text"""
+        self._thread.join()
+        parts = []
+        while not self._finished:
+            parts.append(self.poll())
+        if self.error is not None:
+            raise self.error
+        return ''.join(parts)
+
+def text_chunks(widget, lines_per_chunk: int = 5000) -> Iterator[str]:
+    """Yield the contents of a Tk text widget a block of lines at a time"""
+    last_line = int(widget.index('end-1c').split('.')[0])
+    for first in range(1, last_line + 1, lines_per_chunk):
+        stop = first + lines_per_chunk
+        yield widget.get(f'{first}.0', 'end-1c' if stop > last_line else f'{stop}.0')
+
+def _create_temp(directory: str) -> Tuple[int, str]:
+    """Create a new temporary file in directory with the default mode (0666 less the umask)"""
+    while True:
+        tmp_path = os.path.join(directory, f'.{uuid.uuid4().hex[:16]}.tmp')
+        try:
+            return os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), tmp_path
+        except FileExistsError:
+            continue
+
+def write_chunks(path: str, chunks: Iterable[str], encoding: str = 'utf-8'):
+    """Write text chunks to a temporary file next to path, then replace path with it
+
+    A symlinked path is resolved so the link keeps pointing at the saved file,
+    and the file keeps its permission bits (new files get the default mode).
+    """
+    path = os.path.realpath(path)
+    fd, tmp_path = _create_temp(os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding, newline='') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+class PagedFile:
+    """Read-only view of a large file, decoded one page at a time from an mmap
+
+    Page boundaries are moved forward to the next newline, so pages hold whole
+    lines and never split a UTF-8 sequence.
+    """
+
+    def __init__(self, path: str, encoding: str = 'utf-8', page_size: int = PAGE_SIZE):
+        self.path = path
+        self.encoding = encoding
+        self.page_size = page_size
+        with open(path, 'rb') as f:
+            self.size = os.fstat(f.fileno()).st_size
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+
+    def __len__(self) -> int:
+        return max(1, -(-self.size // self.page_size))
+
+    def _boundary(self, index: int) -> int:
+        """Byte offset where page index starts"""
+        if index <= 0:
+            return 0
+        start = index * self.page_size
+        if start >= self.size:
+            return self.size
+        newline = self._map.find(b'\n', start - 1)
+        return self.size if newline < 0 else newline + 1
+
+    def page(self, index: int) -> str:
+        """Return the text of page index (0-based)"""
+        start, end = self._boundary(index), self._boundary(index + 1)
+        return self._map[start:end].decode(self.encoding, 'replace')
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+
+class FileWatcher:
+    """Polls files with os.stat and reports each burst of writes once it has settled
+
+    A file counts as changed when its mtime, size or inode (for editors and
+    formatters that replace the file) differs from the version last
+    reported. It is reported after it stopped changing for settle seconds,
+    so a generator writing a large file in many steps causes one reload.
+    """
+
+    def __init__(self, settle: float = SETTLE_TIME):
+        self.settle = settle
+        # path -> [reported signature, last seen signature, time it was first seen]
+        self._files: Dict[str, list] = {}
+
+    @staticmethod
+    def signature(path: str) -> Optional[Tuple[int, int, int]]:
+        """Return (mtime_ns, size, inode) of path, or None if it cannot be read"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def watch(self, path: str):
+        """Watch path, taking its current state as seen; also call after writing it yourself"""
+        current = self.signature(path)
+        self._files[path] = [current, current, 0.0]
+
+    def unwatch(self, path: str):
+        self._files.pop(path, None)
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def poll(self, now: Optional[float] = None) -> List[str]:
+        """Return the watched paths whose changes have settled since the last poll"""
+        if now is None:
+            now = time.monotonic()
+        changed = []
+        for path, entry in self._files.items():
+            reported, seen, since = entry
+            current = self.signature(path)
+            if current != seen:
+                entry[1], entry[2] = current, now
+            elif current is not None and current != reported and now - since >= self.settle:
+                entry[0] = current
+                changed.append(path)
+        return changed
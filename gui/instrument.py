@@ -0,0 +1,176 @@
+"""
+Instrumentation module for LexVi
+Records timing spans and counters for the GUI and exports them as a Chrome trace
+
+Spans time one operation (lexing, highlighting, filling the token table,
+drawing the canvas, one animation frame) with perf_counter_ns; counters
+sample a value over time (traced memory, canvas items). Both go into
+bounded deques, so a long session keeps only its most recent events.
+Recording costs two clock reads and an append, cheap enough to stay on.
+
+Memory tracing uses tracemalloc, which slows every allocation down while
+it runs, so it is only on between start_memory() and stop_memory().
+
+export() writes the Trace Event Format read by chrome://tracing and
+Perfetto: complete events ("ph": "X") for spans and counter events
+("ph": "C") for samples, with microsecond timestamps.
+"""
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Spans and counter samples kept; older ones are dropped
+MAX_EVENTS = 20000
+
+# Allocation sites listed by memory_top()
+MEMORY_TOP = 10
+
+class Span:
+    """One timed operation"""
+    __slots__ = ('name', 'category', 'start_ns', 'duration_ns', 'thread', 'args')
+
+    def __init__(self, name: str, category: str, start_ns: int, duration_ns: int,
+                 thread: int, args: Optional[dict] = None):
+        self.name = name
+        self.category = category
+        self.start_ns = start_ns
+        self.duration_ns = duration_ns
+        self.thread = thread
+        self.args = args
+
+class Instrumentation:
+    """Bounded recorder of spans and counter samples from any thread"""
+
+    def __init__(self, max_events: int = MAX_EVENTS):
+        self.spans: deque = deque(maxlen=max_events)
+        # (name, time in ns, value)
+        self.samples: deque = deque(maxlen=max_events)
+        self.enabled = True
+        # Zero point of exported timestamps
+        self.origin_ns = time.perf_counter_ns()
+        self._thread_names: Dict[int, str] = {}
+
+    @contextmanager
+    def span(self, name: str, category: str = 'gui', **args) -> Iterator[dict]:
+        """Time the body of a with block; the yielded dict can take more args"""
+        if not self.enabled:
+            yield args
+            return
+        start = time.perf_counter_ns()
+        try:
+            yield args
+        finally:
+            self.add_span(name, start, time.perf_counter_ns() - start, category, args)
+
+    def add_span(self, name: str, start_ns: int, duration_ns: int, category: str = 'gui',
+                 args: Optional[dict] = None):
+        """Record a span measured elsewhere"""
+        if not self.enabled:
+            return
+        thread = threading.current_thread()
+        self._thread_names.setdefault(thread.ident, thread.name)
+        self.spans.append(Span(name, category, start_ns, duration_ns, thread.ident, args or None))
+
+    def count(self, name: str, value: float):
+        """Record a sample of a counter"""
+        if self.enabled:
+            self.samples.append((name, time.perf_counter_ns(), value))
+
+    def last(self, name: str) -> Optional[Span]:
+        """Return the most recent span with this name"""
+        for span in reversed(self.spans):
+            if span.name == name:
+                return span
+        return None
+
+    def summary(self) -> List[Tuple[str, int, float, float, float]]:
+        """Return (name, count, last ms, mean ms, max ms) per span name, by total time"""
+        totals: Dict[str, List[int]] = {}
+        for span in self.spans:
+            entry = totals.get(span.name)
+            if entry is None:
+                totals[span.name] = [1, span.duration_ns, span.duration_ns, span.duration_ns]
+            else:
+                entry[0] += 1
+                entry[1] += span.duration_ns
+                entry[2] = span.duration_ns
+                entry[3] = max(entry[3], span.duration_ns)
+        rows = [(name, count, last / 1e6, total / count / 1e6, longest / 1e6)
+                for name, (count, total, last, longest) in totals.items()]
+        rows.sort(key=lambda row: -row[1] * row[3])
+        return rows
+
+    def latest_samples(self) -> Dict[str, float]:
+        """Return the most recent value of each counter"""
+        values = {}
+        for name, _, value in self.samples:
+            values[name] = value
+        return values
+
+    def start_memory(self, frames: int = 1):
+        """Start tracing Python allocations"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop_memory(self):
+        """Stop tracing allocations and free the traces"""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @property
+    def tracing_memory(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def sample_memory(self):
+        """Record traced memory now and its peak as counters, in MB"""
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            self.count('traced MB', current / 2 ** 20)
+            self.count('peak MB', peak / 2 ** 20)
+
+    def memory_top(self, limit: int = MEMORY_TOP) -> List[Tuple[str, float, int]]:
+        """Return (file:line, KB, blocks) for the largest allocation sites in a snapshot"""
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)])
+        rows = []
+        for stat in snapshot.statistics('lineno')[:limit]:
+            frame = stat.traceback[0]
+            rows.append((f"{os.path.basename(frame.filename)}:{frame.lineno}",
+                         stat.size / 1024, stat.count))
+        return rows
+
+    def clear(self):
+        """Drop every recorded span and sample"""
+        self.spans.clear()
+        self.samples.clear()
+
+    def chrome_trace(self) -> dict:
+        """Return the recorded events in Chrome trace-event form"""
+        pid = os.getpid()
+        origin = self.origin_ns
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                   'args': {'name': name}} for tid, name in self._thread_names.items()]
+        for span in list(self.spans):
+            event = {'name': span.name, 'cat': span.category, 'ph': 'X', 'pid': pid,
+                     'tid': span.thread, 'ts': (span.start_ns - origin) / 1000,
+                     'dur': span.duration_ns / 1000}
+            if span.args:
+                event['args'] = span.args
+            events.append(event)
+        for name, at, value in list(self.samples):
+            events.append({'name': name, 'ph': 'C', 'pid': pid, 'tid': 0,
+                           'ts': (at - origin) / 1000, 'args': {'value': value}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export(self, path: str):
+        """Write the recorded events to path as Chrome trace JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f, default=str)
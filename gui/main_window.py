@@ -1,59 +1,142 @@
 """
 Main window GUI module for LexVi
 Contains the main application window and UI components
+
+Startup only builds what the first frame shows. The token cache, the DFA
+visualizer (and NumPy behind it) and the Errors, Profile and Statistics
+tabs are created the first time they are used.
 """
 
+import csv
+import os
+import time
 import tkinter as tk
+from contextlib import nullcontext
 from tkinter import ttk, filedialog, messagebox
-import re
-from lexer.core import Lexer, Token, TokenType
-from visualizer.dfa_visualizer import DFAVisualizer
+from gui.instrument import Instrumentation
+from gui.themes import THEMES, apply_theme
+from lexer.core import (PYTHON, TRIVIA_TYPES, Lexer, RecoveryMode, Token, TokenType,
+                        changed_span)
+from lexer.language import available_languages, language_for_path, load_language
+from lexer.pipeline import Pipeline
+from lexer.positions import LineIndex
+from lexer.profile import LexerStats
+from lexer.search import SearchIndex, diff_edit
+from lexer.service import Document, LexingService
+from lexer.trace import TransitionTrace
 
 class SyntaxHighlighter:
     """Custom syntax highlighter for the code editor"""
     
-    def __init__(self, text_widget):
+    # Highlight tag for each token type; identifiers are split into names and keywords
+    TYPE_TAGS = {
+        TokenType.IDENTIFIER: 'hl_identifier',
+        TokenType.KEYWORD: 'hl_keyword',
+        TokenType.INTEGER: 'hl_number',
+        TokenType.FLOAT: 'hl_number',
+        TokenType.OPERATOR: 'hl_operator',
+        TokenType.STRING: 'hl_string',
+        TokenType.COMMENT: 'hl_comment',
+    }
+    
+    def __init__(self, text_widget, lexer=None, instrumentation=None, pipeline=None):
         self.text_widget = text_widget
-        self.highlighting_rules = []
-        
-        # Define highlighting rules with different colors
-        self.keyword_format = {"foreground": "#569CD6"}  # Blue
-        self.string_format = {"foreground": "#CE9178"}   # Orange
-        self.comment_format = {"foreground": "#6A9955"}  # Green
-        self.number_format = {"foreground": "#B5CEA8"}   # Light Green
-        self.identifier_format = {"foreground": "#9CDCFE"}  # Light Blue
-        self.operator_format = {"foreground": "#D4D4D4"}   # White
-        
-        # Keywords
-        keywords = ['if', 'else', 'while', 'for', 'return', 'break', 'continue',
-                   'def', 'class', 'import', 'from', 'as', 'try', 'except',
-                   'finally', 'raise', 'with', 'yield', 'async', 'await']
-        
-        for word in keywords:
-            self.highlighting_rules.append((r'\b' + word + r'\b', self.keyword_format))
-        
-        # Other patterns
-        self.highlighting_rules.append((r'"[^"]*"|\'[^\']*\'', self.string_format))
-        self.highlighting_rules.append((r'#.*', self.comment_format))
-        self.highlighting_rules.append((r'\b\d+\b', self.number_format))
-        self.highlighting_rules.append((r'[a-zA-Z_][a-zA-Z0-9_]*', self.identifier_format))
-        self.highlighting_rules.append((r'[+\-*/%=<>!&|^~]+', self.operator_format))
+        # Span recorder timing each highlight pass, if any
+        self.instrumentation = instrumentation
+        # Token pipeline whose stages, if it has any, classify the highlighted tokens
+        self.pipeline = pipeline
+        # Same scanner and keyword table the lexer classifies tokens with
+        self.set_lexer(lexer or Lexer())
+        
+        # Tk raises tags configured later above earlier ones; colors come from gui.themes
+        self.tags = ['hl_identifier', 'hl_keyword', 'hl_number', 'hl_operator',
+                     'hl_string', 'hl_comment']
+        for tag in self.tags:
+            self.text_widget.tag_config(tag)
+
+    def set_lexer(self, lexer):
+        """Highlight with another lexer's language"""
+        self.lexer = lexer
+        self.keywords = lexer.KEYWORDS
 
     def highlight(self):
         """Apply syntax highlighting to the text"""
-        self.text_widget.tag_remove("highlight", "1.0", "end")
-        
-        for pattern, format in self.highlighting_rules:
-            start = "1.0"
-            while True:
-                start = self.text_widget.search(pattern, start, "end", regexp=True)
-                if not start:
-                    break
-                end = f"{start}+{len(self.text_widget.get(start, f'{start} lineend'))}c"
-                self.text_widget.tag_add("highlight", start, end)
-                for tag, value in format.items():
-                    self.text_widget.tag_config("highlight", **{tag: value})
-                start = end
+        self.highlight_range(0)
+
+    def highlight_range(self, start, end=None):
+        """Re-tag the text from offset start to end (the end of the text if None)
+
+        The range is widened to whole lines and to the last token crossing its
+        end; tags after that are kept, so the text there must lex as before.
+        """
+        if self.instrumentation is None:
+            span = nullcontext()
+        else:
+            span = self.instrumentation.span('highlight')
+        with span:
+            self._apply_tags(start, end)
+
+    def _apply_tags(self, start=0, end=None):
+        """Tag every token from the line holding offset start to past end with its highlight tag"""
+        widget = self.text_widget
+        base = widget.index(f'1.0+{start}c linestart')
+        text = widget.get(base, 'end-1c')
+        line_start = start - int(widget.index(f'1.0+{start}c').split('.')[1])
+        if end is None:
+            stop = len(text)
+        else:
+            stop = text.find('\n', max(end - line_start, 0))
+            stop = len(text) if stop < 0 else stop
+        
+        # One pass of the lexer's master pattern tags every token
+        scanner = self.lexer.scanner()
+        match_at = scanner.regex.match
+        group_types = scanner.group_types
+        keywords = self.keywords
+        fold = self.lexer.FOLD_KEYWORDS
+        identifier = TokenType.IDENTIFIER
+        type_tags = self.TYPE_TAGS
+        spans = {tag: [] for tag in self.tags}
+        # Tokens for the pipeline to classify, when it has stages
+        piped = [] if self.pipeline is not None and self.pipeline.stages else None
+        pos = 0
+        while pos < stop:
+            match = match_at(text, pos)
+            if match is None:
+                pos += 1
+                continue
+            token_type = group_types[match.lastindex]
+            if token_type is identifier and (match.group().lower() if fold else match.group()) in keywords:
+                token_type = TokenType.KEYWORD
+            if piped is not None:
+                piped.append(Token(token_type, match.group(), 0, 0, None, pos))
+            else:
+                tag = type_tags.get(token_type)
+                if tag is not None:
+                    spans[tag] += (f'{base}+{pos}c', f'{base}+{match.end()}c')
+            pos = match.end()
+        if piped:
+            for token in self.pipeline(piped):
+                tag = type_tags.get(token.type)
+                if tag is not None:
+                    spans[tag] += (f'{base}+{token.offset}c',
+                                   f'{base}+{token.offset + len(token.value)}c')
+        
+        for tag in self.tags:
+            widget.tag_remove(tag, base, f'{base}+{pos}c')
+        # One tag_add per tag with every range, instead of one call per match
+        for tag, indices in spans.items():
+            if indices:
+                widget.tag_add(tag, *indices)
+
+class EditorTab:
+    """One editor tab: its text widget, highlighter and lexing document"""
+
+    def __init__(self, frame, editor, document, instrumentation=None, pipeline=None):
+        self.frame = frame
+        self.editor = editor
+        self.document = document
+        self.highlighter = SyntaxHighlighter(editor, document.lexer, instrumentation, pipeline)
 
 class MainWindow:
     """Main application window"""
@@ -61,94 +144,86 @@ class MainWindow:
     def __init__(self, root):
         """Initialize the main window"""
         self.root = root
-        self.lexer = Lexer()
+        # Timing spans and counters, shown in the performance overlay and exported as a trace
+        self.instrumentation = Instrumentation()
+        # Editor tabs by notebook tab id; all of them are lexed by one background service
+        self.tabs = {}
+        self.active_tab = None
+        self.lexing_service = LexingService()
+        self._lexing_poll = None
+        self._token_cache = None
+        self._dfa_visualizer = None
+        # DFA canvas, created with the visualizer
+        self.dfa_canvas = None
+        # Editor text the current tokens were lexed from, for incremental relexing
+        self.lexed_code = None
+        # Find matches as (start, end) offsets, and the line index used to place them
+        self.search_matches = []
+        self.search_lines = None
+        self._search_refresh = None
+        # Background reader of a file being loaded, and the read-only paged file on show
+        self._loader = None
+        self.loading_tab = None
+        self.paged_file = None
+        self.paged_tab = None
+        self.page_index = 0
+        # Watcher of the files open in tabs, and readers of files being reloaded by tab
+        self._file_watcher = None
+        self._file_poll = None
+        self._reloads = {}
+        # Token diff being computed on a worker thread, and the table showing the last one
+        self._diff_job = None
+        self.diff_tree = None
+        # Token statistics being collected on a worker thread
+        self._stats_job = None
+        self.load_progress = tk.DoubleVar(value=0.0)
+        self.animation_speed = 5.0
         self.current_token_index = 0
         self.tokens = []
+        # Signature of the token patterns the DFA canvas currently shows
+        self._dfa_signature = None
+        # Character-level scanner trace, allocated the first time trace mode is used
+        self.trace = None
+        self.trace_var = tk.BooleanVar(value=False)
+        # Pattern profile, accumulated over runs while profiling is on
+        self.profile_stats = LexerStats()
+        self.profile_var = tk.BooleanVar(value=False)
         self.status_var = tk.StringVar(value="Ready")
         self.theme_var = tk.BooleanVar(value=True)  # True for dark theme
+        self.theme = 'dark'
+        self.language_var = tk.StringVar(value=PYTHON.name)
+        self.recovery_var = tk.StringVar(value=RecoveryMode.SKIP_CHAR.value)
+        # Keep comment tokens in the token stream instead of letting the scanner drop them
+        self.keep_comments_var = tk.BooleanVar(value=False)
+        # Stages tokens pass through on their way to the token table, the
+        # highlighters and exports; add stages to shape all three
+        self.token_pipeline = Pipeline()
+        # Performance overlay frame, built when first shown, and its state
+        self.perf_overlay = None
+        self.perf_overlay_var = tk.BooleanVar(value=False)
+        self.perf_memory_var = tk.BooleanVar(value=False)
+        self._perf_refresh = None
+        # Largest allocation sites from the last memory snapshot, taken on request
+        self._perf_memory_top = []
+        # First row of the error list shown in the Errors tab
+        self.error_page_start = 0
+        self.error_summary = tk.StringVar(value="No errors")
+        self.profile_summary = tk.StringVar(value="Turn on Profile and run the lexer")
+        self.stats_summary = tk.StringVar(value="Collect statistics for the document or a folder")
+        self.stats_output = None
+        # Builders for notebook tabs whose contents are created on first display
+        self._tab_builders = {}
         self.setup_styles()
         self.setup_ui()
         self.setup_menu()
         self.setup_toolbar()
         self.setup_line_numbers()
+        self.new_document()
+        self.apply_theme('dark')
 
     def setup_styles(self):
-        """Setup custom styles for widgets"""
-        style = ttk.Style()
-        
-        # Modern dark theme
-        style.configure('Dark.TFrame', background='#181A1B')
-        style.configure('Dark.TLabel', background='#181A1B', foreground='#F3F3F3', font=('Segoe UI', 11))
-        style.configure('Dark.TButton', 
-                       background='#23272A',
-                       foreground='#4FC3F7',  # Blue accent
-                       borderwidth=0,
-                       padding=(14, 8),
-                       font=('Segoe UI Semibold', 11))
-        style.map('Dark.TButton',
-                 background=[('active', '#263238'), ('pressed', '#263238')],
-                 foreground=[('active', '#80DEEA')])
-        style.configure('Dark.TCheckbutton',
-                       background='#181A1B',
-                       foreground='#4FC3F7',
-                       font=('Segoe UI', 11))
-        style.configure('Dark.Treeview',
-                       background='#23272A',
-                       foreground='#F3F3F3',
-                       fieldbackground='#23272A',
-                       rowheight=28,
-                       font=('Segoe UI', 10))
-        style.configure('Dark.Treeview.Heading',
-                       background='#263238',
-                       foreground='#4FC3F7',
-                       font=('Segoe UI Semibold', 11),
-                       padding=7)
-        style.configure('Dark.TLabelframe',
-                       background='#181A1B',
-                       foreground='#4FC3F7',
-                       padding=14,
-                       borderwidth=0)
-        style.configure('Dark.TLabelframe.Label',
-                       background='#181A1B',
-                       foreground='#4FC3F7',
-                       font=('Segoe UI Semibold', 12))
-        style.configure('Dark.TNotebook',
-                       background='#181A1B',
-                       tabmargins=[2, 8, 2, 0],
-                       borderwidth=0)
-        style.configure('Dark.TNotebook.Tab',
-                       background='#23272A',
-                       foreground='#F3F3F3',
-                       padding=[16, 8],
-                       font=('Segoe UI', 11),
-                       borderwidth=0)
-        style.map('Dark.TNotebook.Tab',
-                 background=[('selected', '#263238')],
-                 foreground=[('selected', '#4FC3F7')])
-        style.configure('Dark.TSeparator', background='#23272A')
-        
-        # Scale styles
-        style.configure('Dark.Horizontal.TScale',
-                       background='#23272A',
-                       troughcolor='#1E1E1E',
-                       sliderthickness=20,
-                       sliderlength=20)
-        style.configure('Light.Horizontal.TScale',
-                       background='#FFFFFF',
-                       troughcolor='#E3F2FD',
-                       sliderthickness=20,
-                       sliderlength=20)
-        
-        # Toolbar button style
-        style.configure('Toolbar.TButton',
-                       background='#23272A',
-                       foreground='#F3F3F3',
-                       borderwidth=0,
-                       padding=(8, 4),
-                       font=('Segoe UI', 10))
-        style.map('Toolbar.TButton',
-                 background=[('active', '#263238'), ('pressed', '#263238')],
-                 foreground=[('active', '#4FC3F7')])
+        """Setup the styles that do not change with the theme; see gui.themes for the rest"""
+        style = self.style = ttk.Style()
         
         # Menu styles
         style.configure('Dark.TMenubutton',
@@ -177,61 +252,28 @@ class MainWindow:
                        font=('Segoe UI', 10))
         style.map('Dialog.TButton',
                  background=[('active', '#45a049'), ('pressed', '#45a049')])
-        
-        # Modern light theme
-        style.configure('Light.TFrame', background='#F7F9FA')
-        style.configure('Light.TLabel', background='#F7F9FA', foreground='#23272A', font=('Segoe UI', 11))
-        style.configure('Light.TButton',
-                       background='#FFFFFF',
-                       foreground='#1976D2',
-                       borderwidth=0,
-                       padding=(14, 8),
-                       font=('Segoe UI Semibold', 11))
-        style.map('Light.TButton',
-                 background=[('active', '#E3F2FD'), ('pressed', '#E3F2FD')],
-                 foreground=[('active', '#1565C0')])
-        style.configure('Light.TCheckbutton',
-                       background='#F7F9FA',
-                       foreground='#1976D2',
-                       font=('Segoe UI', 11))
-        style.configure('Light.Treeview',
-                       background='#FFFFFF',
-                       foreground='#23272A',
-                       fieldbackground='#FFFFFF',
-                       rowheight=28,
-                       font=('Segoe UI', 10))
-        style.configure('Light.Treeview.Heading',
-                       background='#E3F2FD',
-                       foreground='#1976D2',
-                       font=('Segoe UI Semibold', 11),
-                       padding=7)
-        style.configure('Light.TLabelframe',
-                       background='#F7F9FA',
-                       foreground='#1976D2',
-                       padding=14,
-                       borderwidth=0)
-        style.configure('Light.TLabelframe.Label',
-                       background='#F7F9FA',
-                       foreground='#1976D2',
-                       font=('Segoe UI Semibold', 12))
-        style.configure('Light.TNotebook',
-                       background='#F7F9FA',
-                       tabmargins=[2, 8, 2, 0],
-                       borderwidth=0)
-        style.configure('Light.TNotebook.Tab',
-                       background='#FFFFFF',
-                       foreground='#23272A',
-                       padding=[16, 8],
-                       font=('Segoe UI', 11),
-                       borderwidth=0)
-        style.map('Light.TNotebook.Tab',
-                 background=[('selected', '#E3F2FD')],
-                 foreground=[('selected', '#1976D2')])
-        style.configure('Light.TSeparator', background='#E3F2FD')
 
         # Add style for Accent.TFrame for a visible background (debug: use red)
         style.configure('Accent.TFrame', background='#8B0000', borderwidth=2, relief='solid')
 
+    def apply_theme(self, name):
+        """Point the shared style names, Tk widget colors and highlight tags at a palette"""
+        widgets = {
+            'root': [self.root],
+            'editor': [tab.editor for tab in self.tabs.values()],
+            'output': [self.token_output, self.exec_output]
+                      + ([self.stats_output] if self.stats_output is not None else [])
+                      + ([self.perf_body] if self.perf_overlay is not None else []),
+            'gutter': [self.line_numbers],
+            'canvas': [self.dfa_canvas] if self.dfa_canvas is not None else [],
+        }
+        tagged = [tab.editor for tab in self.tabs.values()] + [self.token_output]
+        if self.diff_tree is not None and self.diff_tree.winfo_exists():
+            tagged.append(self.diff_tree)
+        apply_theme(THEMES[name], widgets, tagged, self.style)
+        self.theme = name
+        self.theme_var.set(name == 'dark')
+
     def setup_ui(self):
         """Setup the main window UI components"""
         # Set window minimum size
@@ -239,15 +281,15 @@ class MainWindow:
         self.root.title("LexVi - Interactive Lexical Analyzer")
         
         # --- Title/Logo Bar ---
-        title_bar = ttk.Frame(self.root, style='Dark.TFrame')
+        title_bar = ttk.Frame(self.root, style='App.TFrame')
         title_bar.pack(fill="x", padx=0, pady=(0, 8))
         # If you have a logo image, you can add it here with a Label
-        title_label = ttk.Label(title_bar, text="🧩 LexVi", style='Dark.TLabel', font=('Segoe UI Semibold', 18))
+        title_label = ttk.Label(title_bar, text="🧩 LexVi", style='App.TLabel', font=('Segoe UI Semibold', 18))
         title_label.pack(side="left", padx=(18, 8), pady=8)
-        subtitle_label = ttk.Label(title_bar, text="Interactive Lexical Analyzer", style='Dark.TLabel', font=('Segoe UI', 13))
+        subtitle_label = ttk.Label(title_bar, text="Interactive Lexical Analyzer", style='App.TLabel', font=('Segoe UI', 13))
         subtitle_label.pack(side="left", padx=0, pady=8)
         # Separator below title
-        ttk.Separator(self.root, orient='horizontal', style='Dark.TSeparator').pack(fill='x', padx=0, pady=(0, 10))
+        ttk.Separator(self.root, orient='horizontal', style='App.TSeparator').pack(fill='x', padx=0, pady=(0, 10))
 
         # Control Panel (must be packed before main_paned)
         control_frame = ttk.Frame(self.root, style='Accent.TFrame', height=70, borderwidth=2, relief='solid')
@@ -323,75 +365,103 @@ class MainWindow:
             to=10,
             orient='horizontal',
             command=self.update_speed,
-            style='Dark.Horizontal.TScale'
+            style='App.Horizontal.TScale'
         )
         self.speed_scale.set(5)
         self.speed_scale.pack(side='left', fill='x', expand=True, pady=12)
+        
+        ttk.Checkbutton(
+            controls,
+            text="Char Trace",
+            variable=self.trace_var,
+            style='App.TCheckbutton'
+        ).pack(side='left', padx=(20, 0), pady=12)
+        
+        ttk.Checkbutton(
+            controls,
+            text="Profile",
+            variable=self.profile_var,
+            style='App.TCheckbutton'
+        ).pack(side='left', padx=(20, 0), pady=12)
 
         # Create main paned window (pack after control panel)
-        main_paned = ttk.PanedWindow(self.root, orient=tk.HORIZONTAL, style='Dark.TFrame')
+        main_paned = ttk.PanedWindow(self.root, orient=tk.HORIZONTAL, style='App.TFrame')
         main_paned.pack(fill="both", expand=True, padx=15, pady=0)
 
         # Left pane - Code input and output
-        left_frame = ttk.Frame(main_paned, style='Dark.TFrame')
+        left_frame = ttk.Frame(main_paned, style='App.TFrame')
         main_paned.add(left_frame, weight=1)
 
         # Create a paned window for the left side
-        left_paned = ttk.PanedWindow(left_frame, orient=tk.VERTICAL, style='Dark.TFrame')
+        left_paned = ttk.PanedWindow(left_frame, orient=tk.VERTICAL, style='App.TFrame')
         left_paned.pack(fill="both", expand=True, padx=5, pady=5)
 
         # Code input area with label
-        code_frame = ttk.LabelFrame(left_paned, text="Code Editor", style='Dark.TLabelframe')
+        code_frame = ttk.LabelFrame(left_paned, text="Code Editor", style='App.TLabelframe')
         left_paned.add(code_frame, weight=2)
         
-        self.code_editor = tk.Text(code_frame, bg='#1E1E1E', fg='#E0E0E0', 
-                                 insertbackground='#4CAF50', font=('Consolas', 12),
-                                 padx=15, pady=15, relief='flat', wrap=tk.WORD)
-        self.code_editor.pack(fill="both", expand=True, padx=5, pady=5)
-        self.highlighter = SyntaxHighlighter(self.code_editor)
-        self.code_editor.bind("<KeyRelease>", self.on_code_change)
+        # One tab per open document; see new_document
+        self.editor_notebook = ttk.Notebook(code_frame, style='App.TNotebook')
+        self.editor_notebook.pack(side='right', fill="both", expand=True, padx=5, pady=5)
+        self.editor_notebook.bind('<<NotebookTabChanged>>', self._on_editor_tab_changed)
 
         # Code output area with label
-        output_frame = ttk.LabelFrame(left_paned, text="Output", style='Dark.TLabelframe')
+        output_frame = ttk.LabelFrame(left_paned, text="Output", style='App.TLabelframe')
         left_paned.add(output_frame, weight=1)
         
         # Create a notebook for different output types
-        self.output_notebook = ttk.Notebook(output_frame)
+        self.output_notebook = ttk.Notebook(output_frame, style='App.TNotebook')
         self.output_notebook.pack(fill="both", expand=True, padx=5, pady=5)
         
         # Token analysis output tab
-        token_output_frame = ttk.Frame(self.output_notebook, style='Dark.TFrame')
+        token_output_frame = ttk.Frame(self.output_notebook, style='App.TFrame')
         self.output_notebook.add(token_output_frame, text="Token Analysis")
         
-        self.token_output = tk.Text(token_output_frame, bg='#1E1E1E', fg='#E0E0E0',
+        self.token_output = tk.Text(token_output_frame,
                                   font=('Consolas', 12), padx=15, pady=15,
                                   relief='flat', state='disabled', wrap=tk.WORD)
         self.token_output.pack(fill="both", expand=True)
         
         # Code execution output tab
-        exec_output_frame = ttk.Frame(self.output_notebook, style='Dark.TFrame')
+        exec_output_frame = ttk.Frame(self.output_notebook, style='App.TFrame')
         self.output_notebook.add(exec_output_frame, text="Code Execution")
         
-        self.exec_output = tk.Text(exec_output_frame, bg='#1E1E1E', fg='#E0E0E0',
+        self.exec_output = tk.Text(exec_output_frame,
                                  font=('Consolas', 12), padx=15, pady=15,
                                  relief='flat', state='disabled', wrap=tk.WORD)
         self.exec_output.pack(fill="both", expand=True)
+        
+        # Lexing errors tab, shown a page at a time
+        errors_frame = self.errors_tab = ttk.Frame(self.output_notebook, style='App.TFrame')
+        self.output_notebook.add(errors_frame, text="Errors")
+        self._tab_builders[str(errors_frame)] = self._build_errors_tab
+        
+        # Lexer profile tab, filled after runs with profiling on
+        profile_frame = self.profile_tab = ttk.Frame(self.output_notebook, style='App.TFrame')
+        self.output_notebook.add(profile_frame, text="Profile")
+        self._tab_builders[str(profile_frame)] = self._build_profile_tab
+        
+        # Token statistics tab, filled on request for the document or a folder
+        stats_frame = self.stats_tab = ttk.Frame(self.output_notebook, style='App.TFrame')
+        self.output_notebook.add(stats_frame, text="Statistics")
+        self._tab_builders[str(stats_frame)] = self._build_stats_tab
+        self.output_notebook.bind("<<NotebookTabChanged>>", self._on_output_tab_changed)
 
         # Right pane - Token table and DFA visualization
-        right_frame = ttk.Frame(main_paned, style='Dark.TFrame')
+        right_frame = ttk.Frame(main_paned, style='App.TFrame')
         main_paned.add(right_frame, weight=1)
 
         # Create a paned window for the right side
-        right_paned = ttk.PanedWindow(right_frame, orient=tk.VERTICAL, style='Dark.TFrame')
+        right_paned = ttk.PanedWindow(right_frame, orient=tk.VERTICAL, style='App.TFrame')
         right_paned.pack(fill="both", expand=True, padx=5, pady=5)
 
         # Token table
-        token_frame = ttk.LabelFrame(right_paned, text="Tokens", style='Dark.TLabelframe')
+        token_frame = ttk.LabelFrame(right_paned, text="Tokens", style='App.TLabelframe')
         right_paned.add(token_frame, weight=1)
 
         # Create Treeview for tokens with custom style
         self.token_tree = ttk.Treeview(token_frame, columns=("Type", "Value", "Line", "Column"),
-                                     show="headings", selectmode="browse", style='Dark.Treeview')
+                                     show="headings", selectmode="extended", style='App.Treeview')
         
         # Configure column widths and headings
         self.token_tree.column("Type", width=100, anchor=tk.CENTER)
@@ -405,36 +475,132 @@ class MainWindow:
         self.token_tree.heading("Column", text="Column")
         
         # Add scrollbar with custom style
-        token_scroll = ttk.Scrollbar(token_frame, orient="vertical", 
-                                   command=self.token_tree.yview)
-        self.token_tree.configure(yscrollcommand=token_scroll.set)
+        self.token_scroll = token_scroll = ttk.Scrollbar(token_frame, orient="vertical",
+                                                         command=self.token_tree.yview)
+        # Line and column cells are filled in as rows scroll into view
+        self.token_tree.configure(yscrollcommand=self._on_token_scroll)
+        self._positioned_rows = set()
+        # Tokens shown in the table after the pipeline, and the table row of each by offset
+        self.table_tokens = []
+        self._token_rows = {}
         
         self.token_tree.pack(side="left", fill="both", expand=True, padx=5, pady=5)
         token_scroll.pack(side="right", fill="y", pady=5)
+        self.token_tree.bind("<Double-1>", self.on_token_double_click)
 
         # DFA Visualization
-        dfa_frame = ttk.LabelFrame(right_paned, text="DFA Visualization", style='Dark.TLabelframe')
-        right_paned.add(dfa_frame, weight=1)
+        self.dfa_frame = ttk.LabelFrame(right_paned, text="DFA Visualization",
+                                        style='App.TLabelframe')
+        right_paned.add(self.dfa_frame, weight=1)
 
-        # Create canvas for DFA visualization
-        self.dfa_canvas = tk.Canvas(dfa_frame, bg='#2D2D2D', highlightthickness=0)
-        self.dfa_canvas.pack(fill="both", expand=True, padx=5, pady=5)
-
-        # Initialize DFA visualizer with the canvas
-        self.dfa_visualizer = DFAVisualizer(self.dfa_canvas)
-        self.dfa_visualizer.setup_canvas()
+        # The canvas and its DFA visualizer are created on first use (see dfa_visualizer)
 
         # Add status bar
-        status_frame = ttk.Frame(self.root, style='Dark.TFrame')
+        status_frame = ttk.Frame(self.root, style='App.TFrame')
         status_frame.pack(fill='x', padx=20, pady=(0, 10))
         
         status_label = ttk.Label(
             status_frame,
             textvariable=self.status_var,
-            style='Dark.TLabel',
+            style='App.TLabel',
             font=('Segoe UI', 10)
         )
         status_label.pack(side='left')
+        # Shown only while a file is loading
+        self.progress_bar = ttk.Progressbar(status_frame, variable=self.load_progress,
+                                            maximum=1.0, length=160, mode='determinate')
+
+    def _on_output_tab_changed(self, event=None):
+        """Build the contents of the selected output tab if it is shown for the first time"""
+        self._ensure_tab(self.output_notebook.select())
+
+    def _ensure_tab(self, frame):
+        """Run the pending builder of a lazily filled notebook tab"""
+        builder = self._tab_builders.pop(str(frame), None)
+        if builder is not None:
+            builder(self.output_notebook.nametowidget(str(frame)))
+
+    def _build_errors_tab(self, frame):
+        """Create the error list with its recovery and paging controls"""
+        errors_header = ttk.Frame(frame, style='App.TFrame')
+        errors_header.pack(fill='x')
+        ttk.Label(errors_header, text="Recovery:", style='App.TLabel').pack(side='left', padx=5)
+        recovery_box = ttk.Combobox(errors_header, textvariable=self.recovery_var, state='readonly',
+                                    values=[mode.value for mode in RecoveryMode], width=18)
+        recovery_box.pack(side='left', padx=5, pady=5)
+        recovery_box.bind("<<ComboboxSelected>>", self.on_recovery_change)
+        ttk.Button(errors_header, text="Next", command=lambda: self.show_error_page(1),
+                   style='App.TButton').pack(side='right', padx=5, pady=5)
+        ttk.Button(errors_header, text="Prev", command=lambda: self.show_error_page(-1),
+                   style='App.TButton').pack(side='right', padx=5, pady=5)
+        ttk.Label(errors_header, textvariable=self.error_summary,
+                  style='App.TLabel').pack(side='right', padx=5)
+        
+        self.error_tree = ttk.Treeview(frame, columns=("Line", "Column", "Message"),
+                                       show="headings", style='App.Treeview', height=8)
+        self.error_tree.heading("Line", text="Line")
+        self.error_tree.heading("Column", text="Column")
+        self.error_tree.heading("Message", text="Message")
+        self.error_tree.column("Line", width=60, anchor='e')
+        self.error_tree.column("Column", width=60, anchor='e')
+        self.error_tree.column("Message", width=400)
+        self.error_tree.pack(fill="both", expand=True)
+        self.error_tree.bind("<Double-1>", self.on_error_double_click)
+        self.show_error_page(0)
+
+    def _build_profile_tab(self, frame):
+        """Create the pattern profile table"""
+        profile_columns = ("Type", "Pattern", "Attempts", "Hits", "Failed ms", "Match ms", "Bytes")
+        self.profile_tree = ttk.Treeview(frame, columns=profile_columns, show="headings",
+                                         style='App.Treeview', height=8)
+        for column in profile_columns:
+            self.profile_tree.heading(column, text=column)
+            self.profile_tree.column(column, width=180 if column == "Pattern" else 80,
+                                     anchor='w' if column in ("Type", "Pattern") else 'e')
+        self.profile_tree.pack(fill="both", expand=True)
+        
+        profile_footer = ttk.Frame(frame, style='App.TFrame')
+        profile_footer.pack(fill='x')
+        ttk.Label(profile_footer, textvariable=self.profile_summary,
+                  style='App.TLabel').pack(side='left', padx=5, pady=5)
+        ttk.Button(profile_footer, text="Reset", command=self.reset_profile,
+                   style='App.TButton').pack(side='right', padx=5, pady=5)
+
+    def _build_stats_tab(self, frame):
+        """Create the statistics report view with its collection controls"""
+        stats_header = ttk.Frame(frame, style='App.TFrame')
+        stats_header.pack(fill='x')
+        ttk.Button(stats_header, text="Document", command=self.collect_document_stats,
+                   style='App.TButton').pack(side='left', padx=5, pady=5)
+        ttk.Button(stats_header, text="Folder...", command=self.collect_folder_stats,
+                   style='App.TButton').pack(side='left', padx=5, pady=5)
+        ttk.Label(stats_header, textvariable=self.stats_summary,
+                  style='App.TLabel').pack(side='left', padx=5)
+        self.stats_output = tk.Text(frame, font=('Consolas', 11), padx=15, pady=15,
+                                    relief='flat', state='disabled', wrap=tk.NONE,
+                                    **THEMES[self.theme]['widgets']['output'])
+        self.stats_output.pack(fill="both", expand=True)
+
+    @property
+    def token_cache(self):
+        """On-disk token cache, opened on the first run"""
+        if self._token_cache is None:
+            from lexer.cache import TokenCache
+            self._token_cache = TokenCache()
+        return self._token_cache
+
+    @property
+    def dfa_visualizer(self):
+        """Canvas DFA renderer, created with its canvas the first time it is drawn on"""
+        if self._dfa_visualizer is None:
+            from visualizer.dfa_visualizer import DFAVisualizer
+            self.dfa_canvas = tk.Canvas(self.dfa_frame, highlightthickness=0)
+            self.dfa_canvas.pack(fill="both", expand=True, padx=5, pady=5)
+            self._dfa_visualizer = DFAVisualizer(self.dfa_canvas)
+            self._dfa_visualizer.setup_canvas()
+            self._dfa_visualizer.animation_speed = self.animation_speed
+            self._dfa_visualizer.instrumentation = self.instrumentation
+        return self._dfa_visualizer
 
     def setup_menu(self):
         """Setup the application menu"""
@@ -448,6 +614,9 @@ class MainWindow:
         file_menu.add_command(label="Open...", command=self.open_file, accelerator="Ctrl+O")
         file_menu.add_command(label="Save", command=self.save_file, accelerator="Ctrl+S")
         file_menu.add_command(label="Save As...", command=self.save_file_as)
+        file_menu.add_command(label="Compare Tokens with File...", command=self.compare_with_file)
+        file_menu.add_command(label="Export Performance Trace...", command=self.export_trace)
+        file_menu.add_command(label="Close Tab", command=self.close_document, accelerator="Ctrl+W")
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.root.quit)
         
@@ -469,6 +638,17 @@ class MainWindow:
         menubar.add_cascade(label="View", menu=view_menu)
         view_menu.add_checkbutton(label="Dark Theme", variable=self.theme_var, command=self.toggle_theme)
         view_menu.add_checkbutton(label="Line Numbers", variable=tk.BooleanVar(value=True), command=self.toggle_line_numbers)
+        view_menu.add_checkbutton(label="Keep Comments", variable=self.keep_comments_var,
+                                  command=self.on_keep_comments_change)
+        view_menu.add_checkbutton(label="Performance Overlay", variable=self.perf_overlay_var,
+                                  command=self.toggle_perf_overlay)
+        
+        # Language menu, one entry per built-in language definition
+        language_menu = tk.Menu(view_menu, tearoff=0)
+        view_menu.add_cascade(label="Language", menu=language_menu)
+        for name in available_languages():
+            language_menu.add_radiobutton(label=name, value=name, variable=self.language_var,
+                                          command=lambda name=name: self.set_language(load_language(name)))
         
         # Help menu
         help_menu = tk.Menu(menubar, tearoff=0)
@@ -478,7 +658,7 @@ class MainWindow:
 
     def setup_toolbar(self):
         """Setup the toolbar with common actions"""
-        toolbar = ttk.Frame(self.root, style='Dark.TFrame')
+        toolbar = ttk.Frame(self.root, style='App.TFrame')
         toolbar.pack(fill='x', padx=0, pady=(0, 5))
         
         # Create buttons with icons (using emoji as placeholders)
@@ -492,60 +672,243 @@ class MainWindow:
         ttk.Button(toolbar, text="⏯️ Step", command=self.step_through, style='Toolbar.TButton').pack(side='left', padx=2)
         ttk.Button(toolbar, text="🔄 Reset", command=self.reset_visualization, style='Toolbar.TButton').pack(side='left', padx=2)
         ttk.Separator(toolbar, orient='vertical').pack(side='left', padx=5, fill='y')
-        ttk.Button(toolbar, text="🌙 Theme", command=self.toggle_theme, style='Toolbar.TButton').pack(side='left', padx=2)
+        ttk.Button(toolbar, text="🌙 Theme", command=self.switch_theme, style='Toolbar.TButton').pack(side='left', padx=2)
 
     def setup_line_numbers(self):
         """Setup line numbers for the code editor"""
-        self.line_numbers = tk.Text(self.code_editor.master, width=4, padx=3, takefocus=0,
-                                  border=0, background='#1E1E1E', foreground='#858585',
-                                  state='disabled', font=('Consolas', 12))
+        self.line_numbers = tk.Text(self.editor_notebook.master, width=4, padx=3, takefocus=0,
+                                  border=0, state='disabled', font=('Consolas', 12))
         self.line_numbers.pack(side='left', fill='y')
-        
-        def update_line_numbers(*args):
-            self.line_numbers.config(state='normal')
-            self.line_numbers.delete('1.0', 'end')
-            i = self.code_editor.get('1.0', 'end-1c').count('\n') + 1
-            line_numbers_string = '\n'.join(str(x) for x in range(1, i + 1))
-            self.line_numbers.insert('1.0', line_numbers_string)
-            self.line_numbers.config(state='disabled')
-        
-        self.code_editor.bind('<Key>', update_line_numbers)
-        self.code_editor.bind('<MouseWheel>', update_line_numbers)
-        update_line_numbers()
+
+    def update_line_numbers(self, event=None):
+        """Number the lines of the active editor in the gutter"""
+        self.line_numbers.config(state='normal')
+        self.line_numbers.delete('1.0', 'end')
+        i = self.code_editor.get('1.0', 'end-1c').count('\n') + 1
+        line_numbers_string = '\n'.join(str(x) for x in range(1, i + 1))
+        self.line_numbers.insert('1.0', line_numbers_string)
+        self.line_numbers.config(state='disabled')
+
+    @property
+    def code_editor(self):
+        """Text widget of the active tab"""
+        return self.active_tab.editor
+
+    @property
+    def highlighter(self):
+        return self.active_tab.highlighter
+
+    @property
+    def lexer(self):
+        """Lexer of the active tab's document, holding its current tokens"""
+        return self.active_tab.document.lexer
+
+    @property
+    def current_file(self):
+        return self.active_tab.document.path
+
+    @current_file.setter
+    def current_file(self, path):
+        self._set_path(self.active_tab, path)
+
+    def _set_path(self, tab, path):
+        """Record the file a tab is saved to and name the tab after it"""
+        document = tab.document
+        document.path = path
+        document.name = os.path.basename(path) if path else "Untitled"
+        self.editor_notebook.tab(tab.frame, text=document.name)
+
+    def _blank_tab(self):
+        """Return the active tab if it is empty and unnamed, otherwise a new tab"""
+        tab = self.active_tab
+        if (tab.document.path is None and tab is not self.loading_tab
+                and tab is not self.paged_tab and not tab.editor.get('1.0', 'end-1c')):
+            return tab
+        return self.new_document()
+
+    def _new_lexer(self, language=None):
+        """Return a lexer for a document, with the window's recovery mode and skipped types"""
+        lexer = Lexer(language)
+        lexer.recovery = RecoveryMode(self.recovery_var.get())
+        lexer.SKIP_TYPES = self._skip_types()
+        # Positions are looked up per displayed token instead of tracked while scanning
+        lexer.track_lines = False
+        return lexer
+
+    def new_document(self, name="Untitled", language=None):
+        """Open an empty editor tab and show it"""
+        frame = ttk.Frame(self.editor_notebook, style='App.TFrame')
+        editor = tk.Text(frame, font=('Consolas', 12), padx=15, pady=15, relief='flat',
+                         wrap=tk.WORD, **THEMES[self.theme]['widgets']['editor'])
+        editor.pack(fill="both", expand=True)
+        tab = EditorTab(frame, editor, Document(lexer=self._new_lexer(language), name=name),
+                        self.instrumentation, self.token_pipeline)
+        for tag, options in THEMES[self.theme]['tags'].items():
+            editor.tag_configure(tag, **options)
+        editor.bind("<KeyRelease>", self.on_code_change)
+        editor.bind('<Key>', self.update_line_numbers)
+        editor.bind('<MouseWheel>', self.update_line_numbers)
+        self.editor_notebook.add(frame, text=name)
+        self.tabs[str(frame)] = tab
+        self.lexing_service.open(tab.document)
+        self.editor_notebook.select(frame)
+        # Select fires <<NotebookTabChanged>> only once the event loop runs
+        self._on_editor_tab_changed()
+        return tab
+
+    def close_document(self):
+        """Close the active tab, keeping at least one tab open"""
+        tab = self.active_tab
+        if tab is self.paged_tab:
+            self.close_paged()
+        if tab is self.loading_tab:
+            self.cancel_load()
+        self.unwatch_file(tab)
+        self._reloads.pop(tab, None)
+        if len(self.tabs) == 1:
+            self.new_document()
+        del self.tabs[str(tab.frame)]
+        self.lexing_service.close(tab.document)
+        self.editor_notebook.forget(tab.frame)
+        tab.frame.destroy()
+        if self.active_tab is tab:
+            self._on_editor_tab_changed()
+
+    def _on_editor_tab_changed(self, event=None):
+        """Show the selected tab's tokens and give its document lexing priority"""
+        tab = self.tabs.get(self.editor_notebook.select())
+        if tab is None or tab is self.active_tab:
+            return
+        self.active_tab = tab
+        document = tab.document
+        document.code = tab.editor.get('1.0', 'end-1c')
+        self.lexing_service.activate(document)
+        # Tokens of the previous tab no longer apply; the buffer may still be building
+        self.show_document_tokens()
+        self.search_matches = []
+        self.language_var.set(document.lexer.language.name)
+        self.root.title(f"LexVi - {document.path or 'Interactive Lexical Analyzer'}")
+        self.update_line_numbers()
+        self._schedule_lexing_poll()
+
+    def show_document_tokens(self):
+        """Make the active document's token buffer the displayed result, if it is current"""
+        state = self.active_tab.document.state
+        self.tokens = state.tokens if state is not None else []
+        self.lexed_code = state.code if state is not None else None
+        self.current_token_index = 0
+        self.update_token_table()
+        self.error_page_start = 0
+        # An Errors tab not built yet fills itself when first shown
+        if str(self.errors_tab) not in self._tab_builders:
+            self.show_error_page(0)
+
+    # Interval between collections of finished background scans
+    LEXING_POLL_MS = 30
+
+    def _schedule_lexing_poll(self):
+        if self._lexing_poll is None and self.lexing_service.busy:
+            self._lexing_poll = self.root.after(self.LEXING_POLL_MS, self._poll_lexing)
+
+    def _poll_lexing(self):
+        """Publish finished background scans; show the active one if nothing is shown yet"""
+        self._lexing_poll = None
+        updated = self.lexing_service.poll()
+        # Only shown when nothing is; otherwise the shown tokens wait for the next run
+        if self.active_tab.document in updated and self.lexed_code is None:
+            self.show_document_tokens()
+        self._schedule_lexing_poll()
+
+    # Search scope meaning plain text rather than one token type
+    ANY_TEXT = "Any text"
+
+    def _search_options(self, dialog):
+        """Add the search option controls shared by the find and replace dialogs"""
+        options = {
+            'regex': tk.BooleanVar(value=False),
+            'ignore_case': tk.BooleanVar(value=False),
+            'whole_word': tk.BooleanVar(value=False),
+            'token_type': tk.StringVar(value=self.ANY_TEXT),
+        }
+        row = ttk.Frame(dialog)
+        row.pack(pady=5)
+        for key, label in (('regex', "Regex"), ('ignore_case', "Ignore case"),
+                           ('whole_word', "Whole word")):
+            ttk.Checkbutton(row, text=label, variable=options[key]).pack(side='left', padx=4)
+        ttk.Combobox(dialog, textvariable=options['token_type'], state='readonly', width=18,
+                     values=[self.ANY_TEXT] + [t.value for t in TokenType]).pack(pady=5)
+        return options
+
+    def find_matches(self, pattern, options):
+        """Return a SearchIndex over the editor buffer and the (start, end) matches of pattern"""
+        code = self.code_editor.get('1.0', 'end-1c')
+        if options['token_type'].get() == self.ANY_TEXT:
+            index = SearchIndex(code)
+            return index, index.find(pattern, options['regex'].get(),
+                                     options['ignore_case'].get(), options['whole_word'].get())
+        if code != self.lexed_code:
+            self.lex_buffer(code)
+        index = SearchIndex(code, self.tokens, self.lexer.symbols)
+        token_type = TokenType(options['token_type'].get())
+        return index, index.find_tokens(pattern or None, token_type)
 
     def show_find_dialog(self):
         """Show the find dialog"""
         find_dialog = tk.Toplevel(self.root)
         find_dialog.title("Find")
-        find_dialog.geometry("300x100")
+        find_dialog.geometry("340x170")
         find_dialog.transient(self.root)
         
         ttk.Label(find_dialog, text="Find:").pack(pady=5)
         find_entry = ttk.Entry(find_dialog, width=30)
         find_entry.pack(pady=5)
         find_entry.focus_set()
+        options = self._search_options(find_dialog)
         
         def find():
-            text = find_entry.get()
-            if text:
-                self.code_editor.tag_remove('search', '1.0', 'end')
-                start = '1.0'
-                while True:
-                    start = self.code_editor.search(text, start, 'end')
-                    if not start:
-                        break
-                    end = f"{start}+{len(text)}c"
-                    self.code_editor.tag_add('search', start, end)
-                    start = end
-                self.code_editor.tag_config('search', background='#4CAF50', foreground='white')
+            index, matches = self.find_matches(find_entry.get(), options)
+            self.search_matches = matches
+            self.search_lines = LineIndex(index.code)
+            self.code_editor.configure(yscrollcommand=self._on_editor_scroll)
+            self.highlight_visible_matches()
+            self.status_var.set(f"{len(matches)} matches")
         
         ttk.Button(find_dialog, text="Find", command=find).pack(pady=5)
 
+    def highlight_visible_matches(self):
+        """Tag the search matches inside the editor viewport with one tag_add call"""
+        self.code_editor.tag_remove('search', '1.0', 'end')
+        if not self.search_matches:
+            return
+        lines = self.search_lines
+        first = int(self.code_editor.index('@0,0').split('.')[0])
+        last = int(self.code_editor.index(f'@0,{self.code_editor.winfo_height()}').split('.')[0])
+        start = lines.offset(min(first, len(lines)), 1)
+        end = lines.offset(last + 1, 1) if last < len(lines) else lines.length
+        indices = []
+        for match_start, match_end in SearchIndex.visible(self.search_matches, start, end):
+            line, column = lines.line_column(match_start)
+            end_line, end_column = lines.line_column(match_end)
+            indices += (f"{line}.{column - 1}", f"{end_line}.{end_column - 1}")
+        if indices:
+            self.code_editor.tag_add('search', *indices)
+
+    def _on_editor_scroll(self, first, last):
+        """Re-tag search matches once the editor viewport has moved"""
+        if self.search_matches:
+            if self._search_refresh is not None:
+                self.root.after_cancel(self._search_refresh)
+            self._search_refresh = self.root.after_idle(self._refresh_search)
+
+    def _refresh_search(self):
+        self._search_refresh = None
+        self.highlight_visible_matches()
+
     def show_replace_dialog(self):
         """Show the replace dialog"""
         replace_dialog = tk.Toplevel(self.root)
         replace_dialog.title("Replace")
-        replace_dialog.geometry("300x150")
+        replace_dialog.geometry("340x230")
         replace_dialog.transient(self.root)
         
         ttk.Label(replace_dialog, text="Find:").pack(pady=5)
@@ -555,17 +918,76 @@ class MainWindow:
         ttk.Label(replace_dialog, text="Replace with:").pack(pady=5)
         replace_entry = ttk.Entry(replace_dialog, width=30)
         replace_entry.pack(pady=5)
+        options = self._search_options(replace_dialog)
         
         def replace():
-            find_text = find_entry.get()
-            replace_text = replace_entry.get()
-            if find_text:
-                content = self.code_editor.get('1.0', 'end-1c')
-                new_content = content.replace(find_text, replace_text)
-                self.code_editor.delete('1.0', 'end')
-                self.code_editor.insert('1.0', new_content)
+            pattern = find_entry.get()
+            if not pattern:
+                return
+            if options['token_type'].get() == self.ANY_TEXT:
+                index = SearchIndex(self.code_editor.get('1.0', 'end-1c'))
+                edit = index.replace_pattern(pattern, replace_entry.get(), options['regex'].get(),
+                                             options['ignore_case'].get(),
+                                             options['whole_word'].get())
+            else:
+                index, matches = self.find_matches(pattern, options)
+                edit = index.replace(matches, replace_entry.get())
+            if edit.count:
+                self.apply_edit(index.code, edit)
+            self.status_var.set(f"Replaced {edit.count} matches")
         
-        ttk.Button(replace_dialog, text="Replace", command=replace).pack(pady=5)
+        ttk.Button(replace_dialog, text="Replace All", command=replace).pack(pady=5)
+
+    def apply_edit(self, code, edit, tab=None):
+        """Apply an edit to a tab's editor (the active one by default) and relex only around it"""
+        tab = tab or self.active_tab
+        editor = tab.editor
+        lines = LineIndex(code)
+        (line, column), (end_line, end_column) = (lines.line_column(edit.start),
+                                                  lines.line_column(edit.old_end))
+        start = f"{line}.{column - 1}"
+        editor.delete(start, f"{end_line}.{end_column - 1}")
+        editor.insert(start, edit.text[edit.start:edit.new_end])
+        lexer = tab.document.lexer
+        old_tokens = tokens = None
+        if tab is self.active_tab:
+            self.search_matches = []
+            editor.tag_remove('search', '1.0', 'end')
+            if code == self.lexed_code:
+                old_tokens = self.tokens
+                self.tokens = tokens = lexer.relex(edit.text, edit.start, edit.old_end,
+                                                   edit.new_end)
+                self.lexed_code = edit.text
+                self.update_token_table()
+                self.display_errors()
+        elif lexer.result_for(code) is not None:
+            old_tokens = lexer.tokens
+            tokens = lexer.relex(edit.text, edit.start, edit.old_end, edit.new_end)
+        self.text_changed(tab, edit.text)
+        # Re-tag the edited lines and every token the relex changed
+        start, end = edit.start, edit.new_end
+        if tokens is not None:
+            changed = changed_span(old_tokens, tokens, edit.new_end - edit.old_end)
+            if changed is not None:
+                start, end = min(start, changed[0]), max(end, changed[1])
+        tab.highlighter.highlight_range(start, end)
+
+    def text_changed(self, tab, code):
+        """Record a tab's new text, queueing a background scan unless its tokens are on show"""
+        if tab is self.active_tab and self.lexed_code is not None:
+            # The shown tokens stay those of the last run until the next one
+            tab.document.code = code
+        else:
+            self.lexing_service.update(tab.document, code)
+            self._schedule_lexing_poll()
+
+    def lex_buffer(self, code):
+        """Tokenize code as the current result without running the visualization"""
+        with self.instrumentation.span('lex', 'lexer', chars=len(code)):
+            state = self.lexer.result_for(code)
+            self.tokens = state.tokens if state is not None else self.lexer.tokenize(code)
+        self.lexed_code = code
+        self.lexing_service.update(self.active_tab.document, code)
 
     def show_about(self):
         """Show the about dialog"""
@@ -617,50 +1039,370 @@ class MainWindow:
         text.config(state='disabled')
 
     def new_file(self):
-        """Create a new file"""
-        self.code_editor.delete('1.0', 'end')
+        """Create a new file in its own tab"""
+        self.new_document()
         self.root.title("LexVi - New File")
 
     def open_file(self):
-        """Open a file"""
+        """Open a file, offering a read-only paged view for very large ones"""
+        from gui.file_io import LARGE_FILE_SIZE
         file_path = filedialog.askopenfilename(
             filetypes=[("Python files", "*.py"), ("Text files", "*.txt"), ("All files", "*.*")])
         if file_path:
             try:
-                with open(file_path, 'r') as file:
-                    self.code_editor.delete('1.0', 'end')
-                    self.code_editor.insert('1.0', file.read())
-                self.root.title(f"LexVi - {file_path}")
+                size = os.path.getsize(file_path)
+                if size > LARGE_FILE_SIZE and messagebox.askyesno(
+                        "Large file", f"This file is {size >> 20} MB. "
+                                      "Open it as a read-only paged view instead?"):
+                    self.open_paged(file_path)
+                else:
+                    self.load_file(file_path)
             except Exception as e:
                 messagebox.showerror("Error", f"Could not open file: {str(e)}")
 
+    # Rows shown per page of the token diff window
+    DIFF_PAGE_SIZE = 500
+    # Interval for checking on work running on a worker thread
+    BACKGROUND_POLL_MS = 50
+
+    def _run_in_background(self, work, done, name):
+        """Run work() on a worker thread and pass its future to done() on the GUI thread"""
+        import threading
+        from concurrent.futures import Future
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(work())
+            except Exception as e:
+                future.set_exception(e)
+
+        def check():
+            if future.done():
+                done(future)
+            else:
+                self.root.after(self.BACKGROUND_POLL_MS, check)
+
+        threading.Thread(target=run, name=name, daemon=True).start()
+        self.root.after(self.BACKGROUND_POLL_MS, check)
+        return future
+
+    def compare_with_file(self):
+        """Diff the tokens of a file on disk (old) against the active tab (new)"""
+        file_path = filedialog.askopenfilename(
+            title="Compare tokens with",
+            filetypes=[("Python files", "*.py"), ("Text files", "*.txt"), ("All files", "*.*")])
+        if not file_path:
+            return
+        from lexer.diff import diff_texts
+        new = self.code_editor.get("1.0", "end-1c")
+        compiled = self.lexer.compiled()
+        names = (os.path.basename(file_path), self.active_tab.document.name)
+
+        def work():
+            with open(file_path, encoding='utf-8', errors='replace') as f:
+                return diff_texts(f.read(), new, compiled)
+
+        def done(job):
+            if job is not self._diff_job:
+                return  # Superseded by a newer comparison
+            self._diff_job = None
+            try:
+                diff = job.result()
+            except Exception as e:
+                messagebox.showerror("Error", f"Could not compare: {str(e)}")
+                self.status_var.set("Ready")
+                return
+            self.show_token_diff(diff, *names)
+
+        self.status_var.set(f"Comparing tokens with {file_path}...")
+        self._diff_job = self._run_in_background(work, done, 'lexvi-diff')
+
+    def show_token_diff(self, diff, old_name, new_name):
+        """Open a window listing changed tokens side by side, a page at a time"""
+        changes = list(diff.changes())
+        counts = diff.counts()
+        self.status_var.set(f"{counts['insert']} inserted, {counts['delete']} deleted, "
+                            f"{counts['change']} changed tokens")
+        window = tk.Toplevel(self.root)
+        window.title(f"Token Diff - {old_name} \u2192 {new_name}")
+        window.geometry("900x500")
+        frame = ttk.Frame(window, style='App.TFrame')
+        frame.pack(fill='both', expand=True)
+        columns = ("old_line", "old_token", "change", "new_line", "new_token")
+        tree = ttk.Treeview(frame, columns=columns, show="headings", style='App.Treeview')
+        for column, heading, width in zip(columns,
+                                          ("Line", old_name, "Change", "Line", new_name),
+                                          (60, 320, 80, 60, 320)):
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, stretch=width > 100)
+        for tag, options in THEMES[self.theme]['tags'].items():
+            tree.tag_configure(tag, **options)
+        scrollbar = ttk.Scrollbar(frame, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        footer = ttk.Frame(window, style='App.TFrame')
+        footer.pack(fill='x', side='bottom')
+        scrollbar.pack(side='right', fill='y')
+        tree.pack(fill='both', expand=True)
+        summary = tk.StringVar()
+        page = {'start': 0}
+
+        def describe(token):
+            return "" if token is None else f"{token.type.name} {token.value!r}"
+
+        def show_page(step):
+            size = self.DIFF_PAGE_SIZE
+            last_page = max(0, (len(changes) - 1) // size * size)
+            start = page['start'] = min(max(0, page['start'] + step * size), last_page)
+            tree.delete(*tree.get_children())
+            for kind, before, after in changes[start:start + size]:
+                tree.insert("", "end", tags=(f"diff_{kind}",), values=(
+                    "" if before is None else before.line, describe(before), kind,
+                    "" if after is None else after.line, describe(after)))
+            summary.set(f"{start + 1}-{min(start + size, len(changes))} of {len(changes)}"
+                        if changes else "No token differences")
+
+        ttk.Button(footer, text="Previous", style='Toolbar.TButton',
+                   command=lambda: show_page(-1)).pack(side='left', padx=5, pady=5)
+        ttk.Button(footer, text="Next", style='Toolbar.TButton',
+                   command=lambda: show_page(1)).pack(side='left', padx=5, pady=5)
+        ttk.Label(footer, textvariable=summary, style='App.TLabel').pack(side='left', padx=10)
+        self.diff_tree = tree
+        show_page(0)
+
+    # Longest stretch the GUI thread spends inserting loaded text before handling events
+    LOAD_SLICE_MS = 20
+    # Characters inserted into the editor per insert call while loading
+    LOAD_BATCH_CHARS = 1 << 16
+
+    def load_file(self, file_path):
+        """Read a file on a background thread and insert it into a tab in slices"""
+        from gui.file_io import ChunkedReader
+        self.cancel_load()
+        tab = self._blank_tab()
+        self._loader = ChunkedReader(file_path).start()
+        self.loading_tab = tab
+        self._set_path(tab, file_path)
+        # Keep typing out of the editor until the whole file is in
+        tab.editor.configure(state='disabled')
+        self.load_progress.set(0.0)
+        self.progress_bar.pack(side='right')
+        self.status_var.set(f"Loading {file_path}...")
+        self.root.after(0, self._insert_loaded_text, self._loader)
+
+    def _insert_loaded_text(self, loader):
+        """Insert what the reader has decoded so far, then reschedule until it is done"""
+        if loader is not self._loader:
+            return  # Cancelled or superseded by another load
+        editor = self.loading_tab.editor
+        deadline = time.perf_counter() + self.LOAD_SLICE_MS / 1000
+        editor.configure(state='normal')
+        text = ''
+        while time.perf_counter() < deadline:
+            text = loader.poll(self.LOAD_BATCH_CHARS)
+            if not text:
+                break
+            editor.insert('end-1c', text)
+        editor.configure(state='disabled')
+        self.load_progress.set(loader.progress)
+        if not loader.done:
+            # Come back at once when text is waiting, otherwise give the reader time
+            self.root.after(1 if text else self.LOAD_SLICE_MS, self._insert_loaded_text, loader)
+            return
+        tab = self.loading_tab
+        self._loader = self.loading_tab = None
+        self.progress_bar.pack_forget()
+        editor.configure(state='normal')
+        if loader.error is not None:
+            # Drop the partial text so it can never be saved over the file
+            editor.delete('1.0', 'end')
+            self._set_path(tab, None)
+            messagebox.showerror("Error", f"Could not open file: {loader.error}")
+            self.status_var.set("Ready")
+            return
+        self.status_var.set(f"Loaded {loader.path}")
+        language = language_for_path(loader.path)
+        if language is not None:
+            self.set_language(language, tab)
+        else:
+            tab.highlighter.highlight()
+            self.lexing_service.update(tab.document, editor.get('1.0', 'end-1c'))
+            self._schedule_lexing_poll()
+        self.watch_file(tab)
+        if tab is self.active_tab:
+            self.root.title(f"LexVi - {loader.path}")
+            self.update_line_numbers()
+            self.show_document_tokens()
+
+    def cancel_load(self):
+        """Stop inserting a file that is still loading"""
+        if self._loader is not None:
+            self._loader = None
+            self.progress_bar.pack_forget()
+            self.loading_tab.editor.configure(state='normal')
+            self.loading_tab = None
+
+    # Interval between checks of open files for changes on disk
+    FILE_POLL_MS = 500
+
+    def watch_file(self, tab):
+        """Reload a tab's file when it changes on disk; its current text counts as saved"""
+        if self._file_watcher is None:
+            from gui.file_io import FileWatcher
+            self._file_watcher = FileWatcher()
+        self._file_watcher.watch(tab.document.path)
+        tab.editor.edit_modified(False)
+        if self._file_poll is None:
+            self._file_poll = self.root.after(self.FILE_POLL_MS, self._poll_files)
+
+    def unwatch_file(self, tab):
+        path = tab.document.path
+        if self._file_watcher is not None and path is not None and not any(
+                other is not tab and other.document.path == path for other in self.tabs.values()):
+            self._file_watcher.unwatch(path)
+
+    def _poll_files(self):
+        """Start reloading the tabs whose files have changed on disk"""
+        from gui.file_io import ChunkedReader
+        self._file_poll = None
+        for path in self._file_watcher.poll():
+            for tab in list(self.tabs.values()):
+                if (tab.document.path != path or tab is self.loading_tab
+                        or tab is self.paged_tab):
+                    continue
+                if tab.editor.edit_modified() and not messagebox.askyesno(
+                        "File changed", f"{path} was changed on disk. "
+                                        "Reload it and lose your changes?"):
+                    continue
+                reader = self._reloads[tab] = ChunkedReader(path).start()
+                self.root.after(self.LOAD_SLICE_MS, self._finish_reload, tab, reader, [])
+        if len(self._file_watcher):
+            self._file_poll = self.root.after(self.FILE_POLL_MS, self._poll_files)
+
+    def _finish_reload(self, tab, reader, parts):
+        """Collect a changed file, then patch only the changed span into its tab"""
+        if self._reloads.get(tab) is not reader:
+            return  # Tab closed or a newer change is being read
+        parts.append(reader.poll(self.LOAD_BATCH_CHARS * 16))
+        if not reader.done:
+            self.root.after(1 if parts[-1] else self.LOAD_SLICE_MS,
+                            self._finish_reload, tab, reader, parts)
+            return
+        del self._reloads[tab]
+        if reader.error is not None:
+            self.status_var.set(f"Could not reload {reader.path}: {reader.error}")
+            return
+        code = tab.editor.get('1.0', 'end-1c')
+        edit = diff_edit(code, ''.join(parts))
+        if edit.count:
+            self.apply_edit(code, edit, tab)
+            if tab is self.active_tab:
+                self.update_line_numbers()
+        tab.editor.edit_modified(False)
+        self.status_var.set(f"Reloaded {reader.path}")
+
+    def open_paged(self, file_path):
+        """Show a large file a page at a time, read-only, in its own tab"""
+        from gui.file_io import PagedFile
+        self.close_paged()
+        tab = self._blank_tab()
+        self.paged_file = PagedFile(file_path)
+        self.paged_tab = tab
+        self.page_var = tk.StringVar()
+        self.page_bar = ttk.Frame(tab.frame, style='App.TFrame')
+        ttk.Button(self.page_bar, text="Prev", command=lambda: self.show_page(-1),
+                   style='App.TButton').pack(side='left', padx=5, pady=2)
+        ttk.Button(self.page_bar, text="Next", command=lambda: self.show_page(1),
+                   style='App.TButton').pack(side='left', padx=5, pady=2)
+        ttk.Label(self.page_bar, textvariable=self.page_var,
+                  style='App.TLabel').pack(side='left', padx=5)
+        self.page_bar.pack(fill='x', before=tab.editor)
+        self.editor_notebook.tab(tab.frame, text=f"{os.path.basename(file_path)} (read-only)")
+        self.page_index = 0
+        self.show_page(0)
+        self.root.title(f"LexVi - {file_path} (read-only)")
+        language = language_for_path(file_path)
+        if language is not None:
+            self.set_language(language, tab)
+
+    def show_page(self, step):
+        """Move step pages through the paged file and show that page in its tab"""
+        paged = self.paged_file
+        tab = self.paged_tab
+        self.page_index = min(max(0, self.page_index + step), len(paged) - 1)
+        tab.editor.configure(state='normal')
+        tab.editor.delete('1.0', 'end')
+        tab.editor.insert('1.0', paged.page(self.page_index))
+        tab.editor.configure(state='disabled')
+        tab.highlighter.highlight()
+        if tab is self.active_tab:
+            self.update_line_numbers()
+        self.page_var.set(f"Page {self.page_index + 1} of {len(paged)} "
+                          f"({paged.size >> 20} MB, read-only)")
+
+    def close_paged(self):
+        """Leave the paged view and make its tab an editable, unnamed buffer"""
+        if self.paged_file is not None:
+            self.paged_file.close()
+            self.paged_file = None
+            self.page_bar.destroy()
+            self.paged_tab.editor.configure(state='normal')
+            self._set_path(self.paged_tab, None)
+            self.paged_tab = None
+
+    def write_editor(self, file_path):
+        """Stream the editor contents to a file, a block of lines at a time"""
+        from gui.file_io import text_chunks, write_chunks
+        write_chunks(file_path, text_chunks(self.code_editor))
+
     def save_file(self):
         """Save the current file"""
-        if not hasattr(self, 'current_file') or not self.current_file:
+        if self.active_tab is self.paged_tab:
+            self.status_var.set("Paged view is read-only")
+            return
+        if not self.current_file:
             return self.save_file_as()
             
         try:
-            with open(self.current_file, 'w') as file:
-                file.write(self.code_editor.get('1.0', 'end-1c'))
+            self.write_editor(self.current_file)
+            self.watch_file(self.active_tab)
             self.status_var.set(f"File saved: {self.current_file}")
         except Exception as e:
             messagebox.showerror("Error", f"Could not save file: {str(e)}")
 
     def save_file_as(self):
         """Save the current file with a new name"""
+        if self.active_tab is self.paged_tab:
+            self.status_var.set("Paged view is read-only")
+            return
         file_path = filedialog.asksaveasfilename(
             defaultextension=".py",
             filetypes=[("Python files", "*.py"), ("Text files", "*.txt"), ("All files", "*.*")])
         if file_path:
             try:
-                with open(file_path, 'w') as file:
-                    file.write(self.code_editor.get('1.0', 'end-1c'))
+                self.write_editor(file_path)
+                self.unwatch_file(self.active_tab)
                 self.current_file = file_path
+                self.watch_file(self.active_tab)
                 self.root.title(f"LexVi - {file_path}")
                 self.status_var.set(f"File saved: {file_path}")
             except Exception as e:
                 messagebox.showerror("Error", f"Could not save file: {str(e)}")
 
+    def set_language(self, language, tab=None):
+        """Lex and highlight a tab (the active one by default) with another language"""
+        tab = tab or self.active_tab
+        document = tab.document
+        document.lexer = self._new_lexer(language)
+        tab.highlighter.set_lexer(document.lexer)
+        tab.highlighter.highlight()
+        self.lexing_service.update(document, tab.editor.get('1.0', 'end-1c'))
+        self._schedule_lexing_poll()
+        if tab is self.active_tab:
+            self.language_var.set(language.name)
+            self.show_document_tokens()
+            self.status_var.set(f"Language: {language.name}")
+
     def toggle_line_numbers(self):
         """Toggle line numbers visibility"""
         if self.line_numbers.winfo_viewable():
@@ -668,57 +1410,175 @@ class MainWindow:
         else:
             self.line_numbers.pack(side='left', fill='y')
 
+    # Interval between refreshes of the performance overlay
+    PERF_REFRESH_MS = 500
+
+    def toggle_perf_overlay(self):
+        """Show or hide the performance overlay in the window's lower right corner"""
+        if not self.perf_overlay_var.get():
+            if self.perf_overlay is not None:
+                self.perf_overlay.place_forget()
+            if self._perf_refresh is not None:
+                self.root.after_cancel(self._perf_refresh)
+                self._perf_refresh = None
+            return
+        if self.perf_overlay is None:
+            self._build_perf_overlay()
+        self.perf_overlay.place(relx=1.0, rely=1.0, anchor='se', x=-20, y=-40)
+        self.perf_overlay.lift()
+        self._refresh_perf_overlay()
+
+    def _build_perf_overlay(self):
+        """Create the overlay: a header that collapses it and a text body with the figures"""
+        overlay = self.perf_overlay = ttk.Frame(self.root, style='App.TFrame',
+                                                relief='solid', borderwidth=1)
+        header = ttk.Frame(overlay, style='App.TFrame')
+        header.pack(fill='x')
+        self.perf_body = tk.Text(overlay, font=('Consolas', 9), width=58, height=16,
+                                 relief='flat', state='disabled', wrap=tk.NONE,
+                                 **THEMES[self.theme]['widgets']['output'])
+
+        def collapse():
+            if self.perf_body.winfo_ismapped():
+                self.perf_body.pack_forget()
+                toggle.configure(text="\u25b8 Performance")
+            else:
+                self.perf_body.pack(fill='both', expand=True)
+                toggle.configure(text="\u25be Performance")
+                self._refresh_perf_overlay()
+
+        toggle = ttk.Button(header, text="\u25be Performance", command=collapse,
+                            style='Toolbar.TButton')
+        toggle.pack(side='left')
+        ttk.Button(header, text="\u2715", width=3, style='Toolbar.TButton',
+                   command=lambda: (self.perf_overlay_var.set(False),
+                                    self.toggle_perf_overlay())).pack(side='right')
+        ttk.Button(header, text="Export", command=self.export_trace,
+                   style='Toolbar.TButton').pack(side='right')
+        ttk.Button(header, text="Clear", command=self.instrumentation.clear,
+                   style='Toolbar.TButton').pack(side='right')
+        ttk.Button(header, text="Snapshot", command=self.take_memory_snapshot,
+                   style='Toolbar.TButton').pack(side='right')
+        ttk.Checkbutton(header, text="Memory", variable=self.perf_memory_var,
+                        command=self.on_perf_memory_change,
+                        style='App.TCheckbutton').pack(side='right', padx=5)
+        self.perf_body.pack(fill='both', expand=True)
+
+    def on_perf_memory_change(self):
+        """Start or stop tracing allocations for the overlay and the exported trace"""
+        if self.perf_memory_var.get():
+            self.instrumentation.start_memory()
+        else:
+            self.instrumentation.stop_memory()
+            self._perf_memory_top = []
+
+    def take_memory_snapshot(self):
+        """List the largest allocation sites in the overlay; a snapshot walks every
+        traced block, so it is only taken on request"""
+        if not self.instrumentation.tracing_memory:
+            self.status_var.set("Turn on Memory in the performance overlay first")
+            return
+        self._perf_memory_top = self.instrumentation.memory_top(5)
+        self._refresh_perf_overlay()
+
+    def _refresh_perf_overlay(self):
+        """Sample the counters and rewrite the overlay text while it is shown"""
+        if self._perf_refresh is not None:
+            self.root.after_cancel(self._perf_refresh)
+        self._perf_refresh = None
+        if not self.perf_overlay_var.get():
+            return
+        recorder = self.instrumentation
+        if self.dfa_canvas is not None:
+            recorder.count('canvas items', len(self.dfa_canvas.find_all()))
+        recorder.count('token rows', len(self.tokens))
+        recorder.sample_memory()
+        if self.perf_body.winfo_ismapped():
+            lines = [f"{'Span':<16}{'Count':>7}{'Last ms':>10}{'Mean ms':>10}{'Max ms':>10}"]
+            lines += [f"{name:<16}{count:>7}{last:>10.2f}{mean:>10.2f}{longest:>10.2f}"
+                      for name, count, last, mean, longest in recorder.summary()]
+            lines.append('')
+            lines += [f"{name:<16}{value:>12,.1f}"
+                      for name, value in recorder.latest_samples().items()]
+            top = self._perf_memory_top
+            if top:
+                lines += ['', f"{'Allocated at':<32}{'KB':>10}{'Blocks':>9}"]
+                lines += [f"{site:<32}{size:>10.1f}{blocks:>9}" for site, size, blocks in top]
+            self.perf_body.configure(state='normal')
+            self.perf_body.delete('1.0', 'end')
+            self.perf_body.insert('1.0', '\n'.join(lines))
+            self.perf_body.configure(state='disabled')
+        self._perf_refresh = self.root.after(self.PERF_REFRESH_MS, self._refresh_perf_overlay)
+
+    def export_trace(self):
+        """Save the recorded spans and counters as Chrome trace-event JSON"""
+        file_name = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("Trace JSON", "*.json")])
+        if file_name:
+            try:
+                self.instrumentation.export(file_name)
+                self.status_var.set(f"Trace saved to {file_name} "
+                                    "(open in chrome://tracing or ui.perfetto.dev)")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to export trace: {str(e)}")
+
     def run_lexer(self):
         """Run the lexer on the current code"""
         self.status_var.set("Running lexical analysis...")
         self.root.update()
-        # Reset DFA visualization
-        self.dfa_visualizer.reset()
         # Get current code and run lexer
         code = self.code_editor.get("1.0", "end-1c")
-        self.tokens = self.lexer.tokenize(code)
+        trace = None
+        if self.trace_var.get():
+            if self.trace is None:
+                self.trace = TransitionTrace()
+            self.trace.clear()
+            trace = self.trace
+        profiling = self.profile_var.get()
+        self.lexer.stats = self.profile_stats if profiling else None
+        with self.instrumentation.span('lex', 'lexer', chars=len(code)) as span:
+            if trace is None and not profiling:
+                # The background service may already have lexed this text
+                state = self.lexer.result_for(code)
+                if state is not None:
+                    self.tokens = state.tokens
+                else:
+                    self.tokens = self.token_cache.tokenize(self.lexer, code)
+            else:
+                # Cache hits would skip the scan being traced or profiled
+                self.tokens = self.lexer.tokenize(code, trace=trace)
+            span['tokens'] = len(self.tokens)
+        self.lexed_code = code
+        self.lexing_service.update(self.active_tab.document, code)
+        if profiling:
+            self.update_profile()
         self.current_token_index = 0
         # Setup and display DFA visualization (animation will handle tokens)
         self._setup_dfa_visualization()
         # Update output text (not animated)
         # self.update_output()  # Commented out to avoid showing all tokens at once
-        self.status_var.set("Analysis complete!")
+        lexed = self.instrumentation.last('lex')
+        self.status_var.set(f"Analysis complete! {len(self.tokens)} tokens in "
+                            f"{lexed.duration_ns / 1e6:.1f} ms" if lexed else "Analysis complete!")
 
     def _setup_dfa_visualization(self):
-        """Setup the DFA visualization with states and transitions, animated step by step"""
-        # Define states and transitions
-        states = [
-            ("START", False),
-            ("IDENTIFIER", True),
-            ("NUMBER", True),
-            ("STRING", True),
-            ("OPERATOR", True),
-            ("DELIMITER", True),
-            ("COMMENT", True),
-            ("ERROR", False)
-        ]
-        transitions = [
-            ("START", "IDENTIFIER", "letter"),
-            ("IDENTIFIER", "IDENTIFIER", "letter/digit"),
-            ("START", "NUMBER", "digit"),
-            ("NUMBER", "NUMBER", "digit"),
-            ("START", "STRING", '"'),
-            ("STRING", "STRING", "any"),
-            ("STRING", "STRING", '"'),
-            ("START", "OPERATOR", "operator"),
-            ("START", "DELIMITER", "delimiter"),
-            ("START", "COMMENT", "#"),
-            ("COMMENT", "COMMENT", "any"),
-            ("START", "ERROR", "invalid"),
-            ("ERROR", "ERROR", "any")
-        ]
-        # Animate DFA construction, then animate tokens one by one
-        def after_dfa():
-            self.update_token_table()
-            self.display_errors()
-            if self.tokens:
-                self.animate_tokens_one_by_one()
-        self.dfa_visualizer.animate_dfa_construction(states, transitions, on_complete=after_dfa)
+        """Show the lexer's automaton, rebuilding it only when the token patterns change"""
+        signature = self.lexer.patterns_signature()
+        if signature != self._dfa_signature or not self.dfa_visualizer.states:
+            states, transitions = self.lexer.automaton()
+            self.dfa_visualizer.load_automaton(states, transitions)
+            self._dfa_signature = signature
+        elif self.dfa_visualizer.current_state:
+            # Drop the highlight left over from the previous run
+            self.dfa_visualizer.current_state = None
+            self.dfa_visualizer.redraw()
+        self.update_token_table()
+        self.display_errors()
+        if self.trace_var.get() and self.trace is not None and self.trace.total:
+            self.dfa_visualizer.replay_trace(self.trace, on_frame=self.highlight_offset)
+        elif self.tokens:
+            self.animate_tokens_one_by_one()
 
     def step_through(self):
         """Step through the lexer one token at a time"""
@@ -739,7 +1599,7 @@ class MainWindow:
         """Reset the DFA visualization and token analysis"""
         self.dfa_visualizer.reset()
         self.token_tree.delete(*self.token_tree.get_children())
-        self.tokens = []
+        self.tokens = self.table_tokens = []
         self.current_token_index = 0
         self.status_var.set("Visualization reset")
         
@@ -756,8 +1616,9 @@ class MainWindow:
         """Update the animation speed"""
         try:
             speed = float(value)
-            if hasattr(self, 'dfa_visualizer') and self.dfa_visualizer:
-                self.dfa_visualizer.animation_speed = speed
+            self.animation_speed = speed
+            if self._dfa_visualizer is not None:
+                self._dfa_visualizer.animation_speed = speed
                 self.status_var.set(f"Animation speed: {speed}")
         except ValueError:
             pass
@@ -765,30 +1626,223 @@ class MainWindow:
     def highlight_token(self, token):
         """Highlight the current token in the code editor"""
         self.code_editor.tag_remove("current_token", "1.0", "end")
-        start = f"{token.line}.{token.column}"
-        end = f"{token.line}.{token.column + len(token.value)}"
+        start, end = self.token_range(token)
         self.code_editor.tag_add("current_token", start, end)
-        self.code_editor.tag_config("current_token", background="yellow")
         self.code_editor.see(start)
 
+    @staticmethod
+    def token_range(token):
+        """Return the editor start and end indices of a token"""
+        if token.offset is not None:
+            start = f"1.0+{token.offset}c"
+            return start, f"{start}+{len(token.value)}c"
+        return (f"{token.line}.{token.column - 1}",
+                f"{token.line}.{token.column - 1 + len(token.value)}")
+
+    def highlight_offset(self, offset):
+        """Highlight the character at a trace offset in the code editor"""
+        self.code_editor.tag_remove("current_char", "1.0", "end")
+        start = f"1.0+{offset}c"
+        self.code_editor.tag_add("current_char", start, f"{start}+1c")
+        self.code_editor.see(start)
+        self.status_var.set(f"Trace offset {offset}")
+
+    def update_profile(self):
+        """Show the accumulated lexer profile in the Profile tab"""
+        stats = self.profile_stats
+        self._ensure_tab(self.profile_tab)
+        self.profile_tree.delete(*self.profile_tree.get_children())
+        for row in stats.patterns:
+            self.profile_tree.insert("", "end", values=(
+                row.token_type.value, row.pattern, row.attempts, row.hits,
+                f"{row.failed_ns / 1e6:.2f}", f"{row.matched_ns / 1e6:.2f}", row.bytes))
+        histogram = "  ".join(f"{label}:{count}" for label, count in stats.length_histogram()
+                              if count)
+        self.profile_summary.set(
+            f"{stats.runs} runs, {stats.tokens} tokens, {stats.elapsed_ns / 1e6:.1f} ms, "
+            f"{stats.failed_attempts_per_token():.2f} failed attempts per match | "
+            f"lengths {histogram}")
+
+    def reset_profile(self):
+        """Zero the accumulated lexer profile"""
+        self.profile_stats.reset()
+        self._ensure_tab(self.profile_tab)
+        self.profile_tree.delete(*self.profile_tree.get_children())
+        self.profile_summary.set("Profile reset")
+
+    def collect_document_stats(self):
+        """Collect token statistics for the active document on a worker thread"""
+        from lexer.stats import TokenStatistics
+        code = self.code_editor.get("1.0", "end-1c")
+        compiled = self.lexer.compiled()
+        name = self.active_tab.document.name
+
+        def work():
+            stats = TokenStatistics()
+            stats.add_text(code, compiled, name)
+            return stats, []
+        self._collect_stats(work, name)
+
+    def collect_folder_stats(self):
+        """Collect token statistics for every source file under a folder on a worker thread"""
+        folder = filedialog.askdirectory(title="Collect statistics for")
+        if not folder:
+            return
+        from lexer.stats import TokenStatistics
+
+        def work():
+            stats = TokenStatistics()
+            return stats, stats.add_files([folder])
+        self._collect_stats(work, folder)
+
+    def _collect_stats(self, work, name):
+        """Run a statistics collection and show its report when it finishes"""
+        def done(job):
+            if job is not self._stats_job:
+                return  # Superseded by a newer collection
+            self._stats_job = None
+            try:
+                stats, failures = job.result()
+            except Exception as e:
+                messagebox.showerror("Error", f"Could not collect statistics: {str(e)}")
+                self.stats_summary.set("Collection failed")
+                return
+            self.show_statistics(stats, failures, name)
+
+        self._ensure_tab(self.stats_tab)
+        self.stats_summary.set(f"Collecting statistics for {name}...")
+        self._stats_job = self._run_in_background(work, done, 'lexvi-stats')
+
+    def show_statistics(self, stats, failures, name):
+        """Show a statistics report in the Statistics tab"""
+        self._ensure_tab(self.stats_tab)
+        self.stats_output.configure(state='normal')
+        self.stats_output.delete('1.0', 'end')
+        self.stats_output.insert('1.0', stats.report())
+        self.stats_output.configure(state='disabled')
+        summary = f"{name}: {stats.tokens} tokens in {stats.inputs} files"
+        if failures:
+            summary += f", {len(failures)} unreadable"
+        self.stats_summary.set(summary)
+        self.output_notebook.select(self.stats_tab)
+
     def update_token_table(self):
         """Update the token table with current tokens"""
-        self.token_tree.delete(*self.token_tree.get_children())
-        for token in self.tokens:
-            self.token_tree.insert("", "end", values=(
-                token.type.value,
-                token.value,
-                token.line,
-                token.column
-            ))
+        with self.instrumentation.span('table fill', rows=len(self.tokens)):
+            self.token_tree.delete(*self.token_tree.get_children())
+            self._positioned_rows = set()
+            self.table_tokens = list(self.token_pipeline(self.tokens))
+            # Stages may drop or merge tokens, so lexer tokens find their rows by offset
+            self._token_rows = {token.offset: str(index)
+                                for index, token in enumerate(self.table_tokens)}
+            for index, token in enumerate(self.table_tokens):
+                self.token_tree.insert("", "end", iid=str(index), values=(
+                    token.type.value,
+                    token.value,
+                    "",
+                    ""
+                ))
+
+    def _on_token_scroll(self, first, last):
+        """Move the scrollbar and fill in positions for the rows now visible"""
+        self.token_scroll.set(first, last)
+        count = len(self.table_tokens)
+        if not count:
+            return
+        start = int(float(first) * count)
+        stop = min(count, int(float(last) * count) + 1)
+        for index in range(start, stop):
+            if index not in self._positioned_rows and self.token_tree.exists(str(index)):
+                token = self.table_tokens[index]
+                self.token_tree.set(str(index), "Line", token.line)
+                self.token_tree.set(str(index), "Column", token.column)
+                self._positioned_rows.add(index)
+
+    def on_token_double_click(self, event):
+        """Show every use of the double-clicked token's symbol"""
+        row = self.token_tree.identify_row(event.y)
+        if row:
+            self.show_symbol_uses(self.table_tokens[int(row)])
+
+    def show_symbol_uses(self, token):
+        """Select and highlight all tokens sharing a token's symbol"""
+        if token.symbol is None:
+            return
+        uses = self.lexer.symbols.uses(token.symbol)
+        rows = (self._token_rows.get(self.tokens[index].offset) for index in uses)
+        self.token_tree.selection_set([row for row in rows if row is not None])
+        self.code_editor.tag_remove("symbol_use", "1.0", "end")
+        indices = []
+        for index in uses:
+            indices += self.token_range(self.tokens[index])
+        if indices:
+            self.code_editor.tag_add("symbol_use", *indices)
+        self.status_var.set(f"{len(uses)} uses of '{token.value}'")
+
+    # Rows shown per page of the Errors tab
+    ERROR_PAGE_SIZE = 200
 
     def display_errors(self):
-        """Display any lexing errors"""
+        """Show lexing errors in the Errors tab, starting from the first page"""
+        self.error_page_start = 0
+        self.show_error_page(0)
+        if self.lexer.get_errors():
+            self.output_notebook.select(self.errors_tab)
+
+    def show_error_page(self, step):
+        """Move step pages through the error list and fill the table with that page"""
         errors = self.lexer.get_errors()
-        if errors:
-            error_text = "\n".join(f"Line {line}, Column {column}: {error}"
-                                 for error, line, column in errors)
-            messagebox.showerror("Lexing Errors", error_text)
+        last_page = max(0, (len(errors) - 1) // self.ERROR_PAGE_SIZE * self.ERROR_PAGE_SIZE)
+        start = min(max(0, self.error_page_start + step * self.ERROR_PAGE_SIZE), last_page)
+        self.error_page_start = start
+        self._ensure_tab(self.errors_tab)
+        self.error_tree.delete(*self.error_tree.get_children())
+        for index in range(start, min(start + self.ERROR_PAGE_SIZE, len(errors))):
+            message, line, column = errors[index]
+            self.error_tree.insert("", "end", iid=str(index), values=(line, column, message))
+        if not errors:
+            self.error_summary.set("No errors")
+            return
+        summary = f"{start + 1}-{min(start + self.ERROR_PAGE_SIZE, len(errors))} of {len(errors)}"
+        if self.lexer.errors_dropped:
+            summary += f" ({self.lexer.errors_dropped} more not kept)"
+        self.error_summary.set(summary)
+
+    def on_error_double_click(self, event):
+        """Move the editor cursor to the double-clicked error"""
+        row = self.error_tree.identify_row(event.y)
+        if row:
+            _, line, column = self.lexer.get_errors()[int(row)]
+            position = f"{line}.{column - 1}"
+            self.code_editor.mark_set("insert", position)
+            self.code_editor.see(position)
+            self.code_editor.focus_set()
+
+    def on_recovery_change(self, event=None):
+        """Switch every document's error recovery mode and lex the visible one again"""
+        recovery = RecoveryMode(self.recovery_var.get())
+        for tab in self.tabs.values():
+            tab.document.lexer.recovery = recovery
+        self._relex_documents()
+
+    def _skip_types(self):
+        """Token types the scanner drops under the current view options"""
+        return TRIVIA_TYPES - {TokenType.COMMENT} if self.keep_comments_var.get() else TRIVIA_TYPES
+
+    def on_keep_comments_change(self):
+        """Keep or drop comment tokens in every document and lex the visible one again"""
+        skip_types = self._skip_types()
+        for tab in self.tabs.values():
+            tab.document.lexer.SKIP_TYPES = skip_types
+        self._relex_documents()
+
+    def _relex_documents(self):
+        """Lex the visible document now and queue the others after a settings change"""
+        self.run_lexer()
+        for tab in self.tabs.values():
+            if tab is not self.active_tab:
+                self.lexing_service.update(tab.document)
+        self._schedule_lexing_poll()
 
     def export_csv(self):
         """Export tokens to CSV file"""
@@ -798,10 +1852,12 @@ class MainWindow:
         
         if file_name:
             try:
-                with open(file_name, 'w') as f:
-                    f.write("Type,Value,Line,Column\n")
-                    for token in self.lexer.tokens:
-                        f.write(f"{token.type},{token.value},{token.line},{token.column}\n")
+                with open(file_name, 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(("Type", "Value", "Line", "Column"))
+                    # Rows are written as the pipeline yields tokens
+                    writer.writerows((token.type.value, token.value, token.line, token.column)
+                                     for token in self.token_pipeline(self.lexer.tokens))
                 messagebox.showinfo("Success", "Tokens exported successfully!")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to export: {str(e)}")
@@ -878,51 +1934,12 @@ class MainWindow:
             self.output_notebook.select(1)  # Index 1 is the Code Execution tab
 
     def toggle_theme(self):
-        """Toggle between light and dark theme"""
-        if self.theme_var.get():
-            # Dark theme
-            self.root.configure(bg='#1E1E1E')
-            self.code_editor.configure(bg='#1E1E1E', fg='#E0E0E0', insertbackground='#4CAF50')
-            self.token_output.configure(bg='#1E1E1E', fg='#E0E0E0')
-            self.exec_output.configure(bg='#1E1E1E', fg='#E0E0E0')
-            self.speed_scale.configure(style='Dark.Horizontal.TScale')
-            for widget in self.root.winfo_children():
-                if isinstance(widget, ttk.Frame):
-                    widget.configure(style='Dark.TFrame')
-                elif isinstance(widget, ttk.Label):
-                    widget.configure(style='Dark.TLabel')
-                elif isinstance(widget, ttk.Button):
-                    widget.configure(style='Dark.TButton')
-                elif isinstance(widget, ttk.Checkbutton):
-                    widget.configure(style='Dark.TCheckbutton')
-                elif isinstance(widget, ttk.Treeview):
-                    widget.configure(style='Dark.Treeview')
-                elif isinstance(widget, ttk.LabelFrame):
-                    widget.configure(style='Dark.TLabelframe')
-                elif isinstance(widget, ttk.Notebook):
-                    widget.configure(style='Dark.TNotebook')
-        else:
-            # Light theme
-            self.root.configure(bg='#F5F5F5')
-            self.code_editor.configure(bg='#FFFFFF', fg='#333333', insertbackground='#2196F3')
-            self.token_output.configure(bg='#FFFFFF', fg='#333333')
-            self.exec_output.configure(bg='#FFFFFF', fg='#333333')
-            self.speed_scale.configure(style='Light.Horizontal.TScale')
-            for widget in self.root.winfo_children():
-                if isinstance(widget, ttk.Frame):
-                    widget.configure(style='Light.TFrame')
-                elif isinstance(widget, ttk.Label):
-                    widget.configure(style='Light.TLabel')
-                elif isinstance(widget, ttk.Button):
-                    widget.configure(style='Light.TButton')
-                elif isinstance(widget, ttk.Checkbutton):
-                    widget.configure(style='Light.TCheckbutton')
-                elif isinstance(widget, ttk.Treeview):
-                    widget.configure(style='Light.Treeview')
-                elif isinstance(widget, ttk.LabelFrame):
-                    widget.configure(style='Light.TLabelframe')
-                elif isinstance(widget, ttk.Notebook):
-                    widget.configure(style='Light.TNotebook')
+        """Apply the theme selected by theme_var (True for dark)"""
+        self.apply_theme('dark' if self.theme_var.get() else 'light')
+
+    def switch_theme(self):
+        """Flip between the dark and light theme"""
+        self.apply_theme('light' if self.theme == 'dark' else 'dark')
 
     def on_code_change(self, event):
         """Handle code changes in the editor"""
@@ -931,12 +1948,14 @@ class MainWindow:
         
         # Get current code
         code = self.code_editor.get("1.0", "end-1c")
+        self.text_changed(self.active_tab, code)
         
         # If code is empty or only whitespace, reset the visualization
         if not code.strip():
-            self.dfa_visualizer.reset()
+            if self._dfa_visualizer is not None:
+                self._dfa_visualizer.reset()
             self.token_tree.delete(*self.token_tree.get_children())
-            self.tokens = []
+            self.tokens = self.table_tokens = []
             self.current_token_index = 0
             self.status_var.set("Ready")
 
@@ -960,24 +1979,27 @@ class MainWindow:
         self.token_output.tag_remove('current_token', '1.0', 'end')
         def animate_next():
             if self.current_token_index < len(self.tokens):
-                token = self.tokens[self.current_token_index]
-                self.highlight_token(token)
-                # Highlight in token table
-                self.token_tree.selection_set(self.token_tree.get_children()[self.current_token_index])
-                self.token_tree.see(self.token_tree.get_children()[self.current_token_index])
-                # Append to token_output and highlight
-                details = f"Token: {token.type.value}\nValue: {token.value}\nPosition: Line {token.line}, Column {token.column}\n" + ("-" * 40 + "\n")
-                self.token_output.insert('end', details)
-                self.token_output.tag_remove('current_token', '1.0', 'end')
-                # Highlight just the newly added token
-                start_idx = f'end-{len(details)}c'
-                end_idx = 'end'
-                self.token_output.tag_add('current_token', start_idx, end_idx)
-                self.token_output.tag_config('current_token', background='#FFD700', foreground='#23272A')
-                self.token_output.see('end')
-                # Animate DFA state
-                state_id = self.dfa_visualizer.token_type_to_state.get(token.type.value, 'ERROR')
-                self.dfa_visualizer._highlight_state(state_id)
+                with self.instrumentation.span('animation frame'):
+                    token = self.tokens[self.current_token_index]
+                    self.highlight_token(token)
+                    # Highlight in token table, unless the pipeline left the token out
+                    row = self._token_rows.get(token.offset)
+                    if row is not None:
+                        self.token_tree.selection_set(row)
+                        self.token_tree.see(row)
+                    # Append to token_output and highlight
+                    details = f"Token: {token.type.value}\nValue: {token.value}\nPosition: Line {token.line}, Column {token.column}\n" + ("-" * 40 + "\n")
+                    self.token_output.insert('end', details)
+                    self.token_output.tag_remove('current_token', '1.0', 'end')
+                    # Highlight just the newly added token
+                    start_idx = f'end-{len(details)}c'
+                    end_idx = 'end'
+                    self.token_output.tag_add('current_token', start_idx, end_idx)
+                    self.token_output.see('end')
+                    # Animate DFA state
+                    state_id = self.dfa_visualizer.state_for_token(token)
+                    if state_id is not None:
+                        self.dfa_visualizer._highlight_state(state_id)
                 self.current_token_index += 1
                 delay = int(self.speed_scale.get() * 80)
                 self.root.after(delay, animate_next)
@@ -0,0 +1,145 @@
+"""
+Theme module for LexVi
+Defines the dark and light palettes as ttk styles and text tag colors
+
+Widgets are created with the theme-neutral style names below (App.TFrame,
+App.Treeview, ...). Switching themes reconfigures those few styles, the
+handful of plain Tk widgets that ttk styles cannot reach, and the named
+highlight tags; ttk and Tk then redraw every widget using them in one pass.
+The cost depends on the number of style names and tags, not on how many
+widgets exist or how much text is highlighted.
+"""
+
+from tkinter import ttk
+from typing import Dict, Iterable, Optional
+
+# Options shared by both themes: fonts, padding and sizes
+_LAYOUT = {
+    'App.TLabel': {'font': ('Segoe UI', 11)},
+    'App.TButton': {'borderwidth': 0, 'padding': (14, 8), 'font': ('Segoe UI Semibold', 11)},
+    'App.TCheckbutton': {'font': ('Segoe UI', 11)},
+    'App.Treeview': {'rowheight': 28, 'font': ('Segoe UI', 10)},
+    'App.Treeview.Heading': {'font': ('Segoe UI Semibold', 11), 'padding': 7},
+    'App.TLabelframe': {'padding': 14, 'borderwidth': 0},
+    'App.TLabelframe.Label': {'font': ('Segoe UI Semibold', 12)},
+    'App.TNotebook': {'tabmargins': [2, 8, 2, 0], 'borderwidth': 0},
+    'App.TNotebook.Tab': {'padding': [16, 8], 'font': ('Segoe UI', 11), 'borderwidth': 0},
+    'App.Horizontal.TScale': {'sliderthickness': 20, 'sliderlength': 20},
+    'Toolbar.TButton': {'borderwidth': 0, 'padding': (8, 4), 'font': ('Segoe UI', 10)},
+}
+
+DARK = {
+    'styles': {
+        'App.TFrame': {'background': '#181A1B'},
+        'App.TLabel': {'background': '#181A1B', 'foreground': '#F3F3F3'},
+        'App.TButton': {'background': '#23272A', 'foreground': '#4FC3F7'},
+        'App.TCheckbutton': {'background': '#181A1B', 'foreground': '#4FC3F7'},
+        'App.Treeview': {'background': '#23272A', 'foreground': '#F3F3F3',
+                         'fieldbackground': '#23272A'},
+        'App.Treeview.Heading': {'background': '#263238', 'foreground': '#4FC3F7'},
+        'App.TLabelframe': {'background': '#181A1B', 'foreground': '#4FC3F7'},
+        'App.TLabelframe.Label': {'background': '#181A1B', 'foreground': '#4FC3F7'},
+        'App.TNotebook': {'background': '#181A1B'},
+        'App.TNotebook.Tab': {'background': '#23272A', 'foreground': '#F3F3F3'},
+        'App.TSeparator': {'background': '#23272A'},
+        'App.Horizontal.TScale': {'background': '#23272A', 'troughcolor': '#1E1E1E'},
+        'Toolbar.TButton': {'background': '#23272A', 'foreground': '#F3F3F3'},
+    },
+    'maps': {
+        'App.TButton': {'background': [('active', '#263238'), ('pressed', '#263238')],
+                        'foreground': [('active', '#80DEEA')]},
+        'App.TNotebook.Tab': {'background': [('selected', '#263238')],
+                              'foreground': [('selected', '#4FC3F7')]},
+        'Toolbar.TButton': {'background': [('active', '#263238'), ('pressed', '#263238')],
+                            'foreground': [('active', '#4FC3F7')]},
+    },
+    # Plain Tk widgets by role
+    'widgets': {
+        'root': {'bg': '#1E1E1E'},
+        'editor': {'bg': '#1E1E1E', 'fg': '#E0E0E0', 'insertbackground': '#4CAF50'},
+        'output': {'bg': '#1E1E1E', 'fg': '#E0E0E0'},
+        'gutter': {'background': '#1E1E1E', 'foreground': '#858585'},
+        'canvas': {'bg': '#2D2D2D'},
+    },
+    'tags': {
+        'hl_identifier': {'foreground': '#9CDCFE'},
+        'hl_keyword': {'foreground': '#569CD6'},
+        'hl_number': {'foreground': '#B5CEA8'},
+        'hl_operator': {'foreground': '#D4D4D4'},
+        'hl_string': {'foreground': '#CE9178'},
+        'hl_comment': {'foreground': '#6A9955'},
+        'search': {'background': '#4CAF50', 'foreground': 'white'},
+        'current_token': {'background': '#FFD700', 'foreground': '#23272A'},
+        'current_char': {'background': '#FFD700', 'foreground': '#23272A'},
+        'symbol_use': {'background': '#264F78'},
+        'diff_insert': {'background': '#1E3A24'},
+        'diff_delete': {'background': '#4B1D1D'},
+        'diff_change': {'background': '#4A3F14'},
+    },
+}
+
+LIGHT = {
+    'styles': {
+        'App.TFrame': {'background': '#F7F9FA'},
+        'App.TLabel': {'background': '#F7F9FA', 'foreground': '#23272A'},
+        'App.TButton': {'background': '#FFFFFF', 'foreground': '#1976D2'},
+        'App.TCheckbutton': {'background': '#F7F9FA', 'foreground': '#1976D2'},
+        'App.Treeview': {'background': '#FFFFFF', 'foreground': '#23272A',
+                         'fieldbackground': '#FFFFFF'},
+        'App.Treeview.Heading': {'background': '#E3F2FD', 'foreground': '#1976D2'},
+        'App.TLabelframe': {'background': '#F7F9FA', 'foreground': '#1976D2'},
+        'App.TLabelframe.Label': {'background': '#F7F9FA', 'foreground': '#1976D2'},
+        'App.TNotebook': {'background': '#F7F9FA'},
+        'App.TNotebook.Tab': {'background': '#FFFFFF', 'foreground': '#23272A'},
+        'App.TSeparator': {'background': '#E3F2FD'},
+        'App.Horizontal.TScale': {'background': '#FFFFFF', 'troughcolor': '#E3F2FD'},
+        'Toolbar.TButton': {'background': '#FFFFFF', 'foreground': '#23272A'},
+    },
+    'maps': {
+        'App.TButton': {'background': [('active', '#E3F2FD'), ('pressed', '#E3F2FD')],
+                        'foreground': [('active', '#1565C0')]},
+        'App.TNotebook.Tab': {'background': [('selected', '#E3F2FD')],
+                              'foreground': [('selected', '#1976D2')]},
+        'Toolbar.TButton': {'background': [('active', '#E3F2FD'), ('pressed', '#E3F2FD')],
+                            'foreground': [('active', '#1976D2')]},
+    },
+    'widgets': {
+        'root': {'bg': '#F5F5F5'},
+        'editor': {'bg': '#FFFFFF', 'fg': '#333333', 'insertbackground': '#2196F3'},
+        'output': {'bg': '#FFFFFF', 'fg': '#333333'},
+        'gutter': {'background': '#F5F5F5', 'foreground': '#9E9E9E'},
+        'canvas': {'bg': '#ECEFF1'},
+    },
+    'tags': {
+        'hl_identifier': {'foreground': '#001080'},
+        'hl_keyword': {'foreground': '#0000FF'},
+        'hl_number': {'foreground': '#098658'},
+        'hl_operator': {'foreground': '#333333'},
+        'hl_string': {'foreground': '#A31515'},
+        'hl_comment': {'foreground': '#008000'},
+        'search': {'background': '#A5D6A7', 'foreground': '#1B5E20'},
+        'current_token': {'background': '#FFF59D', 'foreground': '#23272A'},
+        'current_char': {'background': '#FFD54F', 'foreground': '#23272A'},
+        'symbol_use': {'background': '#BBDEFB'},
+        'diff_insert': {'background': '#DFF5E1'},
+        'diff_delete': {'background': '#FBE1E1'},
+        'diff_change': {'background': '#FFF4CC'},
+    },
+}
+
+THEMES = {'dark': DARK, 'light': LIGHT}
+
+def apply_theme(theme: dict, widgets: Dict[str, Iterable], tagged: Iterable,
+                style: Optional[ttk.Style] = None):
+    """Configure the shared style names, the Tk widgets by role and the tags of tagged widgets"""
+    style = style or ttk.Style()
+    for name, options in theme['styles'].items():
+        style.configure(name, **_LAYOUT.get(name, {}), **options)
+    for name, options in theme['maps'].items():
+        style.map(name, **options)
+    for role, options in theme['widgets'].items():
+        for widget in widgets.get(role, ()):
+            widget.configure(**options)
+    for widget in tagged:
+        for tag, options in theme['tags'].items():
+            widget.tag_configure(tag, **options)
@@ -0,0 +1,192 @@
+"""
+Accelerated scanning module for LexVi
+Finds identifier, number and whitespace runs with NumPy before the regex pass
+
+The input is mapped to a uint8 character-class array and split into runs of
+word characters, whitespace and everything else with vectorized diff and
+nonzero operations. Word and whitespace runs become tokens without calling
+the regex engine; only the remaining spans (strings, comments, operators,
+delimiters, errors) go through the lexer's master pattern. Line and column
+numbers are computed for all tokens at once from the newline positions.
+
+The shortcut is only exact for the rule table it was derived from, so it
+applies to the built-in Python table on ASCII input. Anything else, or a
+missing NumPy, falls back to the regular scanner.
+"""
+
+import re
+from typing import List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+from lexer.core import PYTHON, CompiledLexer, Lexer, RecoveryMode, ScanState, Token, TokenType
+
+# Character classes: identifier start, digit, whitespace, anything else
+LETTER, DIGIT, SPACE, OTHER = 0, 1, 2, 3
+
+# Coarse run kinds: identifier characters, whitespace, everything else
+WORD_RUN, SPACE_RUN, OTHER_RUN = 0, 1, 2
+
+_table = None
+
+def _class_table():
+    """Classify every ASCII code with the rule patterns themselves"""
+    global _table
+    if _table is None:
+        rules = dict(PYTHON.tokens)
+        letter = re.compile(rules['IDENTIFIER'])
+        whitespace = re.compile(rules['WHITESPACE'])
+        table = np.full(128, OTHER, dtype=np.uint8)
+        for code in range(128):
+            ch = chr(code)
+            if letter.fullmatch(ch):
+                table[code] = LETTER
+            elif re.fullmatch(r'\d', ch):
+                table[code] = DIGIT
+            elif whitespace.fullmatch(ch):
+                table[code] = SPACE
+        _table = table
+    return _table
+
+def supports(compiled: CompiledLexer, code: str) -> bool:
+    """Return True when the accelerated path reproduces compiled.scan exactly"""
+    return (np is not None and code.isascii() and not compiled.fold_keywords
+            and compiled.recovery is RecoveryMode.SKIP_CHAR
+            and TokenType.WHITESPACE in compiled.skip_types
+            and [(t.name, p) for t, p in compiled.token_patterns] == PYTHON.tokens)
+
+def tokenize(lexer: Lexer, code: str) -> Optional[List[Token]]:
+    """Tokenize like lexer.tokenize, leaving the same state; None if unsupported"""
+    state = scan(lexer.compiled(), code)
+    if state is None:
+        return None
+    lexer.publish(state)
+    return lexer.tokens
+
+def scan(compiled: CompiledLexer, code: str) -> Optional[ScanState]:
+    """Return the finished state compiled.scan would produce; None if unsupported"""
+    if not supports(compiled, code):
+        return None
+    n = len(code)
+    data = np.frombuffer(code.encode('ascii'), dtype=np.uint8)
+    classes = _class_table()[data]
+    # Letters and digits share word runs; whitespace and the rest get their own
+    kinds = np.maximum(classes, DIGIT) - DIGIT
+    boundaries = np.flatnonzero(kinds[1:] != kinds[:-1]) + 1
+    run_starts = np.insert(boundaries, 0, 0)
+    run_ends = np.append(boundaries, n)
+    run_kinds = kinds[run_starts] if n else kinds[:0]
+
+    # Only runs of other characters need the regex engine. A match may run on
+    # into later runs (strings, comments); those stretches are remembered so
+    # the word runs inside them are skipped below.
+    scanner = compiled.scanner
+    match_at = scanner.regex.match
+    group_types = scanner.group_types
+    skipped = compiled.skip_types
+    # Regex tokens as (start, end, type); type None marks an error
+    regex_spans = []
+    covered_starts = []
+    covered_ends = []
+    pos = 0
+    other = run_kinds == OTHER_RUN
+    for start, end in zip(run_starts[other].tolist(), run_ends[other].tolist()):
+        if end <= pos:
+            continue
+        pos = max(start, pos)
+        while pos < end:
+            match = match_at(code, pos)
+            if match:
+                token_type = group_types[match.lastindex]
+                if token_type not in skipped:
+                    regex_spans.append((pos, match.end(), token_type))
+                pos = match.end()
+            else:
+                regex_spans.append((pos, pos + 1, None))
+                pos += 1
+        if pos > end:
+            covered_starts.append(end)
+            covered_ends.append(pos)
+
+    # Word runs outside covered stretches are identifiers or integers
+    word = run_kinds == WORD_RUN
+    word_starts = run_starts[word]
+    word_ends = run_ends[word]
+    if covered_starts:
+        inside = np.searchsorted(np.array(covered_starts), word_starts, side='right') - 1
+        hidden = (inside >= 0) & (word_starts < np.array(covered_ends)[np.maximum(inside, 0)])
+        word_starts = word_starts[~hidden]
+        word_ends = word_ends[~hidden]
+    letters = np.concatenate(([0], np.cumsum(classes == LETTER)))
+    starts_with_digit = classes[word_starts] == DIGIT
+    has_letter = letters[word_ends] > letters[word_starts]
+    # Digits running into letters match no pattern: one error per leading digit
+    mixed = starts_with_digit & has_letter
+    for start, end in zip(word_starts[mixed].tolist(), word_ends[mixed].tolist()):
+        first_letter = start
+        while code[first_letter].isdigit():
+            regex_spans.append((first_letter, first_letter + 1, None))
+            first_letter += 1
+        regex_spans.append((first_letter, end, TokenType.IDENTIFIER))
+    plain = ~mixed
+    word_starts = word_starts[plain]
+    word_ends = word_ends[plain]
+    word_types = starts_with_digit[plain]
+
+    # Merge both token streams by position
+    types = [TokenType.IDENTIFIER, TokenType.INTEGER] + [t for _, _, t in regex_spans]
+    starts = np.concatenate((word_starts,
+                             np.fromiter((s for s, _, _ in regex_spans), dtype=np.int64,
+                                         count=len(regex_spans))))
+    ends = np.concatenate((word_ends,
+                           np.fromiter((e for _, e, _ in regex_spans), dtype=np.int64,
+                                       count=len(regex_spans))))
+    type_index = np.concatenate((word_types.astype(np.int64),
+                                 np.arange(2, 2 + len(regex_spans), dtype=np.int64)))
+    order = np.argsort(starts, kind='stable')
+    starts = starts[order]
+    ends = ends[order]
+    type_index = type_index[order]
+
+    # Line is one past the newlines before a token; column counts from the last one
+    newlines = np.flatnonzero(data == 10)
+    before = np.searchsorted(newlines, starts)
+    columns = (starts - np.insert(newlines, 0, -1)[before]).tolist()
+    lines = (before + 1).tolist()
+
+    state = compiled.start(code)
+    tokens = state.tokens
+    record = state.symbols.record
+    keywords = compiled.keywords
+    symbol_types = compiled.symbol_types
+    identifier = TokenType.IDENTIFIER
+    keyword = TokenType.KEYWORD
+    # Adjacent unrecognized characters are reported as one span
+    error_start = error_end = -1
+    error_line = error_column = 0
+    for start, end, index, line, column in zip(starts.tolist(), ends.tolist(),
+                                               type_index.tolist(), lines, columns):
+        token_type = types[index]
+        if token_type is None:
+            if start != error_end:
+                if error_start >= 0:
+                    state.add_error(code[error_start:error_end], error_line, error_column)
+                error_start, error_line, error_column = start, line, column
+            error_end = end
+            continue
+        value = code[start:end]
+        if token_type is identifier and value in keywords:
+            token_type = keyword
+        symbol = None
+        if token_type in symbol_types:
+            symbol, value = record(value, len(tokens))
+        tokens.append(Token(token_type, value, line, column, symbol, start))
+    if error_start >= 0:
+        state.add_error(code[error_start:error_end], error_line, error_column)
+    state.pos = n
+    state.line = len(newlines) + 1
+    state.column = n - (int(newlines[-1]) if len(newlines) else -1)
+    return state
@@ -0,0 +1,83 @@
+"""
+Asyncio module for LexVi
+Tokenizes asyncio streams without blocking the event loop
+
+The text is read chunk by chunk with awaits in between, then scanned in
+slices. Short slices run inline, with a yield to the event loop after each;
+longer ones go to an executor. Each call compiles the lexer's settings
+once and then touches only its own ScanState, so one Lexer can serve any
+number of concurrent calls. Scans made here are not profiled into
+lexer.stats, which is shared by every user of the lexer.
+
+Scanning starts once the stream is exhausted. A token pattern may look
+arbitrarily far ahead (an unterminated string or block comment falls back
+to other rules), so scanning a partial input could give different tokens.
+"""
+
+import asyncio
+import codecs
+from concurrent.futures import Executor
+from typing import AsyncIterator, Optional
+
+from lexer.core import Lexer, ScanState, Token
+
+# Bytes requested per read from the stream
+READ_SIZE = 1 << 16
+
+# Characters scanned per slice before control returns to the event loop
+SLICE_SIZE = 1 << 16
+
+# Slices at most this long are scanned on the event loop itself
+INLINE_SLICE_SIZE = 1 << 12
+
+async def read_text(stream, encoding: str = 'utf-8', errors: str = 'replace',
+                    read_size: int = READ_SIZE) -> str:
+    """Read a whole stream (anything with ``async read(n)``) and decode it incrementally"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    parts = []
+    while True:
+        data = await stream.read(read_size)
+        if not data:
+            break
+        parts.append(decoder.decode(data) if isinstance(data, bytes) else data)
+    parts.append(decoder.decode(b'', final=True))
+    return ''.join(parts)
+
+async def scan_text(code: str, lexer: Optional[Lexer] = None,
+                    executor: Optional[Executor] = None,
+                    slice_size: int = SLICE_SIZE) -> AsyncIterator[ScanState]:
+    """Scan code in slices, yielding the state after each; the last one is finished"""
+    compiled = (lexer or Lexer()).compiled()
+    state = compiled.start(code)
+    loop = asyncio.get_running_loop()
+    while not state.done:
+        stop = state.pos + slice_size
+        if slice_size <= INLINE_SLICE_SIZE:
+            compiled.scan(state, stop)
+            await asyncio.sleep(0)
+        else:
+            await loop.run_in_executor(executor, compiled.scan, state, stop)
+        yield state
+    if not code:
+        yield state
+
+async def aiter_tokens(stream, lexer: Optional[Lexer] = None, encoding: str = 'utf-8',
+                       executor: Optional[Executor] = None,
+                       slice_size: int = SLICE_SIZE) -> AsyncIterator[Token]:
+    """Yield the tokens of a stream as each slice of it is scanned"""
+    code = await read_text(stream, encoding)
+    emitted = 0
+    async for state in scan_text(code, lexer, executor, slice_size):
+        for token in state.tokens[emitted:]:
+            yield token
+        emitted = len(state.tokens)
+
+async def atokenize(stream, lexer: Optional[Lexer] = None, encoding: str = 'utf-8',
+                    executor: Optional[Executor] = None,
+                    slice_size: int = SLICE_SIZE) -> ScanState:
+    """Tokenize a stream; returns the finished state with tokens, errors and symbols"""
+    code = await read_text(stream, encoding)
+    state = None
+    async for state in scan_text(code, lexer, executor, slice_size):
+        pass
+    return state
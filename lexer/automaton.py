@@ -0,0 +1,159 @@
+"""
+Automaton derivation module for LexVi
+Builds the displayed state diagram from the lexer's token patterns
+"""
+
+import hashlib
+from functools import lru_cache
+from typing import AbstractSet, List, Sequence, Tuple
+
+try:
+    import re._parser as sre_parse
+    from re._constants import (ANY, AT, BRANCH, CATEGORY, CATEGORY_DIGIT, CATEGORY_SPACE,
+                               CATEGORY_WORD, IN, LITERAL, MAX_REPEAT, MIN_REPEAT, NEGATE,
+                               NOT_LITERAL, RANGE, SUBPATTERN)
+except ImportError:  # Python < 3.11
+    import sre_parse
+    from sre_constants import (ANY, AT, BRANCH, CATEGORY, CATEGORY_DIGIT, CATEGORY_SPACE,
+                               CATEGORY_WORD, IN, LITERAL, MAX_REPEAT, MIN_REPEAT, NEGATE,
+                               NOT_LITERAL, RANGE, SUBPATTERN)
+
+START_STATE = 'START'
+ERROR_STATE = 'ERROR'
+KEYWORD_STATE = 'KEYWORD'
+
+# Longest transition label drawn on the canvas
+MAX_LABEL_LENGTH = 12
+
+_CATEGORY_LABELS = {
+    CATEGORY_DIGIT: 'digit',
+    CATEGORY_SPACE: 'space',
+    CATEGORY_WORD: 'word',
+}
+
+def _shorten(label: str) -> str:
+    if len(label) > MAX_LABEL_LENGTH:
+        return label[:MAX_LABEL_LENGTH - 1] + '…'
+    return label
+
+def _charset_label(items) -> str:
+    """Describe a character class such as [a-zA-Z_] in a few characters"""
+    parts = []
+    negate = False
+    for op, av in items:
+        if op is NEGATE:
+            negate = True
+        elif op is LITERAL:
+            parts.append(chr(av))
+        elif op is RANGE:
+            parts.append(f'{chr(av[0])}-{chr(av[1])}')
+        elif op is CATEGORY:
+            parts.append(_CATEGORY_LABELS.get(av, 'class'))
+    label = ''.join(parts)
+    return f'^{label}' if negate else label
+
+def _first(items) -> Tuple[List[str], bool]:
+    """Return the labels of characters a pattern can start with and whether it can be empty"""
+    labels: List[str] = []
+    for op, av in items:
+        item_labels, nullable = _first_item(op, av)
+        for label in item_labels:
+            if label not in labels:
+                labels.append(label)
+        if not nullable:
+            return labels, False
+    return labels, True
+
+def _first_item(op, av) -> Tuple[List[str], bool]:
+    if op is LITERAL:
+        return [chr(av)], False
+    if op is NOT_LITERAL:
+        return [f'^{chr(av)}'], False
+    if op is ANY:
+        return ['any'], False
+    if op is IN:
+        return [_charset_label(av)], False
+    if op is AT:
+        return [], True
+    if op is SUBPATTERN:
+        return _first(av[-1])
+    if op is BRANCH:
+        labels: List[str] = []
+        nullable = False
+        for branch in av[1]:
+            branch_labels, branch_nullable = _first(branch)
+            labels.extend(label for label in branch_labels if label not in labels)
+            nullable = nullable or branch_nullable
+        return labels, nullable
+    if op in (MAX_REPEAT, MIN_REPEAT):
+        low, _high, body = av
+        labels, nullable = _first(body)
+        return labels, nullable or low == 0
+    return ['other'], False
+
+def _loops(items) -> List[str]:
+    """Return labels for characters a pattern can consume repeatedly"""
+    labels: List[str] = []
+    for op, av in items:
+        found: List[str] = []
+        if op in (MAX_REPEAT, MIN_REPEAT):
+            _low, high, body = av
+            if high is None or high > 1:
+                found = _first(body)[0]
+            found += _loops(body)
+        elif op is SUBPATTERN:
+            found = _loops(av[-1])
+        elif op is BRANCH:
+            for branch in av[1]:
+                found += _loops(branch)
+        labels.extend(label for label in found if label not in labels)
+    return labels
+
+def patterns_signature(token_patterns: Sequence[Tuple],
+                       keywords: AbstractSet[str] = frozenset(),
+                       fold_keywords: bool = False) -> str:
+    """Return a stable hash of a token pattern table and keyword set"""
+    digest = hashlib.sha1()
+    for token_type, pattern in token_patterns:
+        digest.update(f'{token_type.value}\0{pattern}\0'.encode('utf-8'))
+    digest.update('\0'.join(sorted(keywords)).encode('utf-8'))
+    if fold_keywords:
+        digest.update(b'\0fold')
+    return digest.hexdigest()
+
+@lru_cache(maxsize=8)
+def _build(definitions: Tuple[Tuple[str, str], ...], keywords: frozenset):
+    states = [(START_STATE, False)]
+    transitions = []
+    if keywords:
+        # Keywords are identifiers found in the keyword table
+        states.append((KEYWORD_STATE, True))
+        initials = ''.join(sorted({keyword[0] for keyword in keywords}))
+        transitions.append((START_STATE, KEYWORD_STATE, _shorten(initials)))
+    for state, pattern in definitions:
+        parsed = sre_parse.parse(pattern)
+        if (state, True) not in states:
+            # Several rules may produce the same token type
+            states.append((state, True))
+        first, _nullable = _first(parsed)
+        transitions.append((START_STATE, state, _shorten('|'.join(first))))
+        loops = _loops(parsed)
+        if loops:
+            transitions.append((state, state, _shorten('|'.join(loops))))
+    states.append((ERROR_STATE, False))
+    transitions.append((START_STATE, ERROR_STATE, 'other'))
+    return tuple(states), tuple(transitions)
+
+def build_automaton(token_patterns: Sequence[Tuple], keywords: AbstractSet[str] = frozenset()
+                    ) -> Tuple[List[Tuple[str, bool]], List[Tuple[str, str, str]]]:
+    """Derive (states, transitions) for the DFA view from a token pattern table
+
+    There is one accepting state per token type, entered from START on the
+    characters its pattern can begin with and looping on the characters it
+    repeats, plus a KEYWORD state when a keyword table is given. Results are
+    cached per pattern table.
+    """
+    states, transitions = _build(tuple((token_type.value, pattern)
+                                       for token_type, pattern in token_patterns),
+                                 frozenset(keywords))
+    return list(states), list(transitions)
@@ -0,0 +1,297 @@
+"""
+Token cache module for LexVi
+Persists token streams on disk, keyed by input content and lexer patterns
+
+Each entry is one file laid out as columns so it can be mapped with mmap
+and read without parsing:
+
+    header     magic, version, section sizes and dropped error count
+    types      uint8 per token (index into TokenType)
+    values     uint32 per token (index into the string table)
+    lines      uint32 per token
+    columns    uint32 per token
+    offsets    uint32 per token (character offset in the input)
+    errors     uint32 message index, line, column per error
+    uses       symbol use lists, concatenated in symbol order, plus offsets
+    strings    uint32 offsets followed by the UTF-8 blob
+
+The first entries of the string table are the symbol table names, so a
+token's value index is also its symbol id. The symbol table itself is only
+rebuilt from the file when it is first used.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+from lexer.core import Lexer, Token, TokenType
+from lexer.symbols import SymbolTable
+
+MAGIC = b'LXVT'
+VERSION = 4
+# magic, version, tokens, errors, symbols, strings, uses, blob bytes, dropped errors
+_HEADER = struct.Struct('<4sHxxIIIIIII')
+_TYPES = list(TokenType)
+_TYPE_INDEX = {token_type: index for index, token_type in enumerate(_TYPES)}
+
+def _padded(n: int) -> int:
+    return (n + 3) & ~3
+
+class CachedTokens(Sequence):
+    """Read-only token sequence backed by a mapped cache file
+
+    Token objects are only built for the rows that are accessed. The file
+    stays mapped while the sequence (or the symbol table loaded with it) is
+    referenced.
+    """
+
+    def __init__(self, types, values, lines, columns, offsets, strings, symbol_count: int):
+        self._types = types
+        self._values = values
+        self._lines = lines
+        self._columns = columns
+        self._offsets = offsets
+        self._strings = strings
+        self._symbol_count = symbol_count
+
+    def __len__(self) -> int:
+        return len(self._types)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        value = self._values[index]
+        token_type = _TYPES[self._types[index]]
+        symbol = value if value < self._symbol_count else None
+        return Token(token_type, self._strings(value), self._lines[index],
+                     self._columns[index], symbol, self._offsets[index])
+
+class _StringTable:
+    """Lazily decodes strings from the mapped blob"""
+
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+        self._decoded: Dict[int, str] = {}
+
+    def __call__(self, index: int) -> str:
+        text = self._decoded.get(index)
+        if text is None:
+            start, end = self._offsets[index], self._offsets[index + 1]
+            text = bytes(self._blob[start:end]).decode('utf-8', 'surrogatepass')
+            self._decoded[index] = text
+        return text
+
+class _MappedSymbols(SymbolTable):
+    """Symbol table read from a mapped cache file on first use"""
+
+    def __init__(self, strings: _StringTable, uses, use_offsets):
+        self._mapped = (strings, uses, use_offsets)
+        self._table: Optional[SymbolTable] = None
+
+    def _built(self) -> SymbolTable:
+        if self._table is None:
+            strings, uses, use_offsets = self._mapped
+            self._table = SymbolTable.from_parts(
+                [strings(i) for i in range(len(use_offsets) - 1)],
+                [array('I', uses[use_offsets[i]:use_offsets[i + 1]])
+                 for i in range(len(use_offsets) - 1)])
+            self._mapped = None
+        return self._table
+
+    @property
+    def _ids(self) -> Dict[str, int]:
+        return self._built()._ids
+
+    @property
+    def _names(self) -> List[str]:
+        return self._built()._names
+
+    @property
+    def _uses(self) -> List[array]:
+        return self._built()._uses
+
+class TokenCache:
+    """Content-addressed token stream cache with LRU eviction by total size"""
+
+    SUFFIX = '.lxt'
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 512 * 1024 * 1024):
+        if directory is None:
+            directory = os.path.join(os.path.expanduser('~'), '.cache', 'lexvi', 'tokens')
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(code: str, lexer: Lexer) -> str:
+        """Return the cache key for lexing code with this lexer's patterns, error settings
+        and skipped and interned token types"""
+        digest = hashlib.sha256()
+        skip = ','.join(sorted(token_type.name for token_type in lexer.SKIP_TYPES))
+        interned = ','.join(sorted(token_type.name for token_type in lexer.SYMBOL_TYPES))
+        digest.update(f'{VERSION}\0{lexer.patterns_signature()}\0{lexer.recovery.name}\0'
+                      f'{lexer.MAX_ERRORS}\0{skip}\0{interned}\0'.encode('ascii'))
+        digest.update(code.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def tokenize(self, lexer: Lexer, code: str) -> Sequence[Token]:
+        """Tokenize through the cache, leaving lexer.tokens/errors/symbols set either way"""
+        key = self.key(code, lexer)
+        if self.load(key, lexer):
+            return lexer.tokens
+        tokens = lexer.tokenize(code)
+        try:
+            self.store(key, lexer)
+        except OSError:
+            pass  # A cache that cannot be written only costs speed
+        return tokens
+
+    def load(self, key: str, lexer: Lexer) -> bool:
+        """Load a cached result into the lexer; return False on a miss"""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        try:
+            os.utime(path)  # Mark as recently used
+            result = self._read(memoryview(mapped))
+        except (OSError, ValueError, struct.error):
+            result = None
+        if result is None:
+            # Closed once the failed read's views are gone; a hit keeps the file
+            # mapped for as long as its tokens and symbols are in use
+            mapped.close()
+            return False
+        tokens, errors, dropped, symbols = result
+        lexer.reset()
+        lexer.state = None  # Cached results cannot be relexed
+        lexer.tokens = tokens
+        lexer.errors = errors
+        lexer.errors_dropped = dropped
+        lexer.symbols = symbols
+        return True
+
+    @staticmethod
+    def _read(view: memoryview) -> Tuple[CachedTokens, List[Tuple[str, int, int]], int,
+                                         SymbolTable]:
+        magic, version, n_tokens, n_errors, n_symbols, n_strings, n_uses, blob_size, dropped = \
+            _HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a LexVi token cache file")
+        offset = _HEADER.size
+
+        def take(count: int, fmt: str, itemsize: int):
+            nonlocal offset
+            if offset + count * itemsize > len(view):
+                raise ValueError("Truncated token cache file")
+            column = view[offset:offset + count * itemsize].cast(fmt)
+            offset = _padded(offset + count * itemsize)
+            return column
+
+        types = take(n_tokens, 'B', 1)
+        values = take(n_tokens, 'I', 4)
+        lines = take(n_tokens, 'I', 4)
+        columns = take(n_tokens, 'I', 4)
+        offsets = take(n_tokens, 'I', 4)
+        error_rows = take(3 * n_errors, 'I', 4)
+        uses = take(n_uses, 'I', 4)
+        use_offsets = take(n_symbols + 1, 'I', 4)
+        string_offsets = take(n_strings + 1, 'I', 4)
+        blob = view[offset:offset + blob_size]
+        if len(blob) != blob_size:
+            raise ValueError("Truncated token cache file")
+
+        strings = _StringTable(string_offsets, blob)
+        symbols = _MappedSymbols(strings, uses, use_offsets)
+        errors = [(strings(error_rows[i]), error_rows[i + 1], error_rows[i + 2])
+                  for i in range(0, len(error_rows), 3)]
+        return (CachedTokens(types, values, lines, columns, offsets, strings, n_symbols), errors, dropped,
+                symbols)
+
+    def store(self, key: str, lexer: Lexer):
+        """Write the lexer's current result under key and evict old entries"""
+        symbols = lexer.symbols
+        strings: List[str] = list(symbols)
+        index: Dict[str, int] = {text: i for i, text in enumerate(strings)}
+
+        def string_id(text: str) -> int:
+            i = index.get(text)
+            if i is None:
+                i = index[text] = len(strings)
+                strings.append(text)
+            return i
+
+        tokens = lexer.tokens
+        types = array('B', (_TYPE_INDEX[token.type] for token in tokens))
+        values = array('I', (token.symbol if token.symbol is not None else string_id(token.value)
+                             for token in tokens))
+        lines = array('I', (token.line for token in tokens))
+        columns = array('I', (token.column for token in tokens))
+        offsets = array('I', (token.offset or 0 for token in tokens))
+        error_rows = array('I')
+        for message, line, column in lexer.errors:
+            error_rows.extend((string_id(message), line, column))
+        uses = array('I')
+        use_offsets = array('I', [0])
+        for symbol in range(len(symbols)):
+            uses.extend(symbols.uses(symbol))
+            use_offsets.append(len(uses))
+        encoded = [text.encode('utf-8', 'surrogatepass') for text in strings]
+        string_offsets = array('I', [0])
+        for data in encoded:
+            string_offsets.append(string_offsets[-1] + len(data))
+        blob = b''.join(encoded)
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_HEADER.pack(MAGIC, VERSION, len(tokens), len(lexer.errors),
+                                     len(symbols), len(strings), len(uses), len(blob),
+                                     lexer.errors_dropped))
+                for column in (types, values, lines, columns, offsets, error_rows, uses,
+                               use_offsets, string_offsets):
+                    data = column.tobytes()
+                    f.write(data + bytes(_padded(len(data)) - len(data)))
+                f.write(blob)
+            os.replace(tmp_path, self.path(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(self.SUFFIX):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass  # Still mapped elsewhere; try again next time
+
+    def clear(self):
+        """Remove every cached entry"""
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(self.SUFFIX):
+                    os.remove(os.path.join(self.directory, name))
@@ -4,8 +4,15 @@ Contains token definitions and the main lexer class
 """
 
 import re
+import time
 from enum import Enum
-from typing import List, Tuple, Optional
+from typing import Callable, Dict, Iterator, List, Tuple, Optional
+from lexer.automaton import START_STATE, ERROR_STATE, build_automaton, patterns_signature
+from lexer.language import LanguageDefinition, load_language, master_pattern
+from lexer.positions import LineIndex
+from lexer.profile import LexerStats
+from lexer.symbols import NullSymbolTable, SymbolTable
+from lexer.trace import TransitionTrace
 
 class TokenType(Enum):
     """Enumeration of possible token types"""
@@ -22,75 +29,566 @@ class TokenType(Enum):
 
 class Token:
     """Class representing a lexical token"""
-    def __init__(self, type: TokenType, value: str, line: int, column: int):
+    __slots__ = ('type', 'value', 'line', 'column', 'symbol', 'offset')
+    
+    def __init__(self, type: TokenType, value: str, line: int, column: int,
+                 symbol: Optional[int] = None, offset: Optional[int] = None):
         self.type = type
         self.value = value
         self.line = line
         self.column = column
+        # Symbol table id for interned spellings (identifiers, keywords, operators, delimiters)
+        self.symbol = symbol
+        # Character offset of the token in the lexed input
+        self.offset = offset
+
+    @property
+    def length(self) -> int:
+        return len(self.value)
 
     def __str__(self):
         return f"Token({self.type}, '{self.value}', line={self.line}, column={self.column})"
 
+class OffsetToken(Token):
+    """Token that stores only its offset; line and column are looked up when read"""
+    __slots__ = ('positions',)
+    
+    def __init__(self, type: TokenType, value: str, offset: int, positions: LineIndex,
+                 symbol: Optional[int] = None):
+        self.type = type
+        self.value = value
+        self.offset = offset
+        self.symbol = symbol
+        self.positions = positions
+
+    @property
+    def line(self) -> int:
+        return self.positions.line(self.offset)
+
+    @property
+    def column(self) -> int:
+        return self.positions.column(self.offset)
+
+class RecoveryMode(Enum):
+    """How far the lexer skips after input that no pattern matches"""
+    SKIP_CHAR = "skip char"
+    SKIP_TO_WHITESPACE = "skip to whitespace"
+    SKIP_LINE = "skip line"
+
+# End of the text skipped by each recovery mode, as a pattern matched at the error
+_RECOVERY_PATTERNS = {
+    RecoveryMode.SKIP_CHAR: re.compile(r'.', re.DOTALL),
+    RecoveryMode.SKIP_TO_WHITESPACE: re.compile(r'\S+'),
+    RecoveryMode.SKIP_LINE: re.compile(r'[^\n]+'),
+}
+
+# Longest unrecognized text quoted in full in an error message
+MAX_ERROR_TEXT = 32
+
+# The built-in default language
+PYTHON = load_language('python')
+
+# Reserved words; identifiers are matched once and then looked up here
+PYTHON_KEYWORDS = PYTHON.keywords
+
+class Scanner:
+    """A token pattern table merged into one master regex, compiled once per table"""
+
+    def __init__(self, token_patterns):
+        self.regex = re.compile(master_pattern(token_patterns))
+        # Token type for each group number; match.lastindex is the outer rule group
+        self.group_types: List[Optional[TokenType]] = [None] * (self.regex.groups + 1)
+        for i, (token_type, _) in enumerate(token_patterns):
+            self.group_types[self.regex.groupindex[f'_t{i}']] = token_type
+
+_scanners: Dict[str, Scanner] = {}
+
+class ScanState:
+    """Progress and results of one scan, kept apart from the scanner tables
+
+    A CompiledLexer holds only configuration, so one instance can run any
+    number of scans at once, each with its own state; a scan can also be
+    resumed in slices.
+    """
+
+    def __init__(self, code: str, max_errors: int = 1000):
+        self.code = code
+        self.pos = 0
+        self.line = 1
+        self.column = 1
+        self.tokens: List[Token] = []
+        self.errors: List[Tuple[str, int, int]] = []
+        self.errors_dropped = 0
+        self.max_errors = max_errors
+        self.symbols = SymbolTable()
+        # Start, line and column of unrecognized text not yet reported, if any
+        self.error_start: Optional[int] = None
+        self.error_line = 0
+        self.error_column = 0
+        self._line_index: Optional[LineIndex] = None
+
+    @property
+    def done(self) -> bool:
+        return self.pos >= len(self.code)
+
+    @property
+    def line_index(self) -> LineIndex:
+        """Line start offsets of the input, built on first use"""
+        if self._line_index is None:
+            self._line_index = LineIndex(self.code)
+        return self._line_index
+
+    def add_error(self, text: str, line: int, column: int):
+        """Report a span of unrecognized text, keeping at most max_errors entries"""
+        if len(self.errors) >= self.max_errors:
+            self.errors_dropped += 1
+            return
+        if len(text) > MAX_ERROR_TEXT:
+            text = f"{text[:MAX_ERROR_TEXT]}… ({len(text)} chars)"
+        self.errors.append((f"Unrecognized token: {text}", line, column))
+
+# Inputs at least this long try the accelerated scanner first
+ACCELERATE_MIN_LENGTH = 1 << 16
+
+# Characters scanned per slice by iter_tokens; only one slice's tokens are held at a time
+ITER_SLICE_SIZE = 1 << 16
+
+# Token types the scanner drops by default (layout and comments)
+TRIVIA_TYPES = frozenset([TokenType.WHITESPACE, TokenType.COMMENT])
+
+# Token types whose spellings are interned in the symbol table
+SYMBOL_TYPES = frozenset([TokenType.IDENTIFIER, TokenType.KEYWORD,
+                          TokenType.OPERATOR, TokenType.DELIMITER])
+
+def _first_ending_after(tokens: List[Token], offset: int) -> int:
+    """Return the index of the first token that ends after offset (tokens are in order)"""
+    low, high = 0, len(tokens)
+    while low < high:
+        middle = (low + high) // 2
+        token = tokens[middle]
+        if token.offset + len(token.value) <= offset:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+def changed_span(old: List[Token], new: List[Token], delta: int) -> Optional[Tuple[int, int]]:
+    """Return the offsets in the new text spanned by the tokens an edit changed
+
+    old and new are the tokens before and after an edit that changed the
+    text length by delta; tokens in the common head are equal, tokens in the
+    common tail are equal but moved by delta. Returns None if no token of new
+    is changed, as when tokens were only removed.
+    """
+    limit = min(len(old), len(new))
+    head = 0
+    while head < limit and _same_token(old[head], new[head], 0):
+        head += 1
+    tail = 0
+    while tail < limit - head and _same_token(old[-1 - tail], new[-1 - tail], delta):
+        tail += 1
+    if head == len(new) - tail:
+        return None
+    first, last = new[head], new[len(new) - tail - 1]
+    return first.offset, last.offset + len(last.value)
+
+def _same_token(old: Token, new: Token, delta: int) -> bool:
+    return (old.type is new.type and old.value == new.value
+            and old.offset is not None and new.offset == old.offset + delta)
+
+class _LineCursor:
+    """Line and column of offsets visited in increasing order, counted as it goes"""
+    __slots__ = ('code', 'pos', 'line', 'column')
+
+    def __init__(self, code: str, pos: int, line: int, column: int):
+        self.code = code
+        self.pos = pos
+        self.line = line
+        self.column = column
+
+    def line_column(self, offset: int) -> Tuple[int, int]:
+        code = self.code
+        lines = code.count('\n', self.pos, offset)
+        if lines:
+            self.line += lines
+            self.column = offset - code.rindex('\n', self.pos, offset)
+        else:
+            self.column += offset - self.pos
+        self.pos = offset
+        return self.line, self.column
+
+class CompiledLexer:
+    """Immutable scanner tables and settings, shareable between threads
+
+    All per-run data lives in the ScanState passed to each call, so any
+    number of threads can scan with one instance. CPython's regex engine
+    holds the GIL while matching, so threads only run scans in parallel on
+    free-threaded builds; elsewhere they still share the compiled tables.
+    """
+    __slots__ = ('token_patterns', 'keywords', 'fold_keywords', 'symbol_types', 'recovery',
+                 'max_errors', 'track_lines', 'skip_types', 'signature', 'scanner')
+
+    def __init__(self, token_patterns, keywords=frozenset(), fold_keywords: bool = False,
+                 symbol_types=SYMBOL_TYPES, recovery: RecoveryMode = RecoveryMode.SKIP_CHAR,
+                 max_errors: int = 1000, track_lines: bool = True,
+                 skip_types=TRIVIA_TYPES):
+        token_patterns = tuple(token_patterns)
+        signature = patterns_signature(token_patterns, keywords, fold_keywords)
+        scanner = _scanners.get(signature)
+        if scanner is None:
+            scanner = _scanners[signature] = Scanner(token_patterns)
+        for name, value in (('token_patterns', token_patterns), ('keywords', frozenset(keywords)),
+                            ('fold_keywords', fold_keywords),
+                            ('symbol_types', frozenset(symbol_types)), ('recovery', recovery),
+                            ('max_errors', max_errors), ('track_lines', track_lines),
+                            ('skip_types', frozenset(skip_types)),
+                            ('signature', signature),
+                            ('scanner', scanner)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CompiledLexer is immutable")
+
+    @classmethod
+    def for_language(cls, language: LanguageDefinition, **settings) -> 'CompiledLexer':
+        """Compile a language definition"""
+        return cls([(TokenType[name], pattern) for name, pattern in language.tokens],
+                   language.keywords, language.fold_keywords, **settings)
+
+    def tokenize(self, code: str, trace: Optional[TransitionTrace] = None,
+                 stats: Optional[LexerStats] = None, accelerate: Optional[bool] = None
+                 ) -> ScanState:
+        """Scan all of code and return the finished state
+
+        accelerate defaults to trying the NumPy pre-pass for inputs of at
+        least ACCELERATE_MIN_LENGTH characters.
+        """
+        if accelerate is None:
+            accelerate = len(code) >= ACCELERATE_MIN_LENGTH
+        if accelerate and self.track_lines and trace is None and stats is None:
+            from lexer import accel
+            state = accel.scan(self, code)
+            if state is not None:
+                return state
+        return self.scan(self.start(code), trace=trace, stats=stats)
+
+    def iter_tokens(self, state: ScanState, slice_size: int = ITER_SLICE_SIZE) -> Iterator[Token]:
+        """Scan state to the end in slices, yielding each slice's tokens and then dropping them
+
+        The state keeps its errors but neither its token list nor symbol uses:
+        its symbol table is replaced by one that records nothing, so the tokens
+        have no symbol ids and memory does not grow with the number of tokens.
+        """
+        state.symbols = NullSymbolTable()
+        tokens = state.tokens
+        while not state.done:
+            self.scan(state, state.pos + slice_size)
+            yield from tokens
+            tokens.clear()
+
+    def start(self, code: str) -> ScanState:
+        """Return a fresh scan state for code, to be advanced with scan()"""
+        return ScanState(code, self.max_errors)
+
+    def scan(self, state: ScanState, stop: Optional[int] = None,
+             trace: Optional[TransitionTrace] = None,
+             stats: Optional[LexerStats] = None) -> ScanState:
+        """Advance state until its position reaches stop (default: the end of the input)"""
+        if self.track_lines:
+            locate = _LineCursor(state.code, state.pos, state.line, state.column).line_column
+
+            def make(token_type, value, pos, symbol):
+                line, column = locate(pos)
+                return Token(token_type, value, line, column, symbol, pos)
+        else:
+            # Tokens get offsets; lines come from the index when asked for
+            positions = state.line_index
+            locate = positions.line_column
+
+            def make(token_type, value, pos, symbol):
+                return OffsetToken(token_type, value, pos, positions, symbol)
+        return self._scan(state, stop, trace, stats, make, locate)
+
+    def _scan(self, state: ScanState, stop: Optional[int],
+              trace: Optional[TransitionTrace], stats: Optional[LexerStats],
+              make: Callable[[TokenType, str, int, Optional[int]], Token],
+              locate: Callable[[int], Tuple[int, int]]) -> ScanState:
+        """The scan loop; make builds each token and locate gives (line, column) of an
+        offset, called with offsets in increasing order"""
+        code = state.code
+        end = len(code)
+        stop = end if stop is None else min(stop, end)
+        scanner = self.scanner
+        match_at = scanner.regex.match
+        if stats is not None:
+            match_at = stats.matcher(self.token_patterns, scanner)
+            started = time.perf_counter_ns()
+        group_types = scanner.group_types
+        keywords = self.keywords
+        fold = self.fold_keywords
+        symbol_types = self.symbol_types
+        skip_types = self.skip_types
+        record = state.symbols.record
+        tokens = state.tokens
+        recover = _RECOVERY_PATTERNS[self.recovery].match
+        error_start = state.error_start
+        error_line, error_column = state.error_line, state.error_column
+        pos = state.pos
+        while pos < stop:
+            match = match_at(code, pos)
+            
+            if match:
+                if error_start is not None:
+                    state.add_error(code[error_start:pos], error_line, error_column)
+                    error_start = None
+                value = match.group(0)
+                token_type = group_types[match.lastindex]
+                if token_type is TokenType.IDENTIFIER and (value.lower() if fold else value) in keywords:
+                    token_type = TokenType.KEYWORD
+                if trace is not None:
+                    trace.record_run(START_STATE, value, token_type.value)
+                if token_type not in skip_types:
+                    symbol = None
+                    if token_type in symbol_types:
+                        # Share one string per spelling across all its tokens
+                        symbol, value = record(value, len(tokens))
+                    tokens.append(make(token_type, value, pos, symbol))
+                pos = match.end()
+            else:
+                # No pattern matched: skip per the recovery mode, merging adjacent bad text
+                if error_start is None:
+                    error_start = pos
+                    error_line, error_column = locate(pos)
+                skipped = recover(code, pos)
+                skip_to = skipped.end() if skipped else pos + 1
+                if trace is not None:
+                    trace.record_run(START_STATE, code[pos:skip_to], ERROR_STATE)
+                pos = skip_to
+
+        if error_start is not None and pos >= end:
+            state.add_error(code[error_start:], error_line, error_column)
+            error_start = None
+        state.pos = pos
+        state.line, state.column = locate(pos)
+        state.error_start = error_start
+        state.error_line, state.error_column = error_line, error_column
+        if stats is not None:
+            stats.elapsed_ns += time.perf_counter_ns() - started
+            if pos >= end:
+                stats.runs += 1
+                stats.tokens += len(tokens)
+        return state
+
+    def relex(self, state: ScanState, code: str, start: int, old_end: int,
+              new_end: int) -> ScanState:
+        """Scan code, which is state.code with [start, old_end) replaced by code[start:new_end]
+
+        Tokens ending before the edited line, and before the first error, are
+        reused as they are. Scanning restarts there and stops once it reaches a
+        point after the edit where the old scan also had a token boundary; the
+        old tokens from there on are reused, moved by the change in length.
+        Restarting at the first error catches unterminated strings that the
+        edit closes. A construct whose opening also lexes as ordinary tokens
+        (a C block comment left open before the edited line) is not re-read;
+        tokenize the whole text if that matters.
+        """
+        old = state.code
+        old_tokens = state.tokens
+        if (not state.done or state.errors_dropped or not 0 <= start <= old_end <= len(old)
+                or len(old) - old_end != len(code) - new_end
+                or (old_tokens and old_tokens[0].offset is None)):
+            return self.tokenize(code)
+        delta = new_end - old_end
+        old_positions = state.line_index
+
+        # Restart after the last token that ends before the edited line and the first error
+        errors = [(message, old_positions.offset(line, column))
+                  for message, line, column in state.errors]
+        restart = old.rfind('\n', 0, start) + 1
+        if errors:
+            restart = min(restart, errors[0][1])
+        kept = _first_ending_after(old_tokens, restart)
+        restart = old_tokens[kept - 1].offset + len(old_tokens[kept - 1].value) if kept else 0
+        new = ScanState(code, self.max_errors)
+        new.tokens = old_tokens[:kept]
+        new.symbols = state.symbols.truncated(kept)
+        new.errors = [(message, *old_positions.line_column(offset))
+                      for message, offset in errors if offset < restart]
+        new.pos = restart
+        new.line, new.column = old_positions.line_column(restart)
+
+        # Scan in growing steps until the new and old boundaries line up past the edit
+        step = 64
+        stop = new_end + 1
+        resume = None
+        while not new.done:
+            self.scan(new, stop)
+            target = new.pos - delta
+            if new.pos > new_end and new.error_start is None:
+                index = _first_ending_after(old_tokens, target - 1)
+                if ((index < len(old_tokens) and old_tokens[index].offset == target)
+                        or (index and old_tokens[index - 1].offset
+                            + len(old_tokens[index - 1].value) == target)):
+                    resume = index
+                    break
+            stop = new.pos + step
+            step *= 2
+        if resume is None:
+            return new
+
+        # Reuse the old tail: offsets move by delta, lines by the change in line count
+        line_delta = code.count('\n', start, new_end) - old.count('\n', start, old_end)
+        edit_line = old_positions.line(old_end)
+        positions = new.line_index
+        tokens = new.tokens
+        symbols = new.symbols
+        for token in old_tokens[resume:]:
+            offset = token.offset + delta
+            if self.track_lines:
+                line = token.line + line_delta
+                column = (positions.column(offset) if token.line == edit_line
+                          else token.column)
+                moved = Token(token.type, token.value, line, column, token.symbol, offset)
+            else:
+                moved = OffsetToken(token.type, token.value, offset, positions, token.symbol)
+            if token.symbol is not None:
+                symbols.add_use(token.symbol, len(tokens))
+            tokens.append(moved)
+        for message, offset in errors:
+            if offset >= target:
+                if len(new.errors) >= self.max_errors:
+                    new.errors_dropped += 1
+                else:
+                    new.errors.append((message, *positions.line_column(offset + delta)))
+        new.pos = len(code)
+        new.line, new.column = positions.line_column(new.pos)
+        return new
+
 class Lexer:
     """Main lexer class that tokenizes input code"""
     
-    # Regular expressions for different token types
-    TOKEN_PATTERNS = [
-        (TokenType.KEYWORD, r'\b(if|else|while|for|return|break|continue|def|class|import|from|as|try|except|finally|raise|with|yield|async|await)\b'),
-        (TokenType.IDENTIFIER, r'[a-zA-Z_][a-zA-Z0-9_]*'),
-        (TokenType.INTEGER, r'\b\d+\b'),
-        (TokenType.FLOAT, r'\b\d+\.\d+\b'),
-        (TokenType.STRING, r'"[^"]*"|\'[^\']*\''),
-        (TokenType.OPERATOR, r'[+\-*/%=<>!&|^~]+'),
-        (TokenType.DELIMITER, r'[(){}\[\],;:.]'),
-        (TokenType.COMMENT, r'#.*'),
-        (TokenType.WHITESPACE, r'\s+'),
-    ]
-
-    def __init__(self):
+    # Identifiers found in this set are reported as keywords
+    KEYWORDS = PYTHON_KEYWORDS
+    
+    # Compare identifiers against KEYWORDS case-insensitively
+    FOLD_KEYWORDS = False
+    
+    # Token types whose spellings are interned in the symbol table
+    SYMBOL_TYPES = SYMBOL_TYPES
+    
+    # Errors kept per run; later ones are only counted in errors_dropped
+    MAX_ERRORS = 1000
+    
+    # Token types matched but left out of the token stream
+    SKIP_TYPES = TRIVIA_TYPES
+    
+    # Inputs at least this long try the accelerated scanner first
+    ACCELERATE_MIN_LENGTH = ACCELERATE_MIN_LENGTH
+    
+    # Regular expressions for different token types, in the order they are tried
+    TOKEN_PATTERNS = [(TokenType[name], pattern) for name, pattern in PYTHON.tokens]
+
+    def __init__(self, language: Optional[LanguageDefinition] = None):
+        self.language = language or PYTHON
+        if language is not None:
+            self.TOKEN_PATTERNS = [(TokenType[name], pattern) for name, pattern in language.tokens]
+            self.KEYWORDS = language.keywords
+            self.FOLD_KEYWORDS = language.fold_keywords
+        self.recovery = RecoveryMode.SKIP_CHAR
+        # Result of the last tokenize call
         self.tokens: List[Token] = []
         self.errors: List[Tuple[str, int, int]] = []
+        self.errors_dropped = 0
+        self.symbols = SymbolTable()
         self.current_line = 1
         self.current_column = 1
+        # Profile collected during tokenize when set; None keeps the fast path
+        self.stats: Optional[LexerStats] = None
+        # Use the NumPy pre-pass (lexer.accel) for large inputs when it applies
+        self.accelerate = True
+        # When False, tokens carry offsets and look up line and column on demand
+        self.track_lines = True
+        # Finished scan behind the current result, for relex(); None when unknown
+        self.state: Optional[ScanState] = None
+        self._compiled: Optional[CompiledLexer] = None
+        self._state_compiled: Optional[CompiledLexer] = None
 
-    def tokenize(self, code: str) -> List[Token]:
-        """Tokenize the input code string"""
-        self.tokens = []
-        self.errors = []
-        self.current_line = 1
-        self.current_column = 1
+    def compiled(self) -> CompiledLexer:
+        """Return the immutable compiled form of this lexer's current settings"""
+        compiled = self._compiled
+        if (compiled is None or compiled.recovery is not self.recovery
+                or compiled.max_errors != self.MAX_ERRORS
+                or compiled.track_lines != self.track_lines
+                or compiled.skip_types != self.SKIP_TYPES
+                or compiled.signature != self.patterns_signature()):
+            compiled = self._compiled = CompiledLexer(
+                self.TOKEN_PATTERNS, self.KEYWORDS, self.FOLD_KEYWORDS, self.SYMBOL_TYPES,
+                self.recovery, self.MAX_ERRORS, self.track_lines, self.SKIP_TYPES)
+        return compiled
 
-        while code:
-            matched = False
-            for token_type, pattern in self.TOKEN_PATTERNS:
-                regex = re.compile(pattern)
-                match = regex.match(code)
-                
-                if match:
-                    value = match.group(0)
-                    if token_type != TokenType.WHITESPACE and token_type != TokenType.COMMENT:
-                        self.tokens.append(Token(token_type, value, self.current_line, self.current_column))
-                    
-                    # Update line and column counters
-                    lines = value.count('\n')
-                    if lines > 0:
-                        self.current_line += lines
-                        self.current_column = len(value.split('\n')[-1]) + 1
-                    else:
-                        self.current_column += len(value)
-                    
-                    code = code[len(value):]
-                    matched = True
-                    break
+    def scanner(self) -> Scanner:
+        """Return the compiled scanner for this lexer's patterns, shared between lexers"""
+        return self.compiled().scanner
 
-            if not matched:
-                # No pattern matched, report error
-                self.errors.append((f"Unrecognized token: {code[0]}", self.current_line, self.current_column))
-                code = code[1:]
-                self.current_column += 1
+    def tokenize(self, code: str, trace: Optional[TransitionTrace] = None) -> List[Token]:
+        """Tokenize the input code string, recording per-character steps into trace if given"""
+        accelerate = self.accelerate and len(code) >= self.ACCELERATE_MIN_LENGTH
+        self.publish(self.compiled().tokenize(code, trace, self.stats, accelerate))
+        return self.tokens
+
+    def relex(self, code: str, start: int, old_end: int, new_end: int) -> List[Token]:
+        """Tokenize code after an edit of the last input, rescanning only around the edit
 
+        The edit replaced [start, old_end) of the previous input with
+        code[start:new_end]. Without a previous scan made with the current
+        settings, the whole text is tokenized.
+        """
+        compiled = self.compiled()
+        state = self.state
+        if state is None or self._state_compiled is not compiled:
+            return self.tokenize(code)
+        self.publish(compiled.relex(state, code, start, old_end, new_end))
         return self.tokens
 
+    def start(self, code: str) -> ScanState:
+        """Return a fresh scan state for code, to be advanced with scan()"""
+        return self.compiled().start(code)
+
+    def scan(self, state: ScanState, stop: Optional[int] = None,
+             trace: Optional[TransitionTrace] = None) -> ScanState:
+        """Advance state until its position reaches stop (default: the end of the input)"""
+        return self.compiled().scan(state, stop, trace, self.stats)
+
+    def result_for(self, code: str) -> Optional[ScanState]:
+        """Return the published scan if it was made from code with the current settings"""
+        state = self.state
+        if state is None or self._state_compiled is not self.compiled() or state.code != code:
+            return None
+        return state
+
+    def publish(self, state: ScanState):
+        """Make a finished scan this lexer's current result"""
+        self.state = state
+        self._state_compiled = self._compiled
+        self.tokens = state.tokens
+        self.errors = state.errors
+        self.errors_dropped = state.errors_dropped
+        self.symbols = state.symbols
+        self.current_line = state.line
+        self.current_column = state.column
+
+    def reset(self):
+        """Forget the previous run's tokens, errors and symbols"""
+        self.publish(self.start(''))
+
     def get_errors(self) -> List[Tuple[str, int, int]]:
         """Return list of lexing errors"""
-        return self.errors 
\ No newline at end of file
+        return self.errors
+
+    def patterns_signature(self) -> str:
+        """Return a hash identifying this lexer's token patterns"""
+        return patterns_signature(self.TOKEN_PATTERNS, self.KEYWORDS, self.FOLD_KEYWORDS)
+
+    def automaton(self) -> Tuple[List[Tuple[str, bool]], List[Tuple[str, str, str]]]:
+        """Return the (states, transitions) of the automaton these patterns describe"""
+        return build_automaton(self.TOKEN_PATTERNS, self.KEYWORDS) 
\ No newline at end of file
@@ -0,0 +1,269 @@
+"""
+Token diff module for LexVi
+Compares the token streams of two inputs with Myers' diff in linear space
+
+Each token is reduced to one integer key for its (type, spelling) pair.
+Tokens backed by the symbol table are keyed through their symbol id, so
+each distinct spelling is hashed once per input rather than once per token.
+
+Key sequences are split first, as in patience diff: keys that occur
+exactly once in both ranges, taken in the longest order they share, are
+matched as anchors, and the gaps between them are split again the same
+way. Gaps without such keys are compared with the divide-and-conquer form
+of Myers' algorithm, which finds the middle snake of the edit graph by
+searching from both ends and recurses on the halves around it. Everything
+runs in O(N + M) memory; the anchors keep Myers' O((N + M) * D) time to
+the small gaps around each change in typical inputs.
+"""
+
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from lexer.core import CompiledLexer, Lexer, Token
+
+# (tag, old start, old end, new start, new end), like difflib's opcodes;
+# tag is 'equal', 'delete', 'insert' or 'replace'
+Opcode = Tuple[str, int, int, int, int]
+
+def token_keys(tokens: Sequence[Token], ids: Dict[tuple, int]) -> List[int]:
+    """Map tokens to integer keys; equal (type, value) pairs share a key in ids"""
+    by_symbol: Dict[int, int] = {}
+    keys = []
+    append = keys.append
+    for token in tokens:
+        symbol = token.symbol
+        if symbol is not None:
+            key = by_symbol.get(symbol)
+            if key is None:
+                key = by_symbol[symbol] = ids.setdefault((token.type, token.value), len(ids))
+        else:
+            key = ids.setdefault((token.type, token.value), len(ids))
+        append(key)
+    return keys
+
+def _middle_snake(a: Sequence[int], alo: int, ahi: int, b: Sequence[int], blo: int,
+                  bhi: int) -> Optional[Tuple[int, int]]:
+    """Return a point (x, y) on an optimal path through a[alo:ahi] and b[blo:bhi]
+
+    Runs the forward and reverse searches for D/2 differences each; None
+    means the ranges have nothing in common.
+    """
+    n, m = ahi - alo, bhi - blo
+    max_d = (n + m + 1) // 2
+    offset = max_d
+    size = 2 * max_d + 2
+    # Furthest x reached on each diagonal k = x - y, forward and from the end
+    forward = [-1] * size
+    reverse = [-1] * size
+    forward[offset + 1] = 0
+    reverse[offset + 1] = 0
+    delta = n - m
+    # With an odd delta the paths meet during a forward step, otherwise a reverse one
+    front = delta % 2 != 0
+    # Diagonals that left the grid are trimmed from later rounds
+    k1_start = k1_end = k2_start = k2_end = 0
+    for d in range(max_d):
+        for k1 in range(-d + k1_start, d + 1 - k1_end, 2):
+            k1_offset = offset + k1
+            if k1 == -d or (k1 != d and forward[k1_offset - 1] < forward[k1_offset + 1]):
+                x1 = forward[k1_offset + 1]
+            else:
+                x1 = forward[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[alo + x1] == b[blo + y1]:
+                x1 += 1
+                y1 += 1
+            forward[k1_offset] = x1
+            if x1 > n:
+                k1_end += 2
+            elif y1 > m:
+                k1_start += 2
+            elif front:
+                k2_offset = offset + delta - k1
+                if 0 <= k2_offset < size and reverse[k2_offset] != -1:
+                    if x1 >= n - reverse[k2_offset]:
+                        return x1, y1
+        for k2 in range(-d + k2_start, d + 1 - k2_end, 2):
+            k2_offset = offset + k2
+            if k2 == -d or (k2 != d and reverse[k2_offset - 1] < reverse[k2_offset + 1]):
+                x2 = reverse[k2_offset + 1]
+            else:
+                x2 = reverse[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[ahi - x2 - 1] == b[bhi - y2 - 1]:
+                x2 += 1
+                y2 += 1
+            reverse[k2_offset] = x2
+            if x2 > n:
+                k2_end += 2
+            elif y2 > m:
+                k2_start += 2
+            elif not front:
+                k1_offset = offset + delta - k2
+                if 0 <= k1_offset < size and forward[k1_offset] != -1:
+                    x1 = forward[k1_offset]
+                    y1 = offset + x1 - k1_offset
+                    if x1 >= n - x2:
+                        return x1, y1
+    return None
+
+def _anchors(a: Sequence[int], alo: int, ahi: int, b: Sequence[int], blo: int,
+             bhi: int) -> List[Tuple[int, int]]:
+    """Return index pairs (i, j) of keys found once in each range, in a common order
+
+    Among the pairs, the longest run increasing in both i and j is kept
+    (patience sorting).
+    """
+    counts_a = Counter(a[alo:ahi])
+    counts_b = Counter(b[blo:bhi])
+    where_b = {}
+    for j in range(blo, bhi):
+        key = b[j]
+        if counts_b[key] == 1 and counts_a.get(key) == 1:
+            where_b[key] = j
+    if not where_b:
+        return []
+    pairs = [(i, where_b[a[i]]) for i in range(alo, ahi) if a[i] in where_b]
+    # tails[k] is the smallest j ending an increasing run of length k + 1
+    tails: List[int] = []
+    tail_pairs: List[int] = []
+    previous = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        k = bisect_left(tails, j)
+        if k:
+            previous[index] = tail_pairs[k - 1]
+        if k == len(tails):
+            tails.append(j)
+            tail_pairs.append(index)
+        else:
+            tails[k] = j
+            tail_pairs[k] = index
+    anchors = []
+    index = tail_pairs[-1]
+    while index >= 0:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+def diff_keys(a: Sequence[int], b: Sequence[int]) -> List[Opcode]:
+    """Return opcodes turning a into b; minimal where no anchors split the input"""
+    # Equal, delete and insert runs in order. Stack entries with a tag are
+    # finished runs; untagged ones are ranges still to compare.
+    runs: List[Opcode] = []
+    stack: List[tuple] = [(None, 0, len(a), 0, len(b))]
+    while stack:
+        tag, alo, ahi, blo, bhi = stack.pop()
+        if tag is not None:
+            runs.append((tag, alo, ahi, blo, bhi))
+            continue
+        start_a, start_b = alo, blo
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            alo += 1
+            blo += 1
+        if alo > start_a:
+            runs.append(('equal', start_a, alo, start_b, blo))
+        suffix = 0
+        while (alo < ahi - suffix and blo < bhi - suffix
+               and a[ahi - suffix - 1] == b[bhi - suffix - 1]):
+            suffix += 1
+        ahi -= suffix
+        bhi -= suffix
+        if suffix:
+            stack.append(('equal', ahi, ahi + suffix, bhi, bhi + suffix))
+        if alo == ahi or blo == bhi:
+            stack.append(('delete', alo, ahi, blo, blo) if alo < ahi
+                         else ('insert', alo, alo, blo, bhi))
+            continue
+        anchors = _anchors(a, alo, ahi, b, blo, bhi)
+        if anchors:
+            pieces = []
+            for i, j in anchors:
+                pieces.append((None, alo, i, blo, j))
+                pieces.append(('equal', i, i + 1, j, j + 1))
+                alo, blo = i + 1, j + 1
+            pieces.append((None, alo, ahi, blo, bhi))
+            stack.extend(reversed(pieces))
+            continue
+        middle = _middle_snake(a, alo, ahi, b, blo, bhi)
+        if middle is None:
+            stack.append(('insert', ahi, ahi, blo, bhi))
+            stack.append(('delete', alo, ahi, blo, blo))
+        else:
+            x, y = middle
+            stack.append((None, alo + x, ahi, blo + y, bhi))
+            stack.append((None, alo, alo + x, blo, blo + y))
+    return _merge(runs)
+
+def _merge(runs: List[Opcode]) -> List[Opcode]:
+    """Join adjacent runs of one kind and turn deletes next to inserts into replaces"""
+    opcodes: List[Opcode] = []
+    for tag, i1, i2, j1, j2 in runs:
+        if i1 == i2 and j1 == j2:
+            continue
+        if opcodes:
+            last_tag, k1, k2, l1, l2 = opcodes[-1]
+            if last_tag == tag or (last_tag != 'equal' and tag != 'equal'):
+                merged = 'equal' if tag == 'equal' else (
+                    'replace' if k1 < i2 and l1 < j2 else tag)
+                opcodes[-1] = (merged, k1, i2, l1, j2)
+                continue
+        opcodes.append((tag, i1, i2, j1, j2))
+    return opcodes
+
+class TokenDiff:
+    """Differences between an old and a new token stream"""
+
+    def __init__(self, old: Sequence[Token], new: Sequence[Token], opcodes: List[Opcode]):
+        self.old = old
+        self.new = new
+        self.opcodes = opcodes
+
+    @property
+    def changed(self) -> bool:
+        return any(tag != 'equal' for tag, *_ in self.opcodes)
+
+    def changes(self) -> Iterator[Tuple[str, Optional[Token], Optional[Token]]]:
+        """Yield (kind, old token, new token) for every token that differs
+
+        kind is 'insert', 'delete' or 'change'; within a replaced run, tokens
+        at the same position with the same type are paired as a change of value.
+        """
+        old, new = self.old, self.new
+        for tag, i1, i2, j1, j2 in self.opcodes:
+            if tag == 'equal':
+                continue
+            for offset in range(max(i2 - i1, j2 - j1)):
+                before = old[i1 + offset] if i1 + offset < i2 else None
+                after = new[j1 + offset] if j1 + offset < j2 else None
+                if before is not None and after is not None:
+                    if before.type is after.type:
+                        yield 'change', before, after
+                    else:
+                        yield 'delete', before, None
+                        yield 'insert', None, after
+                elif before is not None:
+                    yield 'delete', before, None
+                else:
+                    yield 'insert', None, after
+
+    def counts(self) -> Dict[str, int]:
+        """Return how many tokens were inserted, deleted and changed"""
+        counts = {'insert': 0, 'delete': 0, 'change': 0}
+        for kind, _, _ in self.changes():
+            counts[kind] += 1
+        return counts
+
+def diff_tokens(old: Sequence[Token], new: Sequence[Token]) -> TokenDiff:
+    """Diff two token streams by type and value"""
+    ids: Dict[tuple, int] = {}
+    return TokenDiff(old, new, diff_keys(token_keys(old, ids), token_keys(new, ids)))
+
+def diff_texts(old: str, new: str, compiled: Optional[CompiledLexer] = None) -> TokenDiff:
+    """Lex both texts with one compiled lexer (default settings if None) and diff their tokens
+
+    Compiled lexers are immutable, so this may run on a worker thread.
+    """
+    compiled = compiled or Lexer().compiled()
+    return diff_tokens(compiled.tokenize(old).tokens, compiled.tokenize(new).tokens)
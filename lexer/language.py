@@ -0,0 +1,202 @@
+"""
+Language definition module for LexVi
+Loads token types, patterns, priorities and keywords from JSON or TOML files
+
+A definition lists its token rules with a priority; rules are tried highest
+priority first, in file order on ties:
+
+    {
+      "name": "c",
+      "extensions": [".c", ".h"],
+      "tokens": [{"type": "COMMENT", "pattern": "//[^\\n]*", "priority": 100}, ...],
+      "keywords": ["if", "while", ...],
+      "keywords_case_insensitive": false
+    }
+
+Loading a definition validates every pattern. The validated, priority-sorted
+form is stored in a small cache file keyed by the definition's path, size and
+mtime, so later startups read that file and skip parsing and validation. The
+lexer merges the rules into a single master pattern, compiled once per rule
+table on first use.
+"""
+
+import hashlib
+import json
+import os
+import re
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+# Bumped whenever the compiled cache layout changes
+COMPILED_VERSION = 1
+
+LANGUAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'languages')
+
+# Token types a definition may use; mirrors lexer.core.TokenType minus ERROR
+TOKEN_TYPE_NAMES = frozenset(['KEYWORD', 'IDENTIFIER', 'INTEGER', 'FLOAT', 'STRING',
+                              'OPERATOR', 'DELIMITER', 'COMMENT', 'WHITESPACE'])
+
+class LanguageError(ValueError):
+    """Raised for a malformed language definition"""
+
+class LanguageDefinition:
+    """A validated language definition with its rules in scanning order"""
+
+    def __init__(self, name: str, tokens: List[Tuple[str, str]], keywords: FrozenSet[str],
+                 fold_keywords: bool = False, extensions: Tuple[str, ...] = ()):
+        self.name = name
+        # (token type name, pattern), highest priority first
+        self.tokens = tokens
+        self.fold_keywords = fold_keywords
+        # Case-insensitive keyword tables are stored lower-cased
+        self.keywords = frozenset(k.lower() for k in keywords) if fold_keywords else keywords
+        self.extensions = extensions
+
+    @property
+    def master_pattern(self) -> str:
+        """Return the single alternation that scans every rule in priority order"""
+        return master_pattern(self.tokens)
+
+    def to_dict(self) -> dict:
+        return {'name': self.name, 'extensions': list(self.extensions),
+                'tokens': [{'type': t, 'pattern': p} for t, p in self.tokens],
+                'keywords': sorted(self.keywords),
+                'keywords_case_insensitive': self.fold_keywords}
+
+    @classmethod
+    def from_dict(cls, data: dict, validate: bool = True) -> 'LanguageDefinition':
+        """Build a definition from parsed JSON/TOML data, sorting rules by priority"""
+        try:
+            name = str(data['name'])
+            rules = list(data['tokens'])
+        except (KeyError, TypeError) as e:
+            raise LanguageError(f"Language definition is missing {e}") from None
+        if not rules:
+            raise LanguageError(f"Language '{name}' defines no tokens")
+        ordered = []
+        for position, rule in enumerate(rules):
+            token_type = rule.get('type')
+            pattern = rule.get('pattern')
+            if validate:
+                if token_type not in TOKEN_TYPE_NAMES:
+                    raise LanguageError(f"Language '{name}': unknown token type {token_type!r}")
+                if not isinstance(pattern, str) or not pattern:
+                    raise LanguageError(f"Language '{name}': {token_type} needs a pattern")
+                try:
+                    # Compiled as a group, as in the master pattern, so inline global
+                    # flags such as (?i) are rejected here rather than by the scanner
+                    compiled = re.compile(f'(?:{pattern})')
+                except re.error as e:
+                    hint = ("; use a scoped group such as (?i:...) instead"
+                            if 'global flags' in str(e) else '')
+                    raise LanguageError(f"Language '{name}': bad {token_type} pattern "
+                                        f"{pattern!r}: {e}{hint}") from None
+                if compiled.match(''):
+                    raise LanguageError(f"Language '{name}': {token_type} pattern matches "
+                                        "the empty string")
+            ordered.append((-rule.get('priority', 0), position, token_type, pattern))
+        ordered.sort()
+        tokens = [(t, p) for _, _, t, p in ordered]
+        if validate:
+            # Rules can also clash with each other, e.g. by reusing a group name
+            try:
+                re.compile(master_pattern(tokens))
+            except re.error as e:
+                raise LanguageError(f"Language '{name}': rules do not combine: {e}") from None
+        return cls(name, tokens,
+                   frozenset(data.get('keywords', ())),
+                   bool(data.get('keywords_case_insensitive', False)),
+                   tuple(data.get('extensions', ())))
+
+    def __repr__(self):
+        return f"LanguageDefinition({self.name!r}, {len(self.tokens)} rules)"
+
+def master_pattern(tokens: List[Tuple[str, str]]) -> str:
+    """Join rules into one alternation with a named group per rule, in order"""
+    return '|'.join(f'(?P<_t{i}>{pattern})' for i, (_, pattern) in enumerate(tokens))
+
+def _parse(path: str) -> dict:
+    if path.endswith('.toml'):
+        # Imported here: only user definitions can be TOML, and startup should not pay for it
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            raise LanguageError("TOML language definitions need Python 3.11 or newer")
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _compiled_path(path: str, cache_dir: str) -> str:
+    try:
+        stat = os.stat(path)
+    except OSError as e:
+        raise LanguageError(f"Cannot read language definition {path}: {e.strerror}") from None
+    key = f'{COMPILED_VERSION}\0{os.path.abspath(path)}\0{stat.st_size}\0{stat.st_mtime_ns}'
+    return os.path.join(cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+def default_cache_dir() -> str:
+    return os.path.join(os.path.expanduser('~'), '.cache', 'lexvi', 'languages')
+
+def resolve_language(name_or_path: str) -> str:
+    """Return the definition file for a built-in language name or a path"""
+    if os.path.sep in name_or_path or os.path.splitext(name_or_path)[1]:
+        return name_or_path
+    for suffix in ('.json', '.toml'):
+        path = os.path.join(LANGUAGES_DIR, name_or_path + suffix)
+        if os.path.exists(path):
+            return path
+    raise LanguageError(f"Unknown language: {name_or_path}")
+
+_builtin: Dict[str, LanguageDefinition] = {}
+
+def load_language(name_or_path: str, cache_dir: Optional[str] = None) -> LanguageDefinition:
+    """Load a language definition by built-in name or file path
+
+    Built-in definitions ship with LexVi and are trusted, so they are read
+    directly. Other files are validated on first load and their compiled
+    form is reused from cache_dir afterwards.
+    """
+    path = resolve_language(name_or_path)
+    if os.path.dirname(os.path.abspath(path)) != LANGUAGES_DIR:
+        return _load_compiled(path, cache_dir or default_cache_dir())
+    definition = _builtin.get(path)
+    if definition is None:
+        definition = _builtin[path] = LanguageDefinition.from_dict(_parse(path), validate=False)
+    return definition
+
+def _load_compiled(path: str, cache_dir: str) -> LanguageDefinition:
+    compiled_path = _compiled_path(path, cache_dir)
+    try:
+        with open(compiled_path, 'r', encoding='utf-8') as f:
+            return LanguageDefinition.from_dict(json.load(f), validate=False)
+    except (OSError, ValueError):
+        pass
+    definition = LanguageDefinition.from_dict(_parse(path))
+    import tempfile
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(definition.to_dict(), f)
+            os.replace(tmp_path, compiled_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    except OSError:
+        pass  # Next startup validates again
+    return definition
+
+def available_languages() -> List[str]:
+    """Return the names of the built-in languages"""
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(LANGUAGES_DIR)
+                  if name.endswith(('.json', '.toml')))
+
+def language_for_path(path: str) -> Optional[LanguageDefinition]:
+    """Return the built-in language whose extensions match path, if any"""
+    extension = os.path.splitext(path)[1].lower()
+    for name in available_languages():
+        definition = load_language(name)
+        if extension in definition.extensions:
+            return definition
+    return None
@@ -0,0 +1,124 @@
+"""
+Token pipeline module for LexVi
+Chains generator stages that filter, reclassify and merge tokens lazily
+
+A stage is any callable taking an iterable of tokens and returning an
+iterator of tokens. A Pipeline applies its stages in order; each stage
+pulls from the one before it, so tokens flow through one at a time and no
+stage builds an intermediate list.
+
+Which token types reach the pipeline at all is decided by the scanner
+(CompiledLexer.skip_types, Lexer.SKIP_TYPES), which never creates tokens
+for the types it skips. Whitespace and comments are skipped by default;
+documentation tools keep comments and formatters keep both, then use the
+stages here to shape the stream.
+"""
+
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from lexer.core import CompiledLexer, Lexer, Token, TokenType
+
+Stage = Callable[[Iterable[Token]], Iterator[Token]]
+
+def drop(*types: TokenType) -> Stage:
+    """Stage leaving out tokens of the given types"""
+    dropped = frozenset(types)
+
+    def stage(tokens: Iterable[Token]) -> Iterator[Token]:
+        return (token for token in tokens if token.type not in dropped)
+    return stage
+
+def keep(*types: TokenType) -> Stage:
+    """Stage passing only tokens of the given types"""
+    kept = frozenset(types)
+
+    def stage(tokens: Iterable[Token]) -> Iterator[Token]:
+        return (token for token in tokens if token.type in kept)
+    return stage
+
+def reclassify(words: Iterable[str], to_type: TokenType = TokenType.KEYWORD,
+               from_type: TokenType = TokenType.IDENTIFIER, fold: bool = False) -> Stage:
+    """Stage giving tokens of from_type whose spelling is in words the type to_type
+
+    Used for contextual keywords a language table leaves as identifiers.
+    The token keeps its symbol id, which belongs to its spelling.
+    """
+    words = frozenset(word.lower() for word in words) if fold else frozenset(words)
+
+    def stage(tokens: Iterable[Token]) -> Iterator[Token]:
+        for token in tokens:
+            if token.type is from_type and (token.value.lower() if fold else token.value) in words:
+                token = Token(to_type, token.value, token.line, token.column, token.symbol,
+                              token.offset)
+            yield token
+    return stage
+
+def merge(*types: TokenType, bridge: Iterable[TokenType] = ()) -> Stage:
+    """Stage joining runs of adjacent tokens of one of the given types into one token
+
+    Tokens must touch (one ends at the offset where the next starts). Tokens
+    of bridge types between two mergeable tokens of the same type, such as
+    the whitespace between consecutive line comments, become part of the
+    merged token; elsewhere they pass through unchanged. Merged tokens take
+    the position of the first token in the run and have no symbol id.
+    """
+    mergeable = frozenset(types)
+    bridging = frozenset(bridge)
+
+    def stage(tokens: Iterable[Token]) -> Iterator[Token]:
+        run: List[Token] = []
+        # Bridge tokens seen after the run, not yet known to be inside it
+        pending: List[Token] = []
+        for token in tokens:
+            if run:
+                last = pending[-1] if pending else run[-1]
+                touching = last.offset + len(last.value) == token.offset
+                if touching and token.type is run[0].type:
+                    run += pending
+                    run.append(token)
+                    pending = []
+                    continue
+                if touching and token.type in bridging:
+                    pending.append(token)
+                    continue
+                yield _joined(run)
+                yield from pending
+                run, pending = [], []
+            if token.type in mergeable:
+                run.append(token)
+            else:
+                yield token
+        if run:
+            yield _joined(run)
+            yield from pending
+    return stage
+
+def _joined(run: List[Token]) -> Token:
+    """Return run as one token; a single token is returned unchanged"""
+    if len(run) == 1:
+        return run[0]
+    first = run[0]
+    return Token(first.type, ''.join(token.value for token in run), first.line, first.column,
+                 None, first.offset)
+
+class Pipeline:
+    """Stages applied lazily, in order, to a token stream"""
+
+    def __init__(self, *stages: Stage):
+        self.stages = list(stages)
+
+    def then(self, *stages: Stage) -> 'Pipeline':
+        """Return a new pipeline with stages appended"""
+        return Pipeline(*self.stages, *stages)
+
+    def __call__(self, tokens: Iterable[Token]) -> Iterator[Token]:
+        stream = iter(tokens)
+        for stage in self.stages:
+            stream = stage(stream)
+        return stream
+
+    def scan(self, code: str, lexer: Optional[Lexer] = None,
+             compiled: Optional[CompiledLexer] = None) -> Iterator[Token]:
+        """Scan code in slices and run the tokens through the stages as they are found"""
+        compiled = compiled or (lexer or Lexer()).compiled()
+        return self(compiled.iter_tokens(compiled.start(code)))
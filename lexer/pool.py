@@ -0,0 +1,71 @@
+"""
+Lexer pool module for LexVi
+Tokenizes many inputs in parallel threads with one shared compiled lexer
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from lexer.core import CompiledLexer, Lexer, RecoveryMode, ScanState
+from lexer.language import LanguageDefinition
+
+class LexerPool:
+    """Thread pool over one CompiledLexer, plus reusable Lexer instances
+
+    Scans submitted to the pool share the compiled tables and get their own
+    ScanState each. Code that needs the stateful Lexer API can lease an
+    instance; leased lexers go back to an idle list instead of being rebuilt.
+    """
+
+    def __init__(self, language: Optional[LanguageDefinition] = None,
+                 max_workers: Optional[int] = None):
+        self.language = language
+        self.compiled: CompiledLexer = Lexer(language).compiled()
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='lexvi-lexer')
+        self._idle: List[Lexer] = []
+        self._lock = threading.Lock()
+
+    def submit(self, code: str) -> Future:
+        """Tokenize code on a worker thread; the future resolves to its ScanState"""
+        return self._executor.submit(self.compiled.tokenize, code)
+
+    def map(self, codes: Iterable[str]) -> Iterator[ScanState]:
+        """Tokenize every input in parallel, yielding states in input order"""
+        return self._executor.map(self.compiled.tokenize, codes)
+
+    def tokenize_files(self, paths: Iterable[str],
+                       encoding: str = 'utf-8') -> Iterator[Tuple[str, ScanState]]:
+        """Read and tokenize files in parallel, yielding (path, state) in input order"""
+        paths = list(paths)
+        return zip(paths, self._executor.map(lambda path: self._tokenize_file(path, encoding),
+                                             paths))
+
+    def _tokenize_file(self, path: str, encoding: str) -> ScanState:
+        with open(path, 'r', encoding=encoding, errors='replace') as f:
+            return self.compiled.tokenize(f.read())
+
+    @contextmanager
+    def lease(self) -> Iterator[Lexer]:
+        """Borrow a Lexer for the stateful API, returning it to the pool afterwards"""
+        with self._lock:
+            lexer = self._idle.pop() if self._idle else Lexer(self.language)
+        try:
+            yield lexer
+        finally:
+            lexer.reset()
+            lexer.recovery = RecoveryMode.SKIP_CHAR
+            lexer.stats = None
+            with self._lock:
+                self._idle.append(lexer)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker threads"""
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> 'LexerPool':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
@@ -0,0 +1,44 @@
+"""
+Position index module for LexVi
+Converts character offsets to line and column numbers by binary search
+"""
+
+from array import array
+from bisect import bisect_right
+from typing import Tuple
+
+class LineIndex:
+    """Offsets of the line starts of a text, built once per input
+
+    Lines and columns are 1-based, matching the lexer's own counting.
+    """
+
+    def __init__(self, text: str):
+        starts = array('q', [0])
+        find = text.find
+        pos = find('\n')
+        while pos >= 0:
+            starts.append(pos + 1)
+            pos = find('\n', pos + 1)
+        self.starts = starts
+        self.length = len(text)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def line(self, offset: int) -> int:
+        """Return the line holding offset"""
+        return bisect_right(self.starts, offset)
+
+    def column(self, offset: int) -> int:
+        """Return the column of offset within its line"""
+        return offset - self.starts[bisect_right(self.starts, offset) - 1] + 1
+
+    def line_column(self, offset: int) -> Tuple[int, int]:
+        """Return (line, column) for offset"""
+        line = bisect_right(self.starts, offset)
+        return line, offset - self.starts[line - 1] + 1
+
+    def offset(self, line: int, column: int) -> int:
+        """Return the offset of a (line, column) position"""
+        return self.starts[line - 1] + column - 1
@@ -0,0 +1,115 @@
+"""
+Profiling module for LexVi
+Counts per-pattern match attempts, hits, time and bytes, and histograms token lengths
+"""
+
+import re
+import time
+from collections import Counter
+from typing import List, Sequence, Tuple
+
+class PatternStats:
+    """Counters for one token pattern"""
+    __slots__ = ('token_type', 'pattern', 'attempts', 'hits', 'failed_ns', 'matched_ns',
+                 'bytes')
+
+    def __init__(self, token_type, pattern: str):
+        self.token_type = token_type
+        self.pattern = pattern
+        self.attempts = 0
+        self.hits = 0
+        # Time spent in attempts that did not match, and in ones that did
+        self.failed_ns = 0
+        self.matched_ns = 0
+        # UTF-8 bytes of input consumed by this pattern's matches
+        self.bytes = 0
+
+    @property
+    def failures(self) -> int:
+        return self.attempts - self.hits
+
+class LexerStats:
+    """Profile collected while a lexer has one attached, accumulated over runs
+
+    Attach with ``lexer.stats = LexerStats()``. Profiled runs try each
+    pattern separately in table order, which is what the master pattern
+    does internally, so attempts and failures are counted per pattern.
+    """
+
+    def __init__(self):
+        self.token_patterns: List[Tuple] = []
+        self.patterns: List[PatternStats] = []
+        # Match functions of the compiled token patterns, in table order
+        self._rule_matches: List = []
+        self.reset()
+
+    def reset(self):
+        """Zero every counter, keeping the pattern table"""
+        self.patterns = [PatternStats(t, p) for t, p in self.token_patterns]
+        self.lengths: Counter = Counter()
+        self.runs = 0
+        self.tokens = 0
+        self.errors = 0
+        self.elapsed_ns = 0
+
+    def matcher(self, token_patterns: Sequence[Tuple], scanner):
+        """Return an instrumented drop-in for scanner.regex.match"""
+        if list(token_patterns) != self.token_patterns:
+            self.token_patterns = list(token_patterns)
+            self._rule_matches = [re.compile(pattern).match for _, pattern in self.token_patterns]
+            self.reset()
+        rules = list(zip(self.patterns, self._rule_matches))
+        master = scanner.regex.match
+        lengths = self.lengths
+        clock = time.perf_counter_ns
+
+        def match_at(code: str, pos: int):
+            for stats, match_rule in rules:
+                stats.attempts += 1
+                start = clock()
+                match = match_rule(code, pos)
+                elapsed = clock() - start
+                if match:
+                    stats.hits += 1
+                    stats.matched_ns += elapsed
+                    value = match.group()
+                    stats.bytes += len(value.encode('utf-8', 'surrogatepass'))
+                    lengths[len(value)] += 1
+                    # Same winner, with the group layout the lexer expects
+                    return master(code, pos)
+                stats.failed_ns += elapsed
+            self.errors += 1
+            return None
+        return match_at
+
+    def failed_attempts_per_token(self) -> float:
+        """Average number of patterns tried without success before each match"""
+        hits = sum(stats.hits for stats in self.patterns)
+        failures = sum(stats.failures for stats in self.patterns)
+        return failures / hits if hits else 0.0
+
+    def length_histogram(self, buckets: Sequence[int] = (1, 2, 4, 8, 16, 32, 64)
+                         ) -> List[Tuple[str, int]]:
+        """Return (label, count) rows grouping lexeme lengths by upper bound"""
+        rows = []
+        low = 1
+        for high in buckets:
+            label = str(high) if low == high else f'{low}-{high}'
+            rows.append((label, sum(n for length, n in self.lengths.items()
+                                    if low <= length <= high)))
+            low = high + 1
+        rows.append((f'{low}+', sum(n for length, n in self.lengths.items() if length >= low)))
+        return rows
+
+    def report(self) -> str:
+        """Format the profile as a plain-text table"""
+        lines = [f"{'Type':<12}{'Attempts':>10}{'Hits':>10}{'Failed ms':>11}"
+                 f"{'Match ms':>10}{'Bytes':>10}"]
+        for stats in self.patterns:
+            lines.append(f"{stats.token_type.value:<12}{stats.attempts:>10}{stats.hits:>10}"
+                         f"{stats.failed_ns / 1e6:>11.2f}{stats.matched_ns / 1e6:>10.2f}"
+                         f"{stats.bytes:>10}")
+        lines.append(f"{self.runs} runs, {self.tokens} tokens, {self.errors} errors, "
+                     f"{self.elapsed_ns / 1e6:.1f} ms, "
+                     f"{self.failed_attempts_per_token():.2f} failed attempts per match")
+        return '\n'.join(lines)
@@ -0,0 +1,185 @@
+"""
+Search module for LexVi
+Finds text and tokens in a Python-side copy of the editor buffer
+
+Text searches run compiled regular expressions over the buffer string;
+token searches go through the symbol table's use lists and a per-type index
+of the token stream. Matches are (start, end) character offsets in buffer
+order, so the ones inside a viewport can be cut out with a binary search and
+highlighted in one batch. Replacing builds the new text in one pass and
+reports the changed span, ready for Lexer.relex; diff_edit reports the same
+kind of span for two versions of a text, such as a file rewritten on disk.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from lexer.core import Token, TokenType
+from lexer.symbols import SymbolTable
+
+Match = Tuple[int, int]
+
+# Characters compared per slice when looking for the first difference
+DIFF_BLOCK = 1 << 16
+
+@lru_cache(maxsize=32)
+def compile_pattern(pattern: str, regex: bool = False, ignore_case: bool = False,
+                    whole_word: bool = False) -> 're.Pattern':
+    """Compile a search pattern; plain text is escaped unless regex is set"""
+    source = pattern if regex else re.escape(pattern)
+    if whole_word:
+        source = rf'\b(?:{source})\b'
+    return re.compile(source, re.IGNORECASE if ignore_case else 0)
+
+class Edit:
+    """Result of a bulk replacement: the new text and the span that changed"""
+    __slots__ = ('text', 'start', 'old_end', 'new_end', 'count')
+
+    def __init__(self, text: str, start: int, old_end: int, new_end: int, count: int):
+        self.text = text
+        # [start, old_end) of the old text became [start, new_end) of the new one
+        self.start = start
+        self.old_end = old_end
+        self.new_end = new_end
+        self.count = count
+
+def _common_prefix(a: str, b: str, limit: int) -> int:
+    """Length of the common prefix of a and b, at most limit"""
+    pos = 0
+    # Whole blocks compare at memcmp speed; only the first differing one is bisected
+    while pos < limit:
+        end = min(pos + DIFF_BLOCK, limit)
+        if a[pos:end] != b[pos:end]:
+            break
+        pos = end
+    else:
+        return limit
+    low, high = pos, end - 1
+    while low < high:
+        middle = (low + high) // 2
+        if a[low:middle + 1] == b[low:middle + 1]:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    """Length of the common suffix of a and b, at most limit"""
+    n, m = len(a), len(b)
+    size = 0
+    while size < limit:
+        end = min(size + DIFF_BLOCK, limit)
+        if a[n - end:n - size] != b[m - end:m - size]:
+            break
+        size = end
+    else:
+        return limit
+    low, high = size, end - 1
+    while low < high:
+        middle = (low + high) // 2
+        if a[n - middle - 1:n - low] == b[m - middle - 1:m - low]:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+def diff_edit(old: str, new: str) -> Edit:
+    """Return the one edit turning old into new: the span between their common prefix and suffix"""
+    limit = min(len(old), len(new))
+    start = _common_prefix(old, new, limit)
+    if start == len(old) == len(new):
+        return Edit(new, start, start, start, 0)
+    suffix = _common_suffix(old, new, limit - start)
+    return Edit(new, start, len(old) - suffix, len(new) - suffix, 1)
+
+class SearchIndex:
+    """Find engine over one version of the buffer and its tokens"""
+
+    def __init__(self, code: str, tokens: Sequence[Token] = (),
+                 symbols: Optional[SymbolTable] = None):
+        self.code = code
+        self.tokens = tokens
+        self.symbols = symbols
+        self._by_type: Optional[Dict[TokenType, List[int]]] = None
+
+    def find(self, pattern: str, regex: bool = False, ignore_case: bool = False,
+             whole_word: bool = False) -> List[Match]:
+        """Return the spans of every non-empty match of pattern in the buffer"""
+        if not pattern:
+            return []
+        compiled = compile_pattern(pattern, regex, ignore_case, whole_word)
+        return [match.span() for match in compiled.finditer(self.code)
+                if match.end() > match.start()]
+
+    def token_indices(self, text: Optional[str] = None,
+                      token_type: Optional[TokenType] = None) -> List[int]:
+        """Return the indices of tokens spelled text and/or of token_type"""
+        if text is not None:
+            if self.symbols is not None and text in self.symbols:
+                indices = self.symbols.uses_of(text)
+            else:
+                indices = [i for i, token in enumerate(self.tokens) if token.value == text]
+            if token_type is None:
+                return list(indices)
+            tokens = self.tokens
+            return [i for i in indices if tokens[i].type is token_type]
+        if token_type is None:
+            return list(range(len(self.tokens)))
+        if self._by_type is None:
+            by_type: Dict[TokenType, List[int]] = {}
+            for i, token in enumerate(self.tokens):
+                by_type.setdefault(token.type, []).append(i)
+            self._by_type = by_type
+        return self._by_type.get(token_type, [])
+
+    def find_tokens(self, text: Optional[str] = None,
+                    token_type: Optional[TokenType] = None) -> List[Match]:
+        """Return the spans of tokens spelled text and/or of token_type"""
+        tokens = self.tokens
+        spans = []
+        for i in self.token_indices(text, token_type):
+            token = tokens[i]
+            spans.append((token.offset, token.offset + len(token.value)))
+        return spans
+
+    @staticmethod
+    def visible(matches: List[Match], start: int, end: int) -> List[Match]:
+        """Return the matches that overlap [start, end); matches must be in order"""
+        first = bisect_right(matches, (start, start))
+        if first and matches[first - 1][1] > start:
+            first -= 1
+        return matches[first:bisect_left(matches, (end, end))]
+
+    def replace(self, matches: List[Match], replacement: Union[str, Sequence[str]]) -> Edit:
+        """Replace every span in matches (in order, not overlapping) in one pass
+
+        replacement is one string for all spans, or one string per span.
+        """
+        code = self.code
+        if not matches:
+            return Edit(code, 0, 0, 0, 0)
+        if isinstance(replacement, str):
+            replacement = [replacement] * len(matches)
+        first = matches[0][0]
+        pos = first
+        pieces = []
+        for (start, end), text in zip(matches, replacement):
+            pieces.append(code[pos:start])
+            pieces.append(text)
+            pos = end
+        middle = ''.join(pieces)
+        return Edit(code[:first] + middle + code[pos:], first, pos, first + len(middle),
+                    len(matches))
+
+    def replace_pattern(self, pattern: str, replacement: str, regex: bool = False,
+                        ignore_case: bool = False, whole_word: bool = False) -> Edit:
+        """Replace every match of pattern; with regex set, replacement may use group references"""
+        if not pattern:
+            return Edit(self.code, 0, 0, 0, 0)
+        compiled = compile_pattern(pattern, regex, ignore_case, whole_word)
+        matches = [match for match in compiled.finditer(self.code) if match.end() > match.start()]
+        return self.replace([match.span() for match in matches],
+                            [match.expand(replacement) for match in matches] if regex
+                            else replacement)
@@ -0,0 +1,241 @@
+"""
+Lexing service module for LexVi
+Tokenizes every open document on one background thread, visible one first
+
+Each Document owns a Lexer, whose published scan is that document's token
+buffer. The service keeps one job per document in a priority queue and
+scans on a single worker thread in slices; between slices a job gives way
+to any job of higher priority, so the visible document is served first and
+the others are lexed while the visible one has nothing to do. Finished
+scans are handed over by poll() on the caller's (GUI) thread, which is the
+only thread that touches documents and their lexers.
+
+Token buffers count against a shared budget. When it is exceeded, the
+buffers of the least recently shown documents are dropped; they are
+rebuilt when the document is shown again.
+"""
+
+import heapq
+import itertools
+import threading
+from typing import Dict, List, Optional
+
+from lexer.core import CompiledLexer, Lexer, ScanState
+
+# Job priorities; lower values run first
+VISIBLE, BACKGROUND = 0, 1
+
+# Characters scanned before the worker checks for more urgent jobs
+SLICE_SIZE = 1 << 16
+
+# Tokens kept across all documents before inactive buffers are dropped
+MAX_TOKENS = 1_000_000
+
+class Document:
+    """One open buffer: its text and the Lexer holding its token buffer"""
+
+    def __init__(self, code: str = '', lexer: Optional[Lexer] = None,
+                 name: str = 'Untitled', path: Optional[str] = None):
+        self.code = code
+        self.lexer = lexer or Lexer()
+        self.name = name
+        self.path = path
+        # Order of the last activation, for choosing buffers to drop
+        self.last_active = 0
+
+    @property
+    def state(self) -> Optional[ScanState]:
+        """Finished scan of the current text, or None if it still has to be built"""
+        return self.lexer.result_for(self.code)
+
+    @property
+    def token_count(self) -> int:
+        return len(self.lexer.tokens)
+
+class _Job:
+    """A scan of one version of a document, resumable between slices"""
+    __slots__ = ('document', 'code', 'compiled', 'priority', 'seq', 'state', 'cancelled')
+
+    def __init__(self, document: Document, code: str, compiled: CompiledLexer, priority: int):
+        self.document = document
+        self.code = code
+        self.compiled = compiled
+        self.priority = priority
+        # Sequence number of the queue entry that is current for this job
+        self.seq = 0
+        self.state: Optional[ScanState] = None
+        self.cancelled = False
+
+class LexingService:
+    """One worker thread tokenizing open documents in priority order"""
+
+    def __init__(self, max_tokens: int = MAX_TOKENS, slice_size: int = SLICE_SIZE):
+        self.max_tokens = max_tokens
+        self.slice_size = slice_size
+        self.documents: List[Document] = []
+        self.active: Optional[Document] = None
+        self._activations = itertools.count(1)
+        self._seq = itertools.count()
+        # Latest job per document, queued or running
+        self._jobs: Dict[Document, _Job] = {}
+        # Entries are (priority, seq, job); entries whose seq is not the job's are stale
+        self._queue: List[tuple] = []
+        self._finished: List[_Job] = []
+        self._ready = threading.Condition()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def open(self, document: Document) -> Document:
+        """Start serving a document and queue its first scan"""
+        self.documents.append(document)
+        self.update(document)
+        return document
+
+    def close(self, document: Document):
+        """Stop serving a document and drop any scan queued for it"""
+        self.documents.remove(document)
+        with self._ready:
+            job = self._jobs.pop(document, None)
+            if job is not None:
+                job.cancelled = True
+        if self.active is document:
+            self.active = None
+
+    def activate(self, document: Document):
+        """Make document the visible one: its scan runs first and its buffer is kept"""
+        previous = self.active
+        self.active = document
+        document.last_active = next(self._activations)
+        with self._ready:
+            job = self._jobs.get(previous)
+            if previous is not document and job is not None:
+                self._reprioritize(job, BACKGROUND)
+        self.update(document)
+
+    def update(self, document: Document, code: Optional[str] = None):
+        """Record new text for document and queue a scan unless its buffer is current"""
+        if code is not None:
+            document.code = code
+        priority = VISIBLE if document is self.active else BACKGROUND
+        compiled = document.lexer.compiled()
+        with self._ready:
+            job = self._jobs.get(document)
+            if document.state is not None:
+                if job is not None:
+                    job.cancelled = True
+                    del self._jobs[document]
+                return
+            if job is not None and job.code == document.code and job.compiled is compiled:
+                if priority < job.priority:
+                    self._reprioritize(job, priority)
+                return
+            if job is not None:
+                job.cancelled = True
+            job = self._jobs[document] = _Job(document, document.code, compiled, priority)
+            self._push(job, priority)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='lexvi-lexing',
+                                                daemon=True)
+                self._thread.start()
+
+    @property
+    def busy(self) -> bool:
+        """True while scans are queued, running or waiting to be collected by poll()"""
+        with self._ready:
+            return bool(self._jobs or self._finished)
+
+    def _push(self, job: _Job, priority: int):
+        """Queue job at priority, making any earlier queue entry for it stale; lock held"""
+        job.priority = priority
+        job.seq = next(self._seq)
+        heapq.heappush(self._queue, (priority, job.seq, job))
+        self._ready.notify()
+
+    def _reprioritize(self, job: _Job, priority: int):
+        """Change the priority of a queued or running job; lock held"""
+        if job.seq < 0:
+            job.priority = priority  # Running; checked against the queue after each slice
+        else:
+            self._push(job, priority)
+
+    def _head(self) -> Optional[_Job]:
+        """Return the most urgent queued job, discarding stale entries; lock held"""
+        queue = self._queue
+        while queue:
+            _, seq, job = queue[0]
+            if seq == job.seq and not job.cancelled:
+                return job
+            heapq.heappop(queue)
+        return None
+
+    def _run(self):
+        while True:
+            with self._ready:
+                while not self._closed and self._head() is None:
+                    self._ready.wait()
+                if self._closed:
+                    return
+                job = heapq.heappop(self._queue)[2]
+                # Not queued while running; a new entry would mean it was requeued
+                job.seq = -1
+            state = job.state
+            if state is None:
+                state = job.state = job.compiled.start(job.code)
+            while True:
+                if not state.done:
+                    job.compiled.scan(state, state.pos + self.slice_size)
+                with self._ready:
+                    if job.cancelled:
+                        break
+                    if state.done:
+                        self._finished.append(job)
+                        break
+                    head = self._head()
+                    if head is not None and head.priority < job.priority:
+                        self._push(job, job.priority)
+                        break
+
+    def poll(self) -> List[Document]:
+        """Publish finished scans into their documents; return the documents updated
+
+        Call from the thread that owns the documents. Afterwards the token
+        budget is enforced.
+        """
+        with self._ready:
+            finished, self._finished = self._finished, []
+            for job in finished:
+                if self._jobs.get(job.document) is job:
+                    del self._jobs[job.document]
+        updated = []
+        for job in finished:
+            document = job.document
+            if (job.cancelled or job.code != document.code or document.state is not None
+                    or job.compiled is not document.lexer.compiled()):
+                continue
+            document.lexer.publish(job.state)
+            updated.append(document)
+        if updated:
+            self.evict()
+        return updated
+
+    def evict(self) -> List[Document]:
+        """Drop the token buffers of the least recently shown documents until within budget"""
+        total = sum(document.token_count for document in self.documents)
+        evicted = []
+        for document in sorted(self.documents, key=lambda document: document.last_active):
+            if total <= self.max_tokens:
+                break
+            if document is self.active or not document.token_count:
+                continue
+            total -= document.token_count
+            document.lexer.reset()
+            evicted.append(document)
+        return evicted
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker thread; queued scans are abandoned"""
+        with self._ready:
+            self._closed = True
+            self._ready.notify_all()
+        if wait and self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,323 @@
+"""
+Statistics module for LexVi
+Aggregates token and line statistics over any number of inputs in one streaming pass
+
+Tokens are consumed as CompiledLexer.iter_tokens produces them and are not
+kept. Every aggregate has a fixed size: one counter per token type, a
+Space-Saving sketch of the most frequent identifiers, a histogram with
+fixed length buckets, and a heap of the longest lines. Memory therefore
+depends on the settings, not on how much input is read.
+
+Files up to STREAM_CHUNK characters are read whole. Larger ones are read
+in chunks and scanned in windows: each window is scanned up to LOOKAHEAD
+characters before its end, cut where the scanner stopped, and the rest is
+carried into the next window. A token pattern may look arbitrarily far
+ahead (see lexer.aio), so a token needing to see more than LOOKAHEAD
+characters past the cut, such as a longer string spanning it, can come
+out differently than in a whole-file scan.
+"""
+
+import codecs
+import heapq
+import os
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from lexer.core import CompiledLexer, Lexer, Token, TokenType
+from lexer.language import LanguageDefinition, language_for_path
+from lexer.symbols import NullSymbolTable
+
+# Identifiers tracked by the heavy-hitters sketch
+TOP_K = 200
+
+# Longest lines remembered
+LONGEST_LINES = 10
+
+# Upper bounds of the token length buckets, as in the lexer profile
+LENGTH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+# Files larger than this many bytes are read and scanned in chunks of this many characters
+STREAM_CHUNK = 1 << 20
+
+# Characters at the end of a window left for the scanner to look ahead into
+LOOKAHEAD = 1 << 16
+
+class HeavyHitters:
+    """Space-Saving sketch of the most frequent keys in a stream
+
+    At most capacity keys are counted. A new key arriving when the sketch
+    is full takes over the counter of the least counted key and inherits its
+    count as an error bound, so any key seen more often than
+    total / capacity times is guaranteed to be present, and no count is
+    overestimated by more than its error.
+    """
+
+    def __init__(self, capacity: int = TOP_K):
+        self.capacity = capacity
+        self.total = 0
+        # key -> [count, error]
+        self._counters: Dict[str, List[int]] = {}
+        # (count, key) with one entry per counted key; a count may lag behind the
+        # counter and is refreshed when the entry reaches the top
+        self._heap: List[Tuple[int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def add(self, key: str):
+        """Count one occurrence of key"""
+        self.total += 1
+        counter = self._counters.get(key)
+        if counter is not None:
+            counter[0] += 1
+            return
+        if len(self._counters) < self.capacity:
+            self._counters[key] = [1, 0]
+            heapq.heappush(self._heap, (1, key))
+            return
+        heap = self._heap
+        while True:
+            count, smallest = heap[0]
+            current = self._counters[smallest][0]
+            if count == current:
+                break
+            heapq.heapreplace(heap, (current, smallest))
+        del self._counters[smallest]
+        self._counters[key] = [count + 1, count]
+        heapq.heapreplace(heap, (count + 1, key))
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """Return (key, count, error) for the n most counted keys; the true count is
+        between count - error and count"""
+        rows = sorted(((key, count, error) for key, (count, error) in self._counters.items()),
+                      key=lambda row: (-row[1], row[0]))
+        return rows if n is None else rows[:n]
+
+def read_chunks(path: str, encoding: str = 'utf-8', errors: str = 'replace',
+                chunk_size: int = STREAM_CHUNK) -> Iterator[str]:
+    """Yield the text of a file chunk by chunk, decoding it incrementally"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            text = decoder.decode(data)
+            if text:
+                yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+class _LineCounter:
+    """Counts lines of text fed in pieces into a TokenStatistics, keeping the longest"""
+
+    def __init__(self, stats: 'TokenStatistics', name: str):
+        self.stats = stats
+        self.name = name
+        self.number = 1
+        # Length of the line not yet ended by a newline
+        self.length = 0
+
+    def feed(self, text: str):
+        start = 0
+        end = text.find('\n')
+        while end >= 0:
+            self._line(self.length + end - start)
+            self.length = 0
+            self.number += 1
+            start = end + 1
+            end = text.find('\n', start)
+        self.length += len(text) - start
+        self.stats.chars += len(text)
+
+    def close(self):
+        if self.length:
+            self._line(self.length)
+            self.number += 1
+        self.stats.lines += self.number - 1
+
+    def _line(self, length: int):
+        heap = self.stats._longest
+        if len(heap) < self.stats.longest_lines:
+            heapq.heappush(heap, (length, self.name, self.number))
+        elif length > heap[0][0]:
+            heapq.heapreplace(heap, (length, self.name, self.number))
+
+class TokenStatistics:
+    """Token, identifier, length, line and error statistics accumulated over inputs"""
+
+    def __init__(self, top_k: int = TOP_K, longest_lines: int = LONGEST_LINES,
+                 buckets: Sequence[int] = LENGTH_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.identifiers = HeavyHitters(top_k)
+        self.longest_lines = longest_lines
+        self.type_counts: Dict[TokenType, int] = {token_type: 0 for token_type in TokenType}
+        # Token counts per length bucket; the last one counts everything longer
+        self.lengths = [0] * (len(self.buckets) + 1)
+        # Bucket index by length, for lengths up to the last bound
+        self._bucket_of = [bisect_left(self.buckets, length)
+                           for length in range(self.buckets[-1] + 1)]
+        # Min-heap of (length, input name, line number)
+        self._longest: List[Tuple[int, str, int]] = []
+        self.inputs = 0
+        self.chars = 0
+        self.lines = 0
+        self.errors = 0
+
+    @property
+    def tokens(self) -> int:
+        return sum(self.type_counts.values())
+
+    @property
+    def error_density(self) -> float:
+        """Lexing errors per 1000 lines"""
+        return self.errors * 1000 / self.lines if self.lines else 0.0
+
+    def add_tokens(self, tokens: Iterable[Token]):
+        """Count token types, lengths and identifiers"""
+        type_counts = self.type_counts
+        lengths = self.lengths
+        bucket_of = self._bucket_of
+        last_bound = len(bucket_of) - 1
+        overflow = len(lengths) - 1
+        add_identifier = self.identifiers.add
+        identifier = TokenType.IDENTIFIER
+        for token in tokens:
+            token_type = token.type
+            type_counts[token_type] += 1
+            length = len(token.value)
+            lengths[bucket_of[length] if length <= last_bound else overflow] += 1
+            if token_type is identifier:
+                add_identifier(token.value)
+
+    def add_lines(self, code: str, name: str = ''):
+        """Count the lines of code and keep the longest ones"""
+        counter = _LineCounter(self, name)
+        counter.feed(code)
+        counter.close()
+        self.inputs += 1
+
+    def add_text(self, code: str, compiled: Optional[CompiledLexer] = None, name: str = ''):
+        """Scan code with compiled (default settings if None) and add its statistics"""
+        compiled = compiled or Lexer().compiled()
+        state = compiled.start(code)
+        self.add_tokens(compiled.iter_tokens(state))
+        self.errors += len(state.errors) + state.errors_dropped
+        self.add_lines(code, name)
+
+    def add_chunks(self, chunks: Iterable[str], compiled: Optional[CompiledLexer] = None,
+                   name: str = '', lookahead: int = LOOKAHEAD):
+        """Scan text arriving in chunks and add its statistics as one input
+
+        About one chunk plus lookahead characters are held at a time; see the
+        module docstring for where the result can differ from add_text.
+        """
+        compiled = compiled or Lexer().compiled()
+        lines = _LineCounter(self, name)
+        carry = ''
+        for chunk in chunks:
+            window = carry + chunk
+            if len(window) <= lookahead:
+                carry = window
+                continue
+            state = compiled.start(window)
+            state.symbols = NullSymbolTable()
+            compiled.scan(state, len(window) - lookahead)
+            # An error run still open at the cut is rescanned whole with the next window
+            cut = state.pos if state.error_start is None else state.error_start
+            if cut == 0 or cut >= len(window):
+                # A token or error run reaches the end of the window: read more first
+                carry = window
+                continue
+            self.add_tokens(state.tokens)
+            self.errors += len(state.errors) + state.errors_dropped
+            lines.feed(window[:cut])
+            carry = window[cut:]
+        state = compiled.start(carry)
+        self.add_tokens(compiled.iter_tokens(state))
+        self.errors += len(state.errors) + state.errors_dropped
+        lines.feed(carry)
+        lines.close()
+        self.inputs += 1
+
+    def add_file(self, path: str, compiled: Optional[CompiledLexer] = None,
+                 encoding: str = 'utf-8'):
+        """Read, scan and add one file; files over STREAM_CHUNK bytes are read in chunks"""
+        if os.path.getsize(path) <= STREAM_CHUNK:
+            with open(path, 'r', encoding=encoding, errors='replace') as f:
+                self.add_text(f.read(), compiled, path)
+        else:
+            self.add_chunks(read_chunks(path, encoding, chunk_size=STREAM_CHUNK), compiled, path)
+
+    def add_files(self, paths: Iterable[str], language: Optional[LanguageDefinition] = None,
+                  encoding: str = 'utf-8') -> List[Tuple[str, OSError]]:
+        """Add files and the files under directories; return (path, error) for unreadable ones
+
+        Without a language, each file is lexed with the built-in language for
+        its extension, and files of unknown types are skipped.
+        """
+        fixed = Lexer(language).compiled() if language is not None else None
+        # Compiled lexers by file extension
+        by_extension: Dict[str, Optional[CompiledLexer]] = {}
+        failures = []
+        for path in source_files(paths):
+            compiled = fixed
+            if compiled is None:
+                extension = os.path.splitext(path)[1].lower()
+                if extension not in by_extension:
+                    found = language_for_path(path)
+                    by_extension[extension] = found and Lexer(found).compiled()
+                compiled = by_extension[extension]
+                if compiled is None:
+                    continue
+            try:
+                self.add_file(path, compiled, encoding)
+            except OSError as e:
+                failures.append((path, e))
+        return failures
+
+    def length_histogram(self) -> List[Tuple[str, int]]:
+        """Return (label, count) rows grouping token lengths by upper bound"""
+        rows = []
+        low = 1
+        for high, count in zip(self.buckets, self.lengths):
+            rows.append((str(high) if low == high else f'{low}-{high}', count))
+            low = high + 1
+        rows.append((f'{low}+', self.lengths[-1]))
+        return rows
+
+    def longest(self) -> List[Tuple[int, str, int]]:
+        """Return (length, input name, line number) of the longest lines, longest first"""
+        return sorted(self._longest, key=lambda row: (-row[0], row[1], row[2]))
+
+    def report(self, top: int = 20) -> str:
+        """Format the statistics as plain-text tables"""
+        tokens = self.tokens
+        lines = [f"{self.inputs} inputs, {self.lines} lines, {self.chars} chars, "
+                 f"{tokens} tokens, {self.errors} errors "
+                 f"({self.error_density:.2f} per 1000 lines)", '',
+                 f"{'Type':<12}{'Tokens':>12}{'Share':>9}"]
+        for token_type, count in sorted(self.type_counts.items(), key=lambda item: -item[1]):
+            if count:
+                lines.append(f"{token_type.value:<12}{count:>12}{count * 100 / tokens:>8.1f}%")
+        lines += ['', f"{'Length':<12}{'Tokens':>12}"]
+        lines += [f"{label:<12}{count:>12}" for label, count in self.length_histogram()]
+        lines += ['', f"{'Identifier':<24}{'Count':>12}{'Error':>9}"]
+        lines += [f"{key:<24}{count:>12}{error:>9}"
+                  for key, count, error in self.identifiers.top(top)]
+        lines += ['', f"{'Length':>8}  Line"]
+        lines += [f"{length:>8}  {name or '<input>'}:{number}"
+                  for length, name, number in self.longest()]
+        return '\n'.join(lines)
+
+def source_files(paths: Iterable[str]) -> Iterator[str]:
+    """Yield the given files, and the files under the given directories in sorted order"""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(name for name in dirs if not name.startswith('.'))
+            for name in sorted(files):
+                yield os.path.join(root, name)
@@ -0,0 +1,103 @@
+"""
+Symbol table module for LexVi
+Interns token spellings as small integer ids and indexes where each one occurs
+"""
+
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Tuple
+
+class SymbolTable:
+    """Maps token spellings to integer symbol ids, with reverse lookup and use lists"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._uses: List[array] = []
+
+    @classmethod
+    def from_parts(cls, names: List[str], uses: List[array]) -> 'SymbolTable':
+        """Rebuild a table from its spellings and use lists, in symbol id order"""
+        table = cls()
+        table._names = names
+        table._ids = {text: symbol for symbol, text in enumerate(names)}
+        table._uses = uses
+        return table
+
+    def intern(self, text: str) -> int:
+        """Return the symbol id for a spelling, assigning a new one if needed"""
+        symbol = self._ids.get(text)
+        if symbol is None:
+            symbol = len(self._names)
+            self._ids[text] = symbol
+            self._names.append(text)
+            self._uses.append(array('I'))
+        return symbol
+
+    def record(self, text: str, token_index: int) -> Tuple[int, str]:
+        """Intern a spelling seen at token_index; return its id and canonical string"""
+        symbol = self.intern(text)
+        self._uses[symbol].append(token_index)
+        return symbol, self._names[symbol]
+
+    def truncated(self, token_count: int) -> 'SymbolTable':
+        """Return a copy that forgets uses at token indices token_count and above
+
+        Symbol ids are kept, so spellings whose uses all fall beyond the cut
+        stay in the table with no uses.
+        """
+        table = SymbolTable()
+        table._names = list(self._names)
+        table._ids = dict(self._ids)
+        table._uses = [uses[:bisect_left(uses, token_count)] for uses in self._uses]
+        return table
+
+    def add_use(self, symbol: int, token_index: int):
+        """Record a use of an existing symbol id"""
+        self._uses[symbol].append(token_index)
+
+    def lookup(self, text: str) -> Optional[int]:
+        """Return the id of a spelling, or None if it never occurred"""
+        return self._ids.get(text)
+
+    def name(self, symbol: int) -> str:
+        """Return the spelling of a symbol id"""
+        return self._names[symbol]
+
+    def count(self, symbol: int) -> int:
+        """Return how many tokens use a symbol"""
+        return len(self._uses[symbol])
+
+    def uses(self, symbol: int) -> array:
+        """Return the indices of the tokens that use a symbol, in order"""
+        return self._uses[symbol]
+
+    def uses_of(self, text: str) -> array:
+        """Return the token indices where a spelling occurs; empty if it never does"""
+        symbol = self._ids.get(text)
+        return self._uses[symbol] if symbol is not None else array('I')
+
+    def most_common(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Return (spelling, count) pairs, most frequent first"""
+        counts = sorted(((len(uses), symbol) for symbol, uses in enumerate(self._uses)),
+                        reverse=True)
+        return [(self._names[symbol], count) for count, symbol in counts[:n]]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, text: str) -> bool:
+        return text in self._ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+class NullSymbolTable(SymbolTable):
+    """Symbol table that records nothing, for scans whose tokens are not kept
+
+    Tokens scanned with it have no symbol id, and memory stays the same
+    however many tokens pass through.
+    """
+
+    def record(self, text: str, token_index: int) -> Tuple[Optional[int], str]:
+        return None, text
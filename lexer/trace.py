@@ -0,0 +1,114 @@
+"""
+Scanner trace module for LexVi
+Records character-level (state, char, next_state) steps in a fixed-size ring buffer
+
+The states are token-level: the scanner records each token as a step from
+START to the token's type, then one looping step per further character.
+They are not the internal states of the regex engine.
+"""
+
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+Step = Tuple[str, str, str]
+
+class TransitionTrace:
+    """Ring buffer of scanner transitions, one step per input character
+
+    Step offsets are character offsets into the lexed input, so any offset
+    still held in the buffer can be looked up directly. Memory is fixed at
+    six bytes per step of capacity: older steps are overwritten once the
+    buffer is full.
+    """
+
+    def __init__(self, capacity: int = 1 << 20):
+        if capacity <= 0:
+            raise ValueError("Trace capacity must be positive")
+        self.capacity = capacity
+        self.total = 0
+        self.state_names: List[str] = []
+        self._state_ids: Dict[str, int] = {}
+        self._from = array('B', [0]) * capacity
+        self._next = array('B', [0]) * capacity
+        self._chars = array('I', [0]) * capacity
+
+    def state_id(self, name: str) -> int:
+        """Return the compact id for a state name, assigning one if needed"""
+        state = self._state_ids.get(name)
+        if state is None:
+            if len(self.state_names) > 255:
+                raise ValueError("A trace can hold at most 256 distinct states")
+            state = len(self.state_names)
+            self.state_names.append(name)
+            self._state_ids[name] = state
+        return state
+
+    @property
+    def first_offset(self) -> int:
+        """Offset of the oldest step still held in the buffer"""
+        return max(0, self.total - self.capacity)
+
+    def __len__(self) -> int:
+        return self.total - self.first_offset
+
+    def clear(self):
+        """Forget all recorded steps"""
+        self.total = 0
+
+    def record_run(self, from_state: str, text: str, state: str):
+        """Record consuming ``text``: from_state -> state, then looping on state"""
+        n = len(text)
+        if not n:
+            return
+        first = self.state_id(from_state)
+        current = self.state_id(state)
+        offset = self.total
+        self.total += n
+        if n > self.capacity:
+            # Only the tail of the run survives in the buffer
+            skipped = n - self.capacity
+            text = text[skipped:]
+            offset += skipped
+            n = self.capacity
+            first = current
+
+        chars = array('I')
+        chars.frombytes(text.encode('utf-32-le', 'surrogatepass'))
+        states = array('B', [current]) * n
+        nexts = array('B', [current]) * n
+        states[0] = first
+
+        start = offset % self.capacity
+        head = min(n, self.capacity - start)
+        self._from[start:start + head] = states[:head]
+        self._next[start:start + head] = nexts[:head]
+        self._chars[start:start + head] = chars[:head]
+        if head < n:
+            tail = n - head
+            self._from[:tail] = states[head:]
+            self._next[:tail] = nexts[head:]
+            self._chars[:tail] = chars[head:]
+
+    def __getitem__(self, offset: int) -> Step:
+        """Return the step that consumed the character at ``offset``"""
+        if not self.first_offset <= offset < self.total:
+            raise IndexError(f"Offset {offset} is not held in the trace")
+        slot = offset % self.capacity
+        return (self.state_names[self._from[slot]], chr(self._chars[slot]),
+                self.state_names[self._next[slot]])
+
+    def steps(self, start: Optional[int] = None, stop: Optional[int] = None) -> Iterator[Step]:
+        """Iterate over steps in [start, stop), clamped to what the buffer holds"""
+        start = self.first_offset if start is None else max(start, self.first_offset)
+        stop = self.total if stop is None else min(stop, self.total)
+        for offset in range(start, stop):
+            yield self[offset]
+
+    def frames(self, start: Optional[int] = None,
+               steps_per_frame: int = 1) -> Iterator[Tuple[int, Step]]:
+        """Yield (offset, step) for the last step of each batch of ``steps_per_frame``"""
+        offset = self.first_offset if start is None else max(start, self.first_offset)
+        while offset < self.total:
+            last = min(offset + steps_per_frame, self.total) - 1
+            yield last, self[last]
+            offset = last + 1
@@ -0,0 +1,57 @@
+"""
+Test module for the asyncio tokenization API
+"""
+
+import asyncio
+from lexer.aio import aiter_tokens, atokenize
+from lexer.core import Lexer
+from lexer.profile import LexerStats
+
+CODE = "def f(x):\n    return x + 'é' @ 42\n" * 200
+
+def stream_of(text, chunk=7):
+    """Return a StreamReader fed with text in small chunks, split mid-character"""
+    reader = asyncio.StreamReader()
+    data = text.encode("utf-8")
+    for i in range(0, len(data), chunk):
+        reader.feed_data(data[i:i + chunk])
+    reader.feed_eof()
+    return reader
+
+def summary(tokens):
+    return [(t.type, t.value, t.line, t.column, t.symbol) for t in tokens]
+
+def test_atokenize_matches_tokenize():
+    """Test that sliced async scanning gives the same result as tokenize"""
+    expected = Lexer()
+    expected.tokenize(CODE)
+
+    async def run():
+        inline = await atokenize(stream_of(CODE), slice_size=100)
+        threaded = await atokenize(stream_of(CODE), slice_size=5000)
+        return inline, threaded
+
+    for state in asyncio.run(run()):
+        assert summary(state.tokens) == summary(expected.tokens)
+        assert state.errors == expected.errors
+        assert list(state.symbols) == list(expected.symbols)
+
+def test_concurrent_scans_share_one_lexer():
+    """Test that one lexer serves concurrent streams without mixing their state"""
+    lexer = Lexer()
+    lexer.stats = LexerStats()
+    compiled = lexer.compiled()
+    other = "x = 1\n" * 500
+
+    async def collect(text):
+        return [token async for token in aiter_tokens(stream_of(text), lexer, slice_size=64)]
+
+    async def run():
+        return await asyncio.gather(collect(CODE), collect(other), atokenize(stream_of("")))
+
+    first, second, empty = asyncio.run(run())
+    assert summary(first) == summary(Lexer().tokenize(CODE))
+    assert summary(second) == summary(Lexer().tokenize(other))
+    assert empty.tokens == [] and empty.done
+    assert lexer.tokens == []
+    assert lexer.compiled() is compiled and lexer.stats.runs == 0
@@ -2,24 +2,22 @@
 Test module for DFA Visualizer
 """
 
+import os
+import tempfile
 import unittest
-import tkinter as tk
+from visualizer.backends import RasterBackend, SVGBackend, render_automaton
 from visualizer.dfa_visualizer import DFAVisualizer
-from lexer.core import Token, TokenType
+from lexer.core import Lexer, Token, TokenType
+from lexer.trace import TransitionTrace
 
 class TestDFAVisualizer(unittest.TestCase):
     """Test cases for DFA Visualizer"""
     
     def setUp(self):
         """Set up test environment"""
-        self.root = tk.Tk()
-        self.canvas = tk.Canvas(self.root)
+        self.canvas = SVGBackend()
         self.visualizer = DFAVisualizer(self.canvas)
         
-    def tearDown(self):
-        """Clean up test environment"""
-        self.root.destroy()
-        
     def test_add_state(self):
         """Test adding states to the visualization"""
         self.visualizer.add_state("START")
@@ -46,9 +44,10 @@ class TestDFAVisualizer(unittest.TestCase):
         self.visualizer.add_transition("START", "IDENTIFIER", "letter")
         
         token = Token(TokenType.IDENTIFIER, "test", 1, 1)
-        self.visualizer.animate_token_flow([token])
+        self.visualizer.animate_token_flow([token, token])
         
-        # Animation should be queued
+        # The first token is shown at once and the rest queued
+        self.assertEqual(self.visualizer.current_state, "IDENTIFIER")
         self.assertEqual(len(self.visualizer.animation_queue), 1)
         
     def test_clear(self):
@@ -64,5 +63,110 @@ class TestDFAVisualizer(unittest.TestCase):
         self.assertIsNone(self.visualizer.current_state)
         self.assertEqual(len(self.visualizer.animation_queue), 0)
 
+class TestHeadlessRendering(unittest.TestCase):
+    """Test cases for offscreen DFA rendering (no display needed)"""
+    
+    def test_svg_backend_records_drawing(self):
+        """Test drawing a DFA through the SVG backend"""
+        backend = SVGBackend()
+        visualizer = DFAVisualizer(backend)
+        visualizer.add_state("START")
+        visualizer.add_state("IDENTIFIER", True)
+        visualizer.add_transition("START", "IDENTIFIER", "letter")
+        
+        svg = backend.to_svg()
+        self.assertTrue(svg.startswith("<svg"))
+        self.assertIn(">IDENTIFIER</text>", svg)
+        self.assertIn(">letter</text>", svg)
+        
+        visualizer.clear()
+        self.assertEqual(backend.find_all(), ())
+        
+    def test_load_automaton(self):
+        """Test loading a whole automaton without construction animation"""
+        states = [("START", False), ("KEYWORD", True), ("ERROR", False)]
+        transitions = [("START", "KEYWORD", "letter"), ("START", "ERROR", "other")]
+        visualizer = DFAVisualizer(SVGBackend())
+        visualizer.load_automaton(states, transitions)
+        
+        self.assertEqual(list(visualizer.states), ["START", "KEYWORD", "ERROR"])
+        self.assertEqual(visualizer.transitions, transitions)
+        token = Token(TokenType.KEYWORD, "if", 1, 1)
+        self.assertEqual(visualizer.state_for_token(token), "KEYWORD")
+        token = Token(TokenType.STRING, "'x'", 1, 1)
+        self.assertEqual(visualizer.state_for_token(token), "ERROR")
+        
+    def test_large_graph_renders_every_item(self):
+        """Test that a 500-state automaton draws every state and edge once"""
+        states = [("START", False)] + [(f"S{i}", True) for i in range(500)]
+        transitions = [("START", f"S{i}", "x") for i in range(500)]
+        backend = SVGBackend()
+        DFAVisualizer(backend).load_automaton(states, transitions)
+        # Two items per plain state, four per final state, five per edge
+        self.assertEqual(len(backend.find_all()), 2 + 4 * 500 + 5 * 500)
+        self.assertEqual(backend.to_svg().count(">S499</text>"), 1)
+        
+    def test_trace_replay_runs_offscreen(self):
+        """Test that queued animation callbacks run without an event loop"""
+        backend = SVGBackend()
+        visualizer = DFAVisualizer(backend)
+        visualizer.load_automaton(*Lexer().automaton())
+        frames = []
+        trace = TransitionTrace()
+        Lexer().tokenize("x = 1", trace=trace)
+        visualizer.replay_trace(trace, on_frame=frames.append)
+        backend.run_pending()
+        self.assertEqual(frames, [0, 1, 2, 3, 4])
+        self.assertIsNone(visualizer.current_state)
+        
+        small = TransitionTrace(capacity=3)
+        Lexer().tokenize("x = 1", trace=small)
+        frames.clear()
+        visualizer.max_trace_frames = 3
+        visualizer.replay_trace(small, start=0, on_frame=frames.append)
+        backend.run_pending()
+        self.assertEqual(frames, [2, 3, 4])
+        frames.clear()
+        visualizer.replay_trace(small, start=99, on_frame=frames.append)
+        backend.run_pending()
+        self.assertEqual(frames, [])
+        
+    def test_edge_geometry_is_cached_until_a_state_moves(self):
+        """Test that redraws reuse edge geometry and moves invalidate it"""
+        visualizer = DFAVisualizer(SVGBackend())
+        visualizer.load_automaton([("START", False), ("A", True), ("B", True)],
+                                  [("START", "A", "x"), ("A", "A", "y"), ("START", "B", "z")])
+        cached = visualizer._geometry_cache[("START", "A")]
+        visualizer.redraw()
+        self.assertIs(visualizer._geometry_cache[("START", "A")], cached)
+        
+        visualizer.move_state("A", 500, 40)
+        self.assertNotIn(("START", "A"), visualizer._geometry_cache)
+        self.assertNotIn(("A", "A"), visualizer._geometry_cache)
+        self.assertIn(("START", "B"), visualizer._geometry_cache)
+        points, _, _, _ = visualizer._edge_geometry("START", "A")
+        end_x, end_y = points[-2:]
+        distance = ((end_x - 500) ** 2 + (end_y - 40) ** 2) ** 0.5
+        self.assertAlmostEqual(distance, visualizer.node_radius)
+        
+    def test_render_automaton_to_png(self):
+        """Test writing a PNG image of the lexer automaton"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "dfa.png")
+            render_automaton(*Lexer().automaton(), path, active_state="IDENTIFIER")
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(8), b"\x89PNG\r\n\x1a\n")
+                
+    def test_raster_backend_fills_shapes(self):
+        """Test that the raster backend paints filled ovals"""
+        backend = RasterBackend(20, 20, background="#000000")
+        backend.create_oval(5, 5, 15, 15, fill="#FF0000")
+        ppm = backend.to_ppm()
+        header = b"P6 20 20 255\n"
+        pixels = ppm[len(header):]
+        center = (10 * 20 + 10) * 3
+        self.assertEqual(pixels[center:center + 3], b"\xff\x00\x00")
+        self.assertEqual(pixels[0:3], b"\x00\x00\x00")
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+Test module for the token diff
+"""
+
+import random
+
+from lexer.diff import diff_keys, diff_texts
+
+def _apply(a, b, opcodes):
+    """Rebuild b from a and the opcodes, checking that they cover both sequences"""
+    out = []
+    i = j = 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        assert (i1, j1) == (i, j)
+        if tag == 'equal':
+            assert a[i1:i2] == b[j1:j2]
+            out += a[i1:i2]
+        else:
+            out += b[j1:j2]
+        i, j = i2, j2
+    assert (i, j) == (len(a), len(b))
+    return out
+
+def test_diff_keys_rebuilds_the_new_sequence():
+    """Test that opcodes for random edits are complete and minimal for a single change"""
+    rng = random.Random(7)
+    for _ in range(200):
+        a = [rng.randrange(4) for _ in range(rng.randrange(30))]
+        b = list(a)
+        for _ in range(rng.randrange(4)):
+            at = rng.randrange(len(b) + 1)
+            b[at:at + rng.randrange(3)] = [rng.randrange(6) for _ in range(rng.randrange(3))]
+        assert _apply(a, b, diff_keys(a, b)) == b
+    assert diff_keys([1, 2, 3], [1, 2, 3]) == [('equal', 0, 3, 0, 3)]
+    assert diff_keys([1, 2, 3], [1, 9, 3]) == [('equal', 0, 1, 0, 1), ('replace', 1, 2, 1, 2),
+                                               ('equal', 2, 3, 2, 3)]
+
+def test_diff_texts_reports_token_changes():
+    """Test that inserted, deleted and changed tokens are told apart"""
+    old = "x = 1\ny = x + 2\nprint(y)\n"
+    new = "x = 5\ny = x + 2\nz = y\nprint(y)\n"
+    diff = diff_texts(old, new)
+    assert diff.changed
+    changes = list(diff.changes())
+    assert [(kind, a.value, b.value) for kind, a, b in changes if kind == 'change'] == [
+        ('change', '1', '5')]
+    assert [b.value for kind, _, b in changes if kind == 'insert'] == ['z', '=', 'y']
+    assert diff.counts() == {'insert': 3, 'delete': 0, 'change': 1}
+    assert not diff_texts(old, old).changed
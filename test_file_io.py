@@ -0,0 +1,85 @@
+"""
+Test module for chunked and paged file I/O
+"""
+
+import os
+import stat
+
+import pytest
+
+from gui.file_io import ChunkedReader, FileWatcher, PagedFile, write_chunks
+
+TEXT = "naïve = 'é' + x  # ünïcode\n" * 5000
+
+def test_chunked_reader_decodes_across_chunks(tmp_path):
+    """Test that multi-byte characters split between chunks are decoded intact"""
+    path = tmp_path / "big.py"
+    path.write_text(TEXT, encoding="utf-8")
+    reader = ChunkedReader(str(path), chunk_size=7).start()
+    assert reader.read_all() == TEXT
+    assert reader.done and reader.progress == 1.0
+
+    reader = ChunkedReader(str(path), chunk_size=4096).start()
+    parts = []
+    while not reader.done:
+        parts.append(reader.poll(max_chars=1000))
+    assert "".join(parts) == TEXT
+
+def test_write_chunks_replaces_file(tmp_path):
+    """Test that chunked writes produce the joined text and leave no temporary file"""
+    path = tmp_path / "out.py"
+    path.write_text("old")
+    write_chunks(str(path), (TEXT[i:i + 999] for i in range(0, len(TEXT), 999)))
+    assert path.read_text(encoding="utf-8") == TEXT
+    assert [p.name for p in tmp_path.iterdir()] == ["out.py"]
+
+def test_write_chunks_keeps_mode_and_symlinks(tmp_path):
+    """Test that saving keeps the file's permission bits and writes through a symlink"""
+    target = tmp_path / "real.py"
+    target.write_text("old")
+    target.chmod(0o644)
+    link = tmp_path / "link.py"
+    link.symlink_to(target)
+    write_chunks(str(link), ["new"])
+    assert link.is_symlink()
+    assert target.read_text() == "new"
+    assert stat.S_IMODE(target.stat().st_mode) == 0o644
+
+def test_chunked_reader_rejects_undecodable_files(tmp_path):
+    """Test that a file in another encoding fails to load instead of being mangled"""
+    path = tmp_path / "latin1.py"
+    path.write_bytes("caf\u00e9 = 1\n".encode("latin-1"))
+    reader = ChunkedReader(str(path)).start()
+    with pytest.raises(UnicodeDecodeError):
+        reader.read_all()
+
+def test_paged_file_pages_whole_lines(tmp_path):
+    """Test that pages split on line ends and together hold the whole file"""
+    path = tmp_path / "big.py"
+    path.write_text(TEXT, encoding="utf-8")
+    paged = PagedFile(str(path), page_size=1000)
+    pages = [paged.page(i) for i in range(len(paged))]
+    paged.close()
+    assert "".join(pages) == TEXT
+    assert all(page.endswith("\n") for page in pages if page)
+    assert len(pages) > 100
+
+def test_file_watcher_debounces_writes(tmp_path):
+    """Test that a burst of writes is reported once, after it settles"""
+    path = tmp_path / "generated.py"
+    path.write_text("x = 1\n")
+    watcher = FileWatcher(settle=1.0)
+    watcher.watch(str(path))
+    assert watcher.poll(now=0.0) == []
+    for step in range(3):
+        path.write_text("x = 1\n" * (step + 2))
+        os.utime(path, ns=(step * 10 ** 9, step * 10 ** 9))
+        assert watcher.poll(now=10.0 + step * 0.5) == []
+    assert watcher.poll(now=11.5) == []
+    assert watcher.poll(now=12.1) == [str(path)]
+    assert watcher.poll(now=20.0) == []
+
+    # Our own save is taken as seen
+    path.write_text("y = 2\n")
+    watcher.watch(str(path))
+    assert watcher.poll(now=30.0) == [] and watcher.poll(now=40.0) == []
@@ -0,0 +1,56 @@
+"""
+Test module for GUI instrumentation
+"""
+
+import json
+import threading
+
+from gui.instrument import Instrumentation
+
+def test_spans_summary_and_bound():
+    """Test that spans keep their args, summarize per name and stay within the bound"""
+    recorder = Instrumentation(max_events=5)
+    with recorder.span('lex', 'lexer', chars=10) as args:
+        args['tokens'] = 3
+    for _ in range(6):
+        with recorder.span('table fill'):
+            pass
+    assert len(recorder.spans) == 5
+    assert recorder.last('lex') is None
+    rows = recorder.summary()
+    assert [(name, count) for name, count, *_ in rows] == [('table fill', 5)]
+    recorder.enabled = False
+    with recorder.span('highlight'):
+        pass
+    assert recorder.last('highlight') is None
+
+def test_chrome_trace_export(tmp_path):
+    """Test that spans from several threads, counters and memory samples export as trace events"""
+    recorder = Instrumentation()
+    with recorder.span('lex', 'lexer', chars=4) as args:
+        args['tokens'] = 2
+    worker = threading.Thread(target=lambda: recorder.add_span('scan', recorder.origin_ns + 5000,
+                                                               1000), name='worker')
+    worker.start()
+    worker.join()
+    recorder.count('canvas items', 12)
+    recorder.start_memory()
+    try:
+        data = [bytearray(1024) for _ in range(100)]
+        recorder.sample_memory()
+        assert recorder.memory_top(3)
+    finally:
+        recorder.stop_memory()
+    assert data and recorder.latest_samples()['traced MB'] > 0
+    path = tmp_path / 'trace.json'
+    recorder.export(str(path))
+    events = json.loads(path.read_text())['traceEvents']
+    spans = {event['name']: event for event in events if event['ph'] == 'X'}
+    assert spans['lex']['args'] == {'chars': 4, 'tokens': 2}
+    assert spans['lex']['cat'] == 'lexer' and spans['lex']['dur'] >= 0
+    assert spans['scan']['tid'] != spans['lex']['tid']
+    assert (spans['scan']['ts'], spans['scan']['dur']) == (5, 1)
+    names = {event['args']['name'] for event in events if event['ph'] == 'M'}
+    assert {'worker', threading.main_thread().name} <= names
+    counters = {event['name']: event['args']['value'] for event in events if event['ph'] == 'C'}
+    assert counters['canvas items'] == 12 and 'peak MB' in counters
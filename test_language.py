@@ -0,0 +1,99 @@
+"""
+Test module for language definitions
+"""
+
+import os
+import pytest
+from lexer.core import Lexer, TokenType
+from lexer.language import (LanguageError, available_languages, language_for_path,
+                            load_language)
+
+def types_and_values(tokens):
+    return [(token.type, token.value) for token in tokens]
+
+def test_builtin_languages():
+    """Test that the built-in definitions load and the default is Python"""
+    assert {"python", "c", "sql"} <= set(available_languages())
+    assert Lexer().language.name == "python"
+    assert language_for_path("query.SQL").name == "sql"
+    assert language_for_path("notes.unknown") is None
+    with pytest.raises(LanguageError):
+        load_language("cobol")
+
+def test_c_language():
+    """Test priorities: comments before operators, floats before integers"""
+    lexer = Lexer(load_language("c"))
+    tokens = lexer.tokenize("#include <x>\nint a = 1.5e3 / 0x1F; // done\n")
+
+    assert types_and_values(tokens) == [
+        (TokenType.KEYWORD, "#include"), (TokenType.OPERATOR, "<"),
+        (TokenType.IDENTIFIER, "x"), (TokenType.OPERATOR, ">"),
+        (TokenType.KEYWORD, "int"), (TokenType.IDENTIFIER, "a"),
+        (TokenType.OPERATOR, "="), (TokenType.FLOAT, "1.5e3"),
+        (TokenType.OPERATOR, "/"), (TokenType.INTEGER, "0x1F"),
+        (TokenType.DELIMITER, ";")]
+    assert lexer.errors == []
+
+def test_sql_keywords_case_insensitive():
+    """Test that case-insensitive keyword tables match any spelling"""
+    lexer = Lexer(load_language("sql"))
+    tokens = lexer.tokenize("Select name FROM users where id = 'o''k'")
+
+    assert [token.type for token in tokens] == [
+        TokenType.KEYWORD, TokenType.IDENTIFIER, TokenType.KEYWORD, TokenType.IDENTIFIER,
+        TokenType.KEYWORD, TokenType.IDENTIFIER, TokenType.OPERATOR, TokenType.STRING]
+    assert lexer.patterns_signature() != Lexer().patterns_signature()
+
+def test_toml_definition_and_compiled_cache(tmp_path):
+    """Test loading a user TOML definition and reusing its compiled form"""
+    path = tmp_path / "mini.toml"
+    path.write_text(
+        'name = "mini"\n'
+        'keywords = ["let"]\n'
+        '[[tokens]]\ntype = "IDENTIFIER"\npattern = "[a-z]+"\npriority = 1\n'
+        '[[tokens]]\ntype = "INTEGER"\npattern = "[0-9]+"\npriority = 2\n'
+        '[[tokens]]\ntype = "WHITESPACE"\npattern = "\\\\s+"\n')
+    cache_dir = tmp_path / "compiled"
+
+    language = load_language(str(path), cache_dir=str(cache_dir))
+    assert [token_type for token_type, _ in language.tokens] == ["INTEGER", "IDENTIFIER",
+                                                                  "WHITESPACE"]
+    assert len(os.listdir(cache_dir)) == 1
+    again = load_language(str(path), cache_dir=str(cache_dir))
+    assert again.tokens == language.tokens
+    assert again.keywords == language.keywords
+
+    tokens = Lexer(again).tokenize("let x 42")
+    assert types_and_values(tokens) == [(TokenType.KEYWORD, "let"),
+                                        (TokenType.IDENTIFIER, "x"),
+                                        (TokenType.INTEGER, "42")]
+
+def test_invalid_definitions(tmp_path):
+    """Test that bad token types and patterns are reported"""
+    for rule in ('{"type": "NUMBER", "pattern": "[0-9]+"}',
+                 '{"type": "INTEGER", "pattern": "[0-9"}',
+                 '{"type": "INTEGER", "pattern": "[0-9]*"}'):
+        path = tmp_path / "bad.json"
+        path.write_text('{"name": "bad", "tokens": [%s]}' % rule)
+        with pytest.raises(LanguageError):
+            load_language(str(path), cache_dir=str(tmp_path / "compiled"))
+    path.write_text('{"name": "bad", "tokens": [{"type": "KEYWORD", "pattern": "(?i)select"}]}')
+    with pytest.raises(LanguageError, match=r"KEYWORD pattern '\(\?i\)select'.*\(\?i:"):
+        load_language(str(path), cache_dir=str(tmp_path / "compiled"))
+    path.write_text('{"name": "bad", "tokens": [{"type": "INTEGER", "pattern": "(?P<n>[0-9]+)"},'
+                    ' {"type": "FLOAT", "pattern": "(?P<n>[0-9]+)[.]"}]}')
+    with pytest.raises(LanguageError, match="do not combine"):
+        load_language(str(path), cache_dir=str(tmp_path / "compiled"))
+    with pytest.raises(LanguageError, match="Cannot read"):
+        load_language(str(tmp_path / "missing.json"), cache_dir=str(tmp_path / "compiled"))
+
+def test_compiled_write_failure(tmp_path, monkeypatch):
+    """Test that a failed compiled-form write leaves no temporary file behind"""
+    path = tmp_path / "ok.json"
+    path.write_text('{"name": "ok", "tokens": [{"type": "INTEGER", "pattern": "[0-9]+"}]}')
+    def fail(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, 'replace', fail)
+    definition = load_language(str(path), cache_dir=str(tmp_path / "compiled"))
+    assert definition.name == "ok"
+    assert os.listdir(tmp_path / "compiled") == []
@@ -3,7 +3,10 @@ Test module for the lexer functionality
 """
 
 import pytest
-from lexer.core import Lexer, Token, TokenType
+from lexer.core import Lexer, RecoveryMode, Token, TokenType, changed_span
+from lexer.pool import LexerPool
+from lexer.positions import LineIndex
+from lexer.profile import LexerStats
 
 def test_basic_tokenization():
     """Test basic tokenization of simple code"""
@@ -81,4 +84,229 @@ def test_comment_handling():
     assert tokens[1].type == TokenType.OPERATOR
     assert tokens[1].value == "="
     assert tokens[2].type == TokenType.INTEGER
-    assert tokens[2].value == "42" 
\ No newline at end of file
+    assert tokens[2].value == "42" 
+
+def test_automaton_matches_token_patterns():
+    """Test that the derived automaton has a state for every token pattern"""
+    lexer = Lexer()
+    states, transitions = lexer.automaton()
+    names = [name for name, _ in states]
+    
+    assert names[0] == "START"
+    assert "ERROR" in names
+    for token_type, _ in Lexer.TOKEN_PATTERNS:
+        assert token_type.value in names
+        assert any(src == "START" and dst == token_type.value for src, dst, _ in transitions)
+    assert ("IDENTIFIER", "IDENTIFIER", "a-zA-Z0-9_") in transitions
+    assert lexer.patterns_signature() == Lexer().patterns_signature()
+
+def test_keywords_resolved_from_identifiers():
+    """Test that keywords are classified only when the whole identifier matches"""
+    lexer = Lexer()
+    tokens = lexer.tokenize("if iffy _if else2 await")
+    
+    assert [token.type for token in tokens] == [
+        TokenType.KEYWORD, TokenType.IDENTIFIER, TokenType.IDENTIFIER,
+        TokenType.IDENTIFIER, TokenType.KEYWORD]
+    assert "while" in Lexer.KEYWORDS
+
+def test_symbol_interning():
+    """Test that repeated spellings share one symbol id and string"""
+    lexer = Lexer()
+    tokens = lexer.tokenize("self.x = self.y + 'self'")
+    symbols = lexer.symbols
+    
+    self_id = symbols.lookup("self")
+    assert tokens[0].symbol == self_id
+    assert tokens[4].symbol == self_id
+    assert tokens[0].value is tokens[4].value
+    assert symbols.name(self_id) == "self"
+    assert symbols.count(self_id) == 2
+    assert list(symbols.uses_of("self")) == [0, 4]
+    assert list(symbols.uses_of(".")) == [1, 5]
+    assert tokens[-1].type == TokenType.STRING
+    assert tokens[-1].symbol is None
+    assert "missing" not in symbols
+    assert list(symbols.uses_of("missing")) == []
+
+def test_profiling_counts_attempts():
+    """Test that an attached profile counts per-pattern attempts without changing tokens"""
+    code = "x = 12 + 'ab'  # done\ny = x"
+    expected = [(t.type, t.value, t.line, t.column) for t in Lexer().tokenize(code)]
+    lexer = Lexer()
+    lexer.stats = LexerStats()
+    tokens = lexer.tokenize(code)
+    stats = lexer.stats
+    
+    assert [(t.type, t.value, t.line, t.column) for t in tokens] == expected
+    by_type = {row.token_type: row for row in stats.patterns}
+    assert by_type[TokenType.IDENTIFIER].hits == 3
+    assert by_type[TokenType.IDENTIFIER].attempts == by_type[TokenType.IDENTIFIER].hits + \
+        by_type[TokenType.INTEGER].attempts
+    assert by_type[TokenType.STRING].bytes == 4
+    assert sum(row.hits for row in stats.patterns) == sum(stats.lengths.values())
+    assert stats.runs == 1 and stats.tokens == len(tokens)
+    
+    compiled = stats._rule_matches
+    lexer.tokenize(code)
+    assert stats.runs == 2
+    assert by_type[TokenType.IDENTIFIER].hits == 6
+    assert stats._rule_matches is compiled
+
+def test_accelerated_scan_matches_tokenize():
+    """Test that the NumPy pre-pass produces exactly the regular tokens and errors"""
+    pytest.importorskip("numpy")
+    from lexer import accel
+    code = ("def f(x1, _y):\n    return x1 + 12 * 3.5 - 7ab # note\n"
+            "s = 'a b' + \"c\nd\"  @ $\n\tz=[1,2]; w.v\x0b\x1c\n") * 50
+    expected = Lexer()
+    expected.accelerate = False
+    fast = Lexer()
+    
+    tokens = accel.tokenize(fast, code)
+    assert [(t.type, t.value, t.line, t.column, t.symbol) for t in tokens] == \
+        [(t.type, t.value, t.line, t.column, t.symbol) for t in expected.tokenize(code)]
+    assert fast.errors == expected.errors
+    assert list(fast.symbols) == list(expected.symbols)
+    assert (fast.current_line, fast.current_column) == \
+        (expected.current_line, expected.current_column)
+
+def test_accelerated_scan_falls_back():
+    """Test that unsupported inputs and pattern tables take the regular path"""
+    from lexer import accel
+    from lexer.language import load_language
+    
+    assert accel.tokenize(Lexer(), "naïve = 1") is None
+    assert accel.tokenize(Lexer(load_language("c")), "int x = 1;") is None
+    code = "naïve = 1\n" * (Lexer.ACCELERATE_MIN_LENGTH // 10 + 1)
+    assert len(Lexer().tokenize(code)) == 4 * code.count("\n")
+
+def test_error_spans_and_recovery():
+    """Test that adjacent bad characters merge and recovery modes skip further"""
+    code = "a = @@$ b?c\nd"
+    lexer = Lexer()
+    tokens = lexer.tokenize(code)
+    
+    assert lexer.errors == [("Unrecognized token: @@$", 1, 5), ("Unrecognized token: ?", 1, 10)]
+    assert [t.value for t in tokens] == ["a", "=", "b", "c", "d"]
+    
+    lexer.recovery = RecoveryMode.SKIP_TO_WHITESPACE
+    tokens = lexer.tokenize(code)
+    assert lexer.errors == [("Unrecognized token: @@$", 1, 5), ("Unrecognized token: ?c", 1, 10)]
+    assert [t.value for t in tokens] == ["a", "=", "b", "d"]
+    
+    lexer.recovery = RecoveryMode.SKIP_LINE
+    tokens = lexer.tokenize(code)
+    assert lexer.errors == [("Unrecognized token: @@$ b?c", 1, 5)]
+    assert [(t.value, t.line, t.column) for t in tokens] == [("a", 1, 1), ("=", 1, 3), ("d", 2, 1)]
+
+def test_errors_are_capped():
+    """Test that errors beyond MAX_ERRORS are counted, and long spans shortened"""
+    lexer = Lexer()
+    lexer.tokenize("@ " * (Lexer.MAX_ERRORS + 5))
+    assert len(lexer.errors) == Lexer.MAX_ERRORS
+    assert lexer.errors_dropped == 5
+    
+    lexer.tokenize("$" * 100)
+    assert lexer.errors == [("Unrecognized token: " + "$" * 32 + "… (100 chars)", 1, 1)]
+    assert lexer.errors_dropped == 0
+
+def test_compiled_lexer_is_shared_and_immutable():
+    """Test that a CompiledLexer scans like Lexer and cannot be changed"""
+    lexer = Lexer()
+    compiled = lexer.compiled()
+    state = compiled.tokenize("x = 1 @")
+    
+    assert [(t.type, t.value) for t in state.tokens] == \
+        [(t.type, t.value) for t in lexer.tokenize("x = 1 @")]
+    assert state.errors == lexer.errors
+    assert Lexer().compiled().scanner is compiled.scanner
+    with pytest.raises(AttributeError):
+        compiled.keywords = frozenset()
+    lexer.recovery = RecoveryMode.SKIP_LINE
+    assert lexer.compiled() is not compiled
+    assert lexer.compiled().recovery is RecoveryMode.SKIP_LINE
+
+def test_lexer_pool(tmp_path):
+    """Test parallel tokenizing and Lexer leasing through a pool"""
+    codes = [f"v{i} = {i} + w{i}\n" * (i + 1) for i in range(20)]
+    path = tmp_path / "a.py"
+    path.write_text(codes[3])
+    with LexerPool(max_workers=4) as pool:
+        states = list(pool.map(codes))
+        assert pool.submit(codes[5]).result().symbols.count(0) == 6
+        [(name, file_state)] = list(pool.tokenize_files([str(path)]))
+        with pool.lease() as lexer:
+            lexer.tokenize(codes[1])
+            first = lexer
+        with pool.lease() as lexer:
+            assert lexer is first
+            assert lexer.tokens == []
+    
+    for code, state in zip(codes, states):
+        assert [(t.type, t.value, t.line) for t in state.tokens] == \
+            [(t.type, t.value, t.line) for t in Lexer().tokenize(code)]
+    assert name == str(path)
+    assert len(file_state.tokens) == len(states[3].tokens)
+
+def test_line_index():
+    """Test offset to line/column conversion and back"""
+    text = "ab\n\ncd\n"
+    index = LineIndex(text)
+    assert len(index) == 4
+    assert [index.line_column(i) for i in range(len(text) + 1)] == \
+        [(1, 1), (1, 2), (1, 3), (2, 1), (3, 1), (3, 2), (3, 3), (4, 1)]
+    assert index.offset(3, 2) == 5
+    assert (index.line(5), index.column(5)) == (3, 2)
+
+def test_offset_mode_matches_line_tracking():
+    """Test that tokens with lazy positions report the same lines, columns and errors"""
+    code = "def f(x):\n    return x + 'y' # c\n\t@ z = 3.5 $$\n" * 20
+    expected = Lexer()
+    expected.tokenize(code)
+    lexer = Lexer()
+    lexer.track_lines = False
+    tokens = lexer.tokenize(code)
+    
+    assert [(t.type, t.value, t.line, t.column, t.symbol, t.offset) for t in tokens] == \
+        [(t.type, t.value, t.line, t.column, t.symbol, t.offset) for t in expected.tokens]
+    assert all(code.startswith(t.value, t.offset) for t in tokens)
+    assert lexer.errors == expected.errors
+    assert (lexer.current_line, lexer.current_column) == \
+        (expected.current_line, expected.current_column)
+
+def test_relex_matches_full_tokenize():
+    """Test that relexing after edits gives the same tokens, errors and symbols as a new run"""
+    code = "x = 'a'\ny = x + 1 $\n" * 30 + "z = y\n" * 30
+    for track_lines in (True, False):
+        lexer = Lexer()
+        lexer.track_lines = track_lines
+        lexer.tokenize(code)
+        text = code
+        for start, old_end, inserted in ((40, 41, "'"), (100, 100, "\nabc @ 'q' "),
+                                         (0, 8, ""), (len(code) - 12, len(code) - 12, "w")):
+            start = min(start, len(text))
+            text = text[:start] + inserted + text[old_end:]
+            tokens = lexer.relex(text, start, old_end, start + len(inserted))
+            expected = Lexer()
+            expected.tokenize(text)
+            assert [(t.type, t.value, t.line, t.column, t.offset) for t in tokens] == \
+                [(t.type, t.value, t.line, t.column, t.offset) for t in expected.tokens]
+            assert lexer.errors == expected.errors
+            assert [list(lexer.symbols.uses_of(name)) for name in expected.symbols] == \
+                [list(expected.symbols.uses_of(name)) for name in expected.symbols]
+            assert all(lexer.symbols.name(t.symbol) == t.value
+                       for t in tokens if t.symbol is not None)
+
+def test_changed_span_after_relex():
+    """Test that the changed span covers only the tokens an edit changed"""
+    lexer = Lexer()
+    code = "a = 1\nb = 'x'\nc = 2\n"
+    old = lexer.tokenize(code)
+    text = code.replace("a = 1", "a = 10")
+    assert changed_span(old, lexer.relex(text, 4, 5, 6), 1) == (4, 6)
+    old = lexer.tokens
+    text = text.replace("b = 'x'", "b = 'x")
+    new = lexer.relex(text, 13, 14, 13)
+    assert changed_span(old, new, -1) == (12, 13)
+    assert changed_span(new, list(new), 0) is None
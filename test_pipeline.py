@@ -0,0 +1,49 @@
+"""
+Test module for token pipelines and scanner trivia settings
+"""
+
+from lexer.core import Lexer, TokenType
+from lexer.pipeline import Pipeline, drop, keep, merge, reclassify
+
+CODE = "# first\n# second\nmatch = x  # trailing\ncase(match)\n"
+
+def trivia_lexer():
+    lexer = Lexer()
+    lexer.SKIP_TYPES = frozenset()
+    return lexer
+
+def test_skip_types_keep_trivia():
+    """Test that a lexer keeping trivia reproduces the text and the default drops it"""
+    tokens = trivia_lexer().tokenize(CODE)
+    assert ''.join(token.value for token in tokens) == CODE
+    assert [t.value for t in tokens if t.type is TokenType.COMMENT] == [
+        "# first", "# second", "# trailing"]
+    assert not any(t.type in (TokenType.COMMENT, TokenType.WHITESPACE)
+                   for t in Lexer().tokenize(CODE))
+
+def test_stages_run_lazily():
+    """Test that stages pull tokens one at a time instead of reading the whole stream"""
+    pulled = []
+
+    def source():
+        for token in trivia_lexer().tokenize(CODE):
+            pulled.append(token)
+            yield token
+
+    stream = Pipeline(drop(TokenType.WHITESPACE), keep(TokenType.COMMENT))(source())
+    assert next(stream).value == "# first"
+    assert len(pulled) == 1
+
+def test_merge_and_reclassify():
+    """Test joining comment lines across whitespace and turning soft keywords into keywords"""
+    pipeline = Pipeline(merge(TokenType.COMMENT, bridge=[TokenType.WHITESPACE]),
+                        reclassify(["match", "case"]),
+                        drop(TokenType.WHITESPACE))
+    tokens = list(pipeline.scan(CODE, trivia_lexer()))
+    assert tokens[0].type is TokenType.COMMENT
+    assert tokens[0].value == "# first\n# second"
+    assert (tokens[0].line, tokens[0].column) == (1, 1)
+    assert [(t.type, t.value) for t in tokens[1:4]] == [
+        (TokenType.KEYWORD, "match"), (TokenType.OPERATOR, "="), (TokenType.IDENTIFIER, "x")]
+    assert tokens[4].value == "# trailing"
+    assert [t.type for t in tokens if t.value == "match"] == [TokenType.KEYWORD] * 2
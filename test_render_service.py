@@ -0,0 +1,89 @@
+"""
+Test module for the background Graphviz render service
+"""
+
+import os
+import stat
+import sys
+import pytest
+from visualizer.render_service import RenderError, RenderService
+
+ECHO_DOT = """
+args = sys.argv[1:]
+with open(args[args.index('-o') + 1], 'wb') as out:
+    out.write(sys.stdin.buffer.read())
+"""
+
+FAILING_DOT = """
+sys.stderr.write('syntax error')
+sys.exit(1)
+"""
+
+def make_dot(tmp_path, body=ECHO_DOT):
+    """Write an executable stand-in for dot"""
+    path = tmp_path / 'dot'
+    path.write_text(f"#!{sys.executable}\nimport sys\n{body}")
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+def test_content_key_depends_on_source_and_format():
+    """Test that cache keys change with the DOT source and output format"""
+    key = RenderService.content_key('digraph { a -> b }', 'svg')
+    assert key == RenderService.content_key('digraph { a -> b }', 'svg')
+    assert key != RenderService.content_key('digraph { a -> c }', 'svg')
+    assert key != RenderService.content_key('digraph { a -> b }', 'png')
+
+def test_render_is_cached(tmp_path):
+    """Test that a second render of the same source reuses the cached file"""
+    service = RenderService(cache_dir=str(tmp_path / 'cache'), dot_command=make_dot(tmp_path))
+    try:
+        path = service.render('digraph { a -> b }', 'svg', timeout=10)
+        assert os.path.exists(path)
+        assert open(path).read() == 'digraph { a -> b }'
+
+        # With no working dot the cached result must still be served
+        service.dot_command = str(tmp_path / 'missing-dot')
+        future = service.submit('digraph { a -> b }', 'svg')
+        assert future.done()
+        assert future.result() == path
+    finally:
+        service.shutdown()
+
+def test_render_failure_raises(tmp_path):
+    """Test that dot errors are reported and nothing is cached"""
+    service = RenderService(cache_dir=str(tmp_path / 'cache'),
+                            dot_command=make_dot(tmp_path, FAILING_DOT))
+    try:
+        with pytest.raises(RenderError):
+            service.render('digraph {', 'svg', timeout=10)
+        assert service.cached('digraph {', 'svg') is None
+    finally:
+        service.shutdown()
+
+def test_export_copies_to_target(tmp_path):
+    """Test exporting a render to a named file"""
+    service = RenderService(cache_dir=str(tmp_path / 'cache'), dot_command=make_dot(tmp_path))
+    try:
+        target = service.export('digraph { x }', str(tmp_path / 'out'), 'svg').result(10)
+        assert target == str(tmp_path / 'out.svg')
+        assert open(target).read() == 'digraph { x }'
+    finally:
+        service.shutdown()
+
+def test_submit_survives_jobs_that_finish_at_once(tmp_path):
+    """Test that a job already done when submitted does not deadlock and is forgotten"""
+    service = RenderService(cache_dir=str(tmp_path / 'cache'), dot_command=make_dot(tmp_path))
+    executor = service._executor
+
+    class FinishedExecutor:
+        def submit(self, fn, *args):
+            future = executor.submit(fn, *args)
+            future.result(10)
+            return future
+
+    service._executor = FinishedExecutor()
+    try:
+        assert open(service.submit('digraph { y }').result(10)).read() == 'digraph { y }'
+        assert service._pending == {}
+    finally:
+        executor.shutdown()
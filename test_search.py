@@ -0,0 +1,75 @@
+"""
+Test module for the find engine
+"""
+
+from lexer.core import Lexer, TokenType, changed_span
+from lexer.search import SearchIndex, diff_edit
+
+CODE = "def count(items):\n    count = 0  # count them\n    return count + len('count')\n"
+
+def test_find_text_options():
+    """Test plain, case-insensitive, whole-word and regex searches"""
+    index = SearchIndex(CODE)
+    assert len(index.find("count")) == 5
+    assert index.find("COUNT") == []
+    assert len(index.find("COUNT", ignore_case=True)) == 5
+    assert index.find("coun", whole_word=True) == []
+    assert index.find(r"\d+", regex=True) == [(CODE.index("0"), CODE.index("0") + 1)]
+
+def test_find_tokens_by_symbol_and_type():
+    """Test that token searches use the token stream, skipping comments and strings"""
+    lexer = Lexer()
+    tokens = lexer.tokenize(CODE)
+    index = SearchIndex(CODE, tokens, lexer.symbols)
+    spans = index.find_tokens("count", TokenType.IDENTIFIER)
+    assert len(spans) == 3
+    assert all(CODE[start:end] == "count" for start, end in spans)
+    assert [CODE[s:e] for s, e in index.find_tokens(token_type=TokenType.KEYWORD)] == \
+        ["def", "return"]
+    assert SearchIndex.visible(spans, spans[1][0] + 2, spans[2][0]) == [spans[1]]
+
+def test_replace_all_relexes_once():
+    """Test that a bulk replacement relexed around the edit matches a full tokenize"""
+    code = CODE * 50
+    lexer = Lexer()
+    lexer.tokenize(code)
+    index = SearchIndex(code, lexer.tokens, lexer.symbols)
+    edit = index.replace(index.find_tokens("count", TokenType.IDENTIFIER), "total")
+    assert edit.count == 150
+    assert edit.text == code.replace("count = 0", "total = 0").replace(
+        "def count", "def total").replace("return count", "return total")
+    tokens = lexer.relex(edit.text, edit.start, edit.old_end, edit.new_end)
+    expected = Lexer().tokenize(edit.text)
+    assert [(t.type, t.value, t.line, t.column, t.offset) for t in tokens] == \
+        [(t.type, t.value, t.line, t.column, t.offset) for t in expected]
+    
+    regex = SearchIndex("a1 b22").replace_pattern(r"([a-z])(\d+)", r"\2\1", regex=True)
+    assert (regex.text, regex.start, regex.old_end, regex.new_end) == ("1a 22b", 0, 6, 6)
+
+def test_replace_all_changes_only_its_span():
+    """Test that the tokens a local Replace All changes lie inside its edit, so only
+    that span is re-highlighted"""
+    code = "x = 1\n" * 200 + CODE + "y = 2\n" * 200
+    lexer = Lexer()
+    old = lexer.tokenize(code)
+    index = SearchIndex(code, lexer.tokens, lexer.symbols)
+    edit = index.replace(index.find_tokens("count", TokenType.IDENTIFIER), "n")
+    tokens = lexer.relex(edit.text, edit.start, edit.old_end, edit.new_end)
+    start, end = changed_span(old, tokens, edit.new_end - edit.old_end)
+    assert edit.start <= start < end <= edit.new_end
+    assert edit.new_end - edit.start < len(CODE)
+
+def test_diff_edit_spans_only_the_change():
+    """Test that a rewritten text is reduced to one edit between common prefix and suffix"""
+    new = CODE.replace("count = 0", "count = 10")
+    edit = diff_edit(CODE, new)
+    assert (edit.start, edit.old_end, edit.new_end, edit.count) == \
+           (CODE.index("0  #"), CODE.index("0  #"), CODE.index("0  #") + 1, 1)
+    assert diff_edit(CODE, CODE).count == 0
+    assert diff_edit("", CODE).new_end == len(CODE)
+
+    lexer = Lexer()
+    lexer.tokenize(CODE)
+    relexed = lexer.relex(edit.text, edit.start, edit.old_end, edit.new_end)
+    assert [(t.type, t.value, t.line) for t in relexed] == \
+           [(t.type, t.value, t.line) for t in Lexer().tokenize(new)]
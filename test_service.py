@@ -0,0 +1,69 @@
+"""
+Test module for the background lexing service
+"""
+
+import time
+
+from lexer.core import Lexer
+from lexer.service import Document, LexingService
+
+CODE = "def area(width, height):\n    return width * height  # rectangle\n" * 200
+
+def drain(service, timeout=10):
+    """Poll the service until it is idle; return the documents in the order they finished"""
+    finished = []
+    deadline = time.monotonic() + timeout
+    while service.busy:
+        assert time.monotonic() < deadline
+        finished += service.poll()
+        time.sleep(0.001)
+    return finished
+
+def test_visible_document_is_lexed_first():
+    """Test that the active document finishes first and every buffer matches tokenize"""
+    service = LexingService(slice_size=1024)
+    try:
+        # Large background documents keep the worker busy while the visible one is queued
+        documents = [service.open(Document(CODE * 20, name=str(i))) for i in range(2)]
+        documents.append(Document(CODE, name='visible'))
+        service.open(documents[2])
+        service.activate(documents[2])
+        assert drain(service)[0] is documents[2]
+        for document in documents:
+            expected = Lexer().tokenize(document.code)
+            assert [(t.type, t.value) for t in document.lexer.tokens] == \
+                   [(t.type, t.value) for t in expected]
+    finally:
+        service.shutdown()
+
+def test_edits_supersede_queued_scans():
+    """Test that only the latest text of a document is published"""
+    service = LexingService(slice_size=256)
+    try:
+        document = service.open(Document(CODE))
+        service.activate(document)
+        service.update(document, CODE + "total = 1\n")
+        drain(service)
+        assert document.state is not None
+        assert document.lexer.tokens[-3].value == "total"
+    finally:
+        service.shutdown()
+
+def test_inactive_buffers_are_evicted_and_rebuilt():
+    """Test that the token budget drops inactive buffers, rebuilt when shown again"""
+    tokens = len(Lexer().tokenize(CODE))
+    service = LexingService(max_tokens=int(tokens * 1.5))
+    try:
+        first = service.open(Document(CODE))
+        second = service.open(Document(CODE))
+        service.activate(first)
+        drain(service)
+        service.activate(second)
+        drain(service)
+        assert second.token_count == tokens
+        assert first.state is None and first.token_count == 0
+        service.activate(first)
+        drain(service)
+        assert first.token_count == tokens and second.token_count == 0
+    finally:
+        service.shutdown()
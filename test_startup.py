@@ -0,0 +1,11 @@
+"""
+Test module for GUI startup imports
+"""
+
+from bench_startup import DEFERRED_MODULES, import_times
+
+def test_heavy_modules_are_deferred():
+    """Test that importing the main window loads none of the lazily imported modules"""
+    times = import_times('gui.main_window')
+    assert 'gui.main_window' in times
+    assert [name for name in DEFERRED_MODULES if name in times] == []
@@ -0,0 +1,80 @@
+"""
+Test module for streaming token statistics
+"""
+
+import random
+from collections import Counter
+
+from lexer.core import Lexer, TokenType
+from lexer import stats as stats_module
+from lexer.stats import HeavyHitters, TokenStatistics
+
+def test_iter_tokens_matches_tokenize():
+    """Test that slice-by-slice iteration yields the same tokens and errors as one scan"""
+    code = "def f(x):\n    return x + 1  # one\ns = 'text' $ 2.5\n" * 50
+    compiled = Lexer().compiled()
+    expected = compiled.tokenize(code, accelerate=False)
+    state = compiled.start(code)
+    tokens = list(compiled.iter_tokens(state, slice_size=7))
+    assert [(t.type, t.value, t.line, t.column) for t in tokens] == \
+        [(t.type, t.value, t.line, t.column) for t in expected.tokens]
+    assert state.errors == expected.errors
+    assert state.tokens == []
+
+def test_heavy_hitters_keeps_frequent_keys():
+    """Test the Space-Saving bounds on a skewed stream larger than the sketch"""
+    rng = random.Random(3)
+    stream = [f"name{min(int(rng.paretovariate(1.2)), 500)}" for _ in range(20000)]
+    sketch = HeavyHitters(capacity=50)
+    for key in stream:
+        sketch.add(key)
+    assert len(sketch) == 50
+    exact = Counter(stream)
+    top = sketch.top()
+    for key, count, error in top:
+        assert count - error <= exact[key] <= count
+    kept = {key for key, _, _ in top}
+    assert all(key in kept for key, count in exact.items() if count > len(stream) / 50)
+    assert [key for key, _, _ in sketch.top(3)] == [key for key, _ in exact.most_common(3)]
+
+def test_token_statistics_report():
+    """Test type counts, length buckets, longest lines and error density"""
+    stats = TokenStatistics(top_k=10, longest_lines=2)
+    stats.add_text("total = total + 1\nx = $\n", name="a.py")
+    stats.add_text("a_long_line_of_identifiers = total\n", name="b.py")
+    assert stats.type_counts[TokenType.IDENTIFIER] == 5
+    assert stats.tokens == 10
+    assert stats.identifiers.top(1) == [("total", 3, 0)]
+    assert dict(stats.length_histogram())["17-32"] == 1
+    assert stats.longest() == [(34, "b.py", 1), (17, "a.py", 1)]
+    assert (stats.inputs, stats.lines, stats.errors) == (2, 3, 1)
+    assert round(stats.error_density) == 333
+    assert "total" in stats.report()
+
+def test_chunked_input_matches_whole_text(tmp_path, monkeypatch):
+    """Test that text scanned in small windows gives the same statistics as one scan"""
+    code = "def f(x):\n    return x + 1  # one\ns = 'some text' $$ 2.5\n" * 40
+    whole = TokenStatistics()
+    whole.add_text(code, name="a.py")
+    chunked = TokenStatistics()
+    chunked.add_chunks((code[i:i + 37] for i in range(0, len(code), 37)),
+                       name="a.py", lookahead=20)
+    path = tmp_path / "a.py"
+    path.write_text(code)
+    monkeypatch.setattr(stats_module, "STREAM_CHUNK", 64)
+    from_file = TokenStatistics()
+    from_file.add_file(str(path))
+    for stats in (chunked, from_file):
+        assert stats.type_counts == whole.type_counts
+        assert stats.identifiers.top() == whole.identifiers.top()
+        assert (stats.inputs, stats.chars, stats.lines, stats.errors) == \
+            (whole.inputs, whole.chars, whole.lines, whole.errors)
+        assert [length for length, _, _ in stats.longest()] == \
+            [length for length, _, _ in whole.longest()]
+
+def test_iter_tokens_records_no_symbols():
+    """Test that iterating tokens leaves no symbol uses behind"""
+    compiled = Lexer().compiled()
+    state = compiled.start("x = x + y\n" * 100)
+    assert all(token.symbol is None for token in compiled.iter_tokens(state))
+    assert len(state.symbols) == 0
@@ -0,0 +1,35 @@
+"""
+Test module for the GUI themes
+"""
+
+from gui.themes import THEMES, apply_theme
+
+class Recorder:
+    """Stands in for ttk.Style and Tk widgets, recording every configure call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def configure(self, *args, **options):
+        self.calls.append(('configure', args, options))
+
+    def map(self, *args, **options):
+        self.calls.append(('map', args, options))
+
+    def tag_configure(self, *args, **options):
+        self.calls.append(('tag', args, options))
+
+def test_themes_define_the_same_names():
+    """Test that switching themes reconfigures the same styles, widget roles and tags"""
+    dark, light = THEMES['dark'], THEMES['light']
+    for section in ('styles', 'maps', 'widgets', 'tags'):
+        assert dark[section].keys() == light[section].keys()
+
+def test_switch_cost_is_independent_of_widget_count():
+    """Test that applying a theme touches the style names and tags, not every ttk widget"""
+    style, editor, output = Recorder(), Recorder(), Recorder()
+    apply_theme(THEMES['light'], {'editor': [editor]}, [editor, output], style)
+    theme = THEMES['light']
+    assert len(style.calls) == len(theme['styles']) + len(theme['maps'])
+    assert editor.calls[0] == ('configure', (), theme['widgets']['editor'])
+    assert len(output.calls) == len(theme['tags'])
@@ -0,0 +1,81 @@
+"""
+Test module for the on-disk token cache
+"""
+
+import os
+from lexer.cache import CachedTokens, TokenCache
+from lexer.core import Lexer
+
+CODE = "def f(x):\n    return x + 'y' # done\nz = 3.5 @"
+
+def test_round_trip(tmp_path):
+    """Test that a cache hit reproduces tokens, errors and symbols"""
+    cache = TokenCache(str(tmp_path))
+    fresh = Lexer()
+    expected = list(cache.tokenize(fresh, CODE))
+    
+    cached = Lexer()
+    tokens = cache.tokenize(cached, CODE)
+    assert isinstance(tokens, CachedTokens)
+    assert len(tokens) == len(expected)
+    for got, want in zip(tokens, expected):
+        assert (got.type, got.value, got.line, got.column, got.symbol, got.offset) == \
+            (want.type, want.value, want.line, want.column, want.symbol, want.offset)
+    assert cached.errors == fresh.errors
+    assert list(cached.symbols.uses_of("x")) == list(fresh.symbols.uses_of("x"))
+    assert all(CODE[t.offset:t.offset + len(t.value)] == t.value for t in tokens)
+
+def test_key_depends_on_content_and_patterns():
+    """Test that the key changes with the input, the keyword table and the interned types"""
+    class NoKeywordLexer(Lexer):
+        KEYWORDS = frozenset()
+    
+    class NoSymbolLexer(Lexer):
+        SYMBOL_TYPES = frozenset()
+    
+    key = TokenCache.key(CODE, Lexer())
+    assert key == TokenCache.key(CODE, Lexer())
+    assert key != TokenCache.key(CODE + " ", Lexer())
+    assert key != TokenCache.key(CODE, NoKeywordLexer())
+    assert key != TokenCache.key(CODE, NoSymbolLexer())
+
+def test_eviction_keeps_recent_entries(tmp_path):
+    """Test that the oldest entries are evicted once the size limit is exceeded"""
+    cache = TokenCache(str(tmp_path))
+    for i in range(3):
+        cache.tokenize(Lexer(), f"x{i} = {i}")
+    paths = sorted(os.listdir(tmp_path))
+    assert len(paths) == 3
+    
+    oldest = cache.path(TokenCache.key("x0 = 0", Lexer()))
+    os.utime(oldest, (0, 0))
+    cache.max_bytes = sum(os.path.getsize(os.path.join(tmp_path, p)) for p in paths) - 1
+    cache.evict()
+    assert not os.path.exists(oldest)
+    assert len(os.listdir(tmp_path)) == 2
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    """Test that an unreadable entry falls back to lexing"""
+    cache = TokenCache(str(tmp_path))
+    with open(cache.path(TokenCache.key(CODE, Lexer())), "wb") as f:
+        f.write(b"garbage")
+    lexer = Lexer()
+    tokens = cache.tokenize(lexer, CODE)
+    assert tokens[0].value == "def"
+
+def test_truncated_entry_is_a_miss(tmp_path):
+    """Test that a cut-off entry is unmapped and relexed, and hits rebuild symbols lazily"""
+    cache = TokenCache(str(tmp_path))
+    cache.tokenize(Lexer(), CODE)
+    path = cache.path(TokenCache.key(CODE, Lexer()))
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:-10])
+    assert not cache.load(TokenCache.key(CODE, Lexer()), Lexer())
+    with open(path, "wb") as f:
+        f.write(data)
+    lexer = Lexer()
+    assert cache.load(TokenCache.key(CODE, lexer), lexer)
+    assert lexer.symbols._table is None
+    assert lexer.symbols.name(lexer.tokens[0].symbol) == "def"
@@ -0,0 +1,50 @@
+"""
+Test module for the character-level scanner trace
+"""
+
+import pytest
+from lexer.core import Lexer
+from lexer.trace import TransitionTrace
+
+def test_lexer_records_one_step_per_character():
+    """Test that tokenizing with a trace records every input character"""
+    code = "x = 42 @"
+    trace = TransitionTrace()
+    Lexer().tokenize(code, trace=trace)
+    
+    assert trace.total == len(code)
+    assert trace[0] == ("START", "x", "IDENTIFIER")
+    assert trace[4] == ("START", "4", "INTEGER")
+    assert trace[5] == ("INTEGER", "2", "INTEGER")
+    assert trace[7] == ("START", "@", "ERROR")
+
+def test_ring_buffer_keeps_only_the_tail():
+    """Test that old steps are overwritten once capacity is reached"""
+    trace = TransitionTrace(capacity=4)
+    trace.record_run("START", "abc", "IDENTIFIER")
+    trace.record_run("START", "   ", "WHITESPACE")
+    
+    assert trace.total == 6
+    assert len(trace) == 4
+    assert trace.first_offset == 2
+    assert trace[2] == ("IDENTIFIER", "c", "IDENTIFIER")
+    assert trace[3] == ("START", " ", "WHITESPACE")
+    with pytest.raises(IndexError):
+        trace[1]
+    assert [step[1] for step in trace.steps()] == ["c", " ", " ", " "]
+
+def test_runs_longer_than_capacity():
+    """Test recording a single run larger than the buffer"""
+    trace = TransitionTrace(capacity=3)
+    trace.record_run("START", "abcdef", "IDENTIFIER")
+    
+    assert trace.first_offset == 3
+    assert [step[1] for step in trace.steps()] == ["d", "e", "f"]
+
+def test_frames_batch_steps():
+    """Test that frames report the last step of each batch"""
+    trace = TransitionTrace()
+    trace.record_run("START", "abcde", "IDENTIFIER")
+    
+    assert [offset for offset, _ in trace.frames(steps_per_frame=2)] == [1, 3, 4]
+    assert [offset for offset, _ in trace.frames(start=3, steps_per_frame=10)] == [4]
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Token statistics report for LexVi
+Streams files and directories through the lexer and prints token statistics
+"""
+
+import argparse
+import sys
+from lexer.language import LanguageError, load_language
+from lexer.stats import TokenStatistics
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('paths', nargs='+', help='files or directories to scan')
+    parser.add_argument('--language', help='language for every file (default: by extension, '
+                                           'skipping files of unknown types)')
+    parser.add_argument('--top', type=int, default=20, help='identifiers to list')
+    parser.add_argument('--sketch', type=int, default=200, help='identifiers tracked')
+    parser.add_argument('--lines', type=int, default=10, help='longest lines to list')
+    args = parser.parse_args()
+
+    stats = TokenStatistics(max(args.sketch, args.top), args.lines)
+    try:
+        language = load_language(args.language) if args.language else None
+    except LanguageError as e:
+        parser.error(str(e))
+    for path, error in stats.add_files(args.paths, language):
+        print(f'{path}: {error}', file=sys.stderr)
+    print(stats.report(args.top))
+
+if __name__ == '__main__':
+    main()
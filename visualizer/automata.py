@@ -3,14 +3,33 @@ Automata visualization module for LexVi
 Contains classes for visualizing DFA and token transitions
 """
 
-import graphviz
-from typing import Dict, Set, Tuple
+import sys
+from concurrent.futures import Future
+from itertools import islice
+from typing import Dict, Iterable, Optional, Set, Tuple
+from visualizer.render_service import RenderService, get_render_service
+
+def _graphviz():
+    """Import graphviz on first use so importing this module stays cheap"""
+    import graphviz
+    return graphviz
+
+def _render_source(source: str, filename: str, view: bool, fmt: str,
+                   service: Optional[RenderService]) -> Future:
+    """Render a DOT source through the render service, optionally opening the result"""
+    future = (service or get_render_service()).export(source, filename, fmt)
+    if view:
+        def open_output(done: Future):
+            if done.exception() is None:
+                _graphviz().view(done.result())
+        future.add_done_callback(open_output)
+    return future
 
 class AutomataVisualizer:
     """Class for visualizing finite automata"""
     
     def __init__(self):
-        self.dot = graphviz.Digraph(comment='Lexical Analyzer Automata')
+        self.dot = _graphviz().Digraph(comment='Lexical Analyzer Automata')
         self.dot.attr(rankdir='LR')
         self.dot.attr('node', shape='circle')
         
@@ -25,9 +44,10 @@ class AutomataVisualizer:
         """Add a transition between states"""
         self.dot.edge(from_state, to_state, label=label)
         
-    def render(self, filename: str = 'automata', view: bool = True):
-        """Render the automata visualization"""
-        self.dot.render(filename, view=view)
+    def render(self, filename: str = 'automata', view: bool = True, fmt: str = 'svg',
+               service: Optional[RenderService] = None) -> Future:
+        """Render the automata visualization in the background, reusing cached output"""
+        return _render_source(self.dot.source, filename, view, fmt, service)
         
     def clear(self):
         """Clear the current visualization"""
@@ -36,24 +56,42 @@ class AutomataVisualizer:
 class TokenStreamVisualizer:
     """Class for visualizing token stream and transitions"""
     
-    def __init__(self):
-        self.dot = graphviz.Digraph(comment='Token Stream')
+    def __init__(self, window: Optional[Tuple[int, int]] = None):
+        self.dot = _graphviz().Digraph(comment='Token Stream')
         self.dot.attr(rankdir='LR')
         self.dot.attr('node', shape='box')
+        # Half-open range of token positions to draw; None draws every token
+        self.window = window
+
+    def set_window(self, start: int, stop: int):
+        """Only draw tokens whose position lies in [start, stop)"""
+        self.window = (start, stop)
+
+    def _in_window(self, position: int) -> bool:
+        return self.window is None or self.window[0] <= position < self.window[1]
         
     def add_token(self, token_type: str, token_value: str, position: int):
         """Add a token to the visualization"""
+        if not self._in_window(position):
+            return
         node_id = f'token_{position}'
         label = f'{token_type}\n{token_value}'
         self.dot.node(node_id, label)
         
-        if position > 0:
+        if position > 0 and self._in_window(position - 1):
             self.dot.edge(f'token_{position-1}', node_id)
+
+    def add_tokens(self, tokens: Iterable, start: int = 0, stop: Optional[int] = None):
+        """Add the tokens in positions [start, stop) without walking the rest of the stream"""
+        self.set_window(start, sys.maxsize if stop is None else stop)
+        for position, token in enumerate(islice(tokens, start, stop), start):
+            self.add_token(token.type.value, token.value, position)
             
-    def render(self, filename: str = 'token_stream', view: bool = True):
-        """Render the token stream visualization"""
-        self.dot.render(filename, view=view)
+    def render(self, filename: str = 'token_stream', view: bool = True, fmt: str = 'svg',
+               service: Optional[RenderService] = None) -> Future:
+        """Render the token stream visualization in the background, reusing cached output"""
+        return _render_source(self.dot.source, filename, view, fmt, service)
         
     def clear(self):
         """Clear the current visualization"""
-        self.dot.clear() 
\ No newline at end of file
+        self.dot.clear()
@@ -0,0 +1,450 @@
+"""
+Drawing backends module for LexVi
+Offscreen implementations of the canvas calls DFAVisualizer makes
+
+DFAVisualizer draws through a small subset of the tk.Canvas API:
+create_oval, create_line, create_text, create_rectangle, bbox, delete,
+tag_raise, configure, winfo_width, winfo_height, after and after_cancel.
+A live tk.Canvas is the interactive backend; the classes here record the
+same calls into a display list and write it out as SVG or as a raster
+image, so no X server is needed.
+"""
+
+import math
+import struct
+import zlib
+from itertools import count
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+_DEFAULT_FONT = ('Segoe UI', 10)
+
+def _font_size(font) -> int:
+    if isinstance(font, (tuple, list)) and len(font) > 1:
+        return abs(int(font[1]))
+    return _DEFAULT_FONT[1]
+
+def _font_bold(font) -> bool:
+    return isinstance(font, (tuple, list)) and 'bold' in font[2:]
+
+def _parse_color(color: Optional[str]) -> Optional[Tuple[int, int, int]]:
+    if not color or not color.startswith('#') or len(color) != 7:
+        return None
+    return int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+
+def _quadratic(points: Sequence[float], segments: int = 12) -> List[float]:
+    """Flatten a three-point smoothed line into a polyline"""
+    x0, y0, x1, y1, x2, y2 = points
+    flat = []
+    for i in range(segments + 1):
+        t = i / segments
+        u = 1 - t
+        flat.append(u * u * x0 + 2 * u * t * x1 + t * t * x2)
+        flat.append(u * u * y0 + 2 * u * t * y1 + t * t * y2)
+    return flat
+
+def _arrowhead(points: Sequence[float], shape) -> List[float]:
+    """Return the polygon Tk draws for arrow='last' with the given arrowshape"""
+    d1, d2, d3 = shape
+    tip_x, tip_y = points[-2], points[-1]
+    angle = math.atan2(tip_y - points[-3], tip_x - points[-4])
+    cos_a, sin_a = math.cos(angle), math.sin(angle)
+    back_x, back_y = tip_x - d2 * cos_a, tip_y - d2 * sin_a
+    neck_x, neck_y = tip_x - d1 * cos_a, tip_y - d1 * sin_a
+    return [tip_x, tip_y,
+            back_x - d3 * sin_a, back_y + d3 * cos_a,
+            neck_x, neck_y,
+            back_x + d3 * sin_a, back_y - d3 * cos_a]
+
+class Item:
+    """One recorded canvas item"""
+    __slots__ = ('id', 'kind', 'coords', 'options', 'tags')
+
+    def __init__(self, item_id: int, kind: str, coords: List[float], options: Dict):
+        self.id = item_id
+        self.kind = kind
+        self.coords = coords
+        tags = options.pop('tags', ())
+        self.tags = (tags,) if isinstance(tags, str) else tuple(tags)
+        self.options = options
+
+class SceneBackend:
+    """Records canvas drawing calls into an ordered display list"""
+
+    def __init__(self, width: int = 800, height: int = 300, background: str = '#2D2D2D'):
+        self.width = width
+        self.height = height
+        self.background = background
+        # Insertion-ordered id -> item map; order is stacking order
+        self._items: Dict[int, Item] = {}
+        self._ids = count(1)
+        self._jobs: Dict[str, Tuple[int, Callable]] = {}
+        self._job_ids = count(1)
+
+    # Item creation
+    def _create(self, kind: str, coords, options) -> int:
+        if len(coords) == 1 and isinstance(coords[0], (tuple, list)):
+            coords = coords[0]
+        item = Item(next(self._ids), kind, [float(c) for c in coords], dict(options))
+        self._items[item.id] = item
+        return item.id
+
+    def create_oval(self, *coords, **options) -> int:
+        return self._create('oval', coords, options)
+
+    def create_line(self, *coords, **options) -> int:
+        return self._create('line', coords, options)
+
+    def create_text(self, *coords, **options) -> int:
+        return self._create('text', coords, options)
+
+    def create_rectangle(self, *coords, **options) -> int:
+        return self._create('rectangle', coords, options)
+
+    # Item queries and ordering
+    @property
+    def items(self) -> List[Item]:
+        """Recorded items, bottom of the stacking order first"""
+        return list(self._items.values())
+
+    def _select(self, tag_or_id) -> List[Item]:
+        if isinstance(tag_or_id, int):
+            item = self._items.get(tag_or_id)
+            return [item] if item is not None else []
+        if tag_or_id == 'all':
+            return list(self._items.values())
+        return [item for item in self._items.values() if tag_or_id in item.tags]
+
+    def find_all(self) -> Tuple[int, ...]:
+        return tuple(self._items)
+
+    def bbox(self, tag_or_id) -> Optional[Tuple[int, int, int, int]]:
+        boxes = [self._item_bbox(item) for item in self._select(tag_or_id)]
+        if not boxes:
+            return None
+        return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+    def _item_bbox(self, item: Item) -> Tuple[int, int, int, int]:
+        if item.kind == 'text':
+            x, y = item.coords
+            size = _font_size(item.options.get('font'))
+            half_width = len(str(item.options.get('text', ''))) * size * 0.3
+            half_height = size * 0.65
+            return (int(x - half_width), int(y - half_height),
+                    int(math.ceil(x + half_width)), int(math.ceil(y + half_height)))
+        xs, ys = item.coords[0::2], item.coords[1::2]
+        return int(min(xs)), int(min(ys)), int(math.ceil(max(xs))), int(math.ceil(max(ys)))
+
+    def delete(self, *tags_or_ids):
+        for tag_or_id in tags_or_ids:
+            if tag_or_id == 'all':
+                self._items.clear()
+            for item in self._select(tag_or_id):
+                del self._items[item.id]
+
+    def tag_raise(self, tag_or_id):
+        for item in self._select(tag_or_id):
+            self._items[item.id] = self._items.pop(item.id)
+
+    # Widget emulation
+    def configure(self, **options):
+        if 'width' in options:
+            self.width = int(options['width'])
+        if 'height' in options:
+            self.height = int(options['height'])
+        if 'bg' in options:
+            self.background = options['bg']
+
+    config = configure
+
+    def winfo_width(self) -> int:
+        return self.width
+
+    def winfo_height(self) -> int:
+        return self.height
+
+    def after(self, delay: int, callback: Callable) -> str:
+        """Queue a callback; offscreen there is no event loop, see run_pending"""
+        job = f'after#{next(self._job_ids)}'
+        self._jobs[job] = (delay, callback)
+        return job
+
+    def after_cancel(self, job: str):
+        self._jobs.pop(job, None)
+
+    def run_pending(self, limit: Optional[int] = None) -> int:
+        """Run queued callbacks (and the ones they queue) in order; return how many ran"""
+        ran = 0
+        while self._jobs and (limit is None or ran < limit):
+            job = next(iter(self._jobs))
+            _delay, callback = self._jobs.pop(job)
+            callback()
+            ran += 1
+        return ran
+
+class SVGBackend(SceneBackend):
+    """Offscreen backend that writes the display list as an SVG document"""
+
+    def _line(self, item: Item) -> List[str]:
+        coords = item.coords
+        opts = item.options
+        color = opts.get('fill') or '#000000'
+        width = opts.get('width', 1)
+        if opts.get('smooth') and len(coords) == 6:
+            x0, y0, x1, y1, x2, y2 = coords
+            path = f'M{x0:.1f},{y0:.1f} Q{x1:.1f},{y1:.1f} {x2:.1f},{y2:.1f}'
+            tangent = coords
+        else:
+            path = 'M' + ' L'.join(f'{x:.1f},{y:.1f}' for x, y in zip(coords[0::2], coords[1::2]))
+            tangent = coords[-4:]
+        parts = [f'<path d="{path}" fill="none" stroke="{color}" stroke-width="{width}"/>']
+        if opts.get('arrow') == 'last':
+            head = _arrowhead(tangent, opts.get('arrowshape', (8, 10, 3)))
+            points = ' '.join(f'{v:.1f}' for v in head)
+            parts.append(f'<polygon points="{points}" fill="{color}"/>')
+        return parts
+
+    def _element(self, item: Item) -> List[str]:
+        opts = item.options
+        if item.kind == 'oval':
+            x1, y1, x2, y2 = item.coords
+            return [f'<ellipse cx="{(x1 + x2) / 2:.1f}" cy="{(y1 + y2) / 2:.1f}" '
+                    f'rx="{abs(x2 - x1) / 2:.1f}" ry="{abs(y2 - y1) / 2:.1f}" '
+                    f'fill="{opts.get("fill") or "none"}" stroke="{opts.get("outline") or "none"}" '
+                    f'stroke-width="{opts.get("width", 1)}"/>']
+        if item.kind == 'rectangle':
+            x1, y1, x2, y2 = item.coords
+            return [f'<rect x="{min(x1, x2):.1f}" y="{min(y1, y2):.1f}" '
+                    f'width="{abs(x2 - x1):.1f}" height="{abs(y2 - y1):.1f}" '
+                    f'fill="{opts.get("fill") or "none"}" stroke="{opts.get("outline") or "none"}"/>']
+        if item.kind == 'line':
+            return self._line(item)
+        if item.kind == 'text':
+            x, y = item.coords
+            font = opts.get('font', _DEFAULT_FONT)
+            weight = ' font-weight="bold"' if _font_bold(font) else ''
+            return [f'<text x="{x:.1f}" y="{y:.1f}" fill="{opts.get("fill", "#000000")}" '
+                    f'font-family="{escape(str(font[0]))}" font-size="{_font_size(font)}"{weight} '
+                    f'text-anchor="middle" dominant-baseline="central">'
+                    f'{escape(str(opts.get("text", "")))}</text>']
+        return []
+
+    def to_svg(self) -> str:
+        """Return the current display list as an SVG document"""
+        parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.width}" '
+                 f'height="{self.height}" viewBox="0 0 {self.width} {self.height}">',
+                 f'<rect width="100%" height="100%" fill="{self.background}"/>']
+        for item in self._items.values():
+            parts.extend(self._element(item))
+        parts.append('</svg>')
+        return '\n'.join(parts)
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_svg())
+
+# 5x7 bitmap glyphs for the raster backend, one byte per row (low 5 bits)
+_GLYPHS = {
+    'A': (0x0E, 0x11, 0x11, 0x1F, 0x11, 0x11, 0x11), 'B': (0x1E, 0x11, 0x11, 0x1E, 0x11, 0x11, 0x1E),
+    'C': (0x0E, 0x11, 0x10, 0x10, 0x10, 0x11, 0x0E), 'D': (0x1E, 0x11, 0x11, 0x11, 0x11, 0x11, 0x1E),
+    'E': (0x1F, 0x10, 0x10, 0x1E, 0x10, 0x10, 0x1F), 'F': (0x1F, 0x10, 0x10, 0x1E, 0x10, 0x10, 0x10),
+    'G': (0x0E, 0x11, 0x10, 0x17, 0x11, 0x11, 0x0F), 'H': (0x11, 0x11, 0x11, 0x1F, 0x11, 0x11, 0x11),
+    'I': (0x0E, 0x04, 0x04, 0x04, 0x04, 0x04, 0x0E), 'J': (0x07, 0x02, 0x02, 0x02, 0x02, 0x12, 0x0C),
+    'K': (0x11, 0x12, 0x14, 0x18, 0x14, 0x12, 0x11), 'L': (0x10, 0x10, 0x10, 0x10, 0x10, 0x10, 0x1F),
+    'M': (0x11, 0x1B, 0x15, 0x15, 0x11, 0x11, 0x11), 'N': (0x11, 0x11, 0x19, 0x15, 0x13, 0x11, 0x11),
+    'O': (0x0E, 0x11, 0x11, 0x11, 0x11, 0x11, 0x0E), 'P': (0x1E, 0x11, 0x11, 0x1E, 0x10, 0x10, 0x10),
+    'Q': (0x0E, 0x11, 0x11, 0x11, 0x15, 0x12, 0x0D), 'R': (0x1E, 0x11, 0x11, 0x1E, 0x14, 0x12, 0x11),
+    'S': (0x0F, 0x10, 0x10, 0x0E, 0x01, 0x01, 0x1E), 'T': (0x1F, 0x04, 0x04, 0x04, 0x04, 0x04, 0x04),
+    'U': (0x11, 0x11, 0x11, 0x11, 0x11, 0x11, 0x0E), 'V': (0x11, 0x11, 0x11, 0x11, 0x11, 0x0A, 0x04),
+    'W': (0x11, 0x11, 0x11, 0x15, 0x15, 0x15, 0x0A), 'X': (0x11, 0x11, 0x0A, 0x04, 0x0A, 0x11, 0x11),
+    'Y': (0x11, 0x11, 0x11, 0x0A, 0x04, 0x04, 0x04), 'Z': (0x1F, 0x01, 0x02, 0x04, 0x08, 0x10, 0x1F),
+    '0': (0x0E, 0x11, 0x13, 0x15, 0x19, 0x11, 0x0E), '1': (0x04, 0x0C, 0x04, 0x04, 0x04, 0x04, 0x0E),
+    '2': (0x0E, 0x11, 0x01, 0x02, 0x04, 0x08, 0x1F), '3': (0x1F, 0x02, 0x04, 0x02, 0x01, 0x11, 0x0E),
+    '4': (0x02, 0x06, 0x0A, 0x12, 0x1F, 0x02, 0x02), '5': (0x1F, 0x10, 0x1E, 0x01, 0x01, 0x11, 0x0E),
+    '6': (0x06, 0x08, 0x10, 0x1E, 0x11, 0x11, 0x0E), '7': (0x1F, 0x01, 0x02, 0x04, 0x08, 0x08, 0x08),
+    '8': (0x0E, 0x11, 0x11, 0x0E, 0x11, 0x11, 0x0E), '9': (0x0E, 0x11, 0x11, 0x0F, 0x01, 0x02, 0x0C),
+    '_': (0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x1F), '-': (0x00, 0x00, 0x00, 0x1F, 0x00, 0x00, 0x00),
+    '|': (0x04, 0x04, 0x04, 0x04, 0x04, 0x04, 0x04), '.': (0x00, 0x00, 0x00, 0x00, 0x00, 0x0C, 0x0C),
+    '#': (0x0A, 0x0A, 0x1F, 0x0A, 0x1F, 0x0A, 0x0A), '^': (0x04, 0x0A, 0x11, 0x00, 0x00, 0x00, 0x00),
+    '"': (0x0A, 0x0A, 0x00, 0x00, 0x00, 0x00, 0x00), "'": (0x04, 0x04, 0x00, 0x00, 0x00, 0x00, 0x00),
+    '?': (0x0E, 0x11, 0x01, 0x02, 0x04, 0x00, 0x04),
+}
+
+class RasterBackend(SceneBackend):
+    """Offscreen backend that rasterizes the display list in pure Python
+
+    Shapes are filled with scanline loops and strokes are stamped along
+    their polyline, without anti-aliasing. Text uses a built-in 5x7 bitmap
+    font. Output is written as PNG or binary PPM.
+    """
+
+    def _render(self) -> bytearray:
+        width, height = self.width, self.height
+        self._pixels = bytearray(bytes(_parse_color(self.background) or (0, 0, 0)) * (width * height))
+        for item in self._items.values():
+            getattr(self, f'_raster_{item.kind}')(item)
+        pixels, self._pixels = self._pixels, None
+        return pixels
+
+    def _span(self, y: int, x1: float, x2: float, color):
+        if not 0 <= y < self.height:
+            return
+        start = max(0, int(math.ceil(x1)))
+        stop = min(self.width - 1, int(math.floor(x2)))
+        if stop < start:
+            return
+        offset = (y * self.width + start) * 3
+        self._pixels[offset:offset + (stop - start + 1) * 3] = bytes(color) * (stop - start + 1)
+
+    def _fill_ellipse(self, cx, cy, rx, ry, color):
+        if rx <= 0 or ry <= 0:
+            return
+        for y in range(int(cy - ry), int(cy + ry) + 1):
+            dy = (y - cy) / ry
+            if abs(dy) <= 1:
+                half = rx * math.sqrt(1 - dy * dy)
+                self._span(y, cx - half, cx + half, color)
+
+    def _fill_polygon(self, coords: Sequence[float], color):
+        xs, ys = coords[0::2], coords[1::2]
+        edges = list(zip(zip(xs, ys), zip(xs[1:] + xs[:1], ys[1:] + ys[:1])))
+        for y in range(int(min(ys)), int(max(ys)) + 1):
+            sample = y + 0.5
+            crossings = sorted(x1 + (sample - y1) * (x2 - x1) / (y2 - y1)
+                               for (x1, y1), (x2, y2) in edges
+                               if (y1 <= sample < y2) or (y2 <= sample < y1))
+            for left, right in zip(crossings[0::2], crossings[1::2]):
+                self._span(y, left, right, color)
+
+    def _stroke(self, coords: Sequence[float], width: float, color):
+        radius = max(0.5, width / 2)
+        for x1, y1, x2, y2 in zip(coords[0::2], coords[1::2], coords[2::2], coords[3::2]):
+            steps = max(1, int(math.hypot(x2 - x1, y2 - y1)))
+            for i in range(steps + 1):
+                t = i / steps
+                self._fill_ellipse(x1 + (x2 - x1) * t, y1 + (y2 - y1) * t, radius, radius, color)
+
+    def _raster_oval(self, item: Item):
+        x1, y1, x2, y2 = item.coords
+        cx, cy, rx, ry = (x1 + x2) / 2, (y1 + y2) / 2, abs(x2 - x1) / 2, abs(y2 - y1) / 2
+        fill = _parse_color(item.options.get('fill'))
+        outline = _parse_color(item.options.get('outline'))
+        if fill:
+            self._fill_ellipse(cx, cy, rx, ry, fill)
+        if outline:
+            self._ring(cx, cy, rx, ry, item.options.get('width', 1), outline)
+
+    def _ring(self, cx, cy, rx, ry, width, color):
+        steps = max(12, int(2 * math.pi * max(rx, ry)))
+        coords = []
+        for i in range(steps + 1):
+            angle = 2 * math.pi * i / steps
+            coords += [cx + rx * math.cos(angle), cy + ry * math.sin(angle)]
+        self._stroke(coords, width, color)
+
+    def _raster_rectangle(self, item: Item):
+        x1, y1, x2, y2 = item.coords
+        fill = _parse_color(item.options.get('fill'))
+        if fill:
+            for y in range(int(min(y1, y2)), int(max(y1, y2)) + 1):
+                self._span(y, min(x1, x2), max(x1, x2), fill)
+
+    def _raster_line(self, item: Item):
+        color = _parse_color(item.options.get('fill'))
+        if color is None:
+            return
+        coords = item.coords
+        tangent = coords[-4:]
+        if item.options.get('smooth') and len(coords) == 6:
+            tangent = coords
+            coords = _quadratic(coords)
+        self._stroke(coords, item.options.get('width', 1), color)
+        if item.options.get('arrow') == 'last':
+            self._fill_polygon(_arrowhead(tangent, item.options.get('arrowshape', (8, 10, 3))), color)
+
+    def _raster_text(self, item: Item):
+        color = _parse_color(item.options.get('fill'))
+        text = str(item.options.get('text', '')).upper()
+        if color is None or not text:
+            return
+        scale = max(1, _font_size(item.options.get('font')) // 7)
+        x, y = item.coords
+        left = int(x - len(text) * 6 * scale / 2)
+        top = int(y - 7 * scale / 2)
+        for index, char in enumerate(text):
+            glyph = _GLYPHS.get(char, _GLYPHS['?'] if char != ' ' else ())
+            for row, bits in enumerate(glyph):
+                for column in range(5):
+                    if bits & (0x10 >> column):
+                        px = left + (index * 6 + column) * scale
+                        for dy in range(scale):
+                            self._span(top + row * scale + dy, px, px + scale - 1, color)
+
+    def to_ppm(self) -> bytes:
+        """Return the rendered image as binary PPM"""
+        return b'P6 %d %d 255\n' % (self.width, self.height) + bytes(self._render())
+
+    def to_png(self) -> bytes:
+        """Return the rendered image as PNG"""
+        pixels = self._render()
+        stride = self.width * 3
+        raw = b''.join(b'\x00' + bytes(pixels[y * stride:(y + 1) * stride])
+                       for y in range(self.height))
+
+        def chunk(kind: bytes, data: bytes) -> bytes:
+            return (struct.pack('>I', len(data)) + kind + data
+                    + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+        header = struct.pack('>IIBBBBB', self.width, self.height, 8, 2, 0, 0, 0)
+        return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+                + chunk(b'IDAT', zlib.compress(raw, 6)) + chunk(b'IEND', b''))
+
+    def save(self, path: str):
+        data = self.to_ppm() if path.lower().endswith('.ppm') else self.to_png()
+        with open(path, 'wb') as f:
+            f.write(data)
+
+def backend_for(path: str, width: int = 800, height: int = 300) -> SceneBackend:
+    """Pick the offscreen backend matching an output file extension"""
+    if path.lower().endswith('.svg'):
+        return SVGBackend(width, height)
+    return RasterBackend(width, height)
+
+def render_automaton(states, transitions, path: str, active_state: Optional[str] = None,
+                     width: int = 800, height: int = 300):
+    """Render an automaton to an SVG, PNG or PPM file without a display"""
+    from visualizer.dfa_visualizer import DFAVisualizer
+
+    backend = backend_for(path, width, height)
+    visualizer = DFAVisualizer(backend)
+    visualizer.setup_canvas()
+    visualizer.load_automaton(states, transitions)
+    if active_state is not None and active_state in visualizer.states:
+        visualizer._highlight_state(active_state)
+    backend.save(path)
+    return visualizer
+
+def render_token_flow(states, transitions, tokens, path_template: str,
+                      width: int = 800, height: int = 300) -> List[str]:
+    """Write one frame per token, highlighting the state it ends in
+
+    ``path_template`` is formatted with the token index, e.g. 'flow_{:04d}.svg'.
+    """
+    from visualizer.dfa_visualizer import DFAVisualizer
+
+    backend = backend_for(path_template, width, height)
+    visualizer = DFAVisualizer(backend)
+    visualizer.setup_canvas()
+    visualizer.load_automaton(states, transitions)
+    paths = []
+    for index, token in enumerate(tokens):
+        visualizer.current_state = None
+        visualizer.redraw()
+        state_id = visualizer.state_for_token(token)
+        if state_id is not None:
+            visualizer._highlight_state(state_id)
+        path = path_template.format(index)
+        backend.save(path)
+        paths.append(path)
+    return paths
@@ -7,11 +7,25 @@ import tkinter as tk
 from tkinter import ttk
 import math
 import time
+from contextlib import nullcontext
 from typing import List, Tuple, Optional
 from lexer.core import Token, TokenType
+from lexer.trace import TransitionTrace
+
+def _numpy():
+    """Import NumPy on first use; it costs more to load than the rest of the GUI"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
 
 class DFAVisualizer:
-    """Visualizes DFA states and token flow with animation"""
+    """Visualizes DFA states and token flow with animation
+
+    Drawing goes through ``canvas``: a live tk.Canvas, or one of the
+    offscreen backends in visualizer.backends for headless rendering.
+    """
     
     def __init__(self, canvas: tk.Canvas):
         self.canvas = canvas
@@ -23,32 +37,30 @@ class DFAVisualizer:
         self.node_radius = 35
         self.padding = 60
         
-        # Token type mapping to state names
+        # Token type mapping to state names; types missing here map to
+        # the state of the same name
         self.token_type_to_state = {
-            'INTEGER': 'NUMBER',
-            'FLOAT': 'NUMBER',
             'NUMBER': 'NUMBER',
             'ID': 'IDENTIFIER',
-            'IDENTIFIER': 'IDENTIFIER',
-            'STRING': 'STRING',
-            'OPERATOR': 'OPERATOR',
-            'DELIMITER': 'DELIMITER',
-            'COMMENT': 'COMMENT',
-            'ERROR': 'ERROR'
         }
         
         self.colors = {
             'background': '#2D2D2D',
             'node': {
                 'START': '#4CAF50',      # Green
+                'KEYWORD': '#3F51B5',     # Indigo
                 'IDENTIFIER': '#81C784',  # Light green
                 'NUMBER': '#2196F3',      # Blue
+                'INTEGER': '#2196F3',     # Blue
+                'FLOAT': '#00BCD4',       # Cyan
                 'STRING': '#FF9800',      # Orange
                 'OPERATOR': '#9C27B0',    # Purple
                 'DELIMITER': '#E91E63',   # Pink
                 'COMMENT': '#9E9E9E',     # Gray
+                'WHITESPACE': '#607D8B',  # Blue gray
                 'ERROR': '#F44336'        # Red
             },
+            'node_default': '#78909C',
             'node_active': '#FFD700',
             'edge': '#E0E0E0',
             'edge_active': '#FFD700',
@@ -63,6 +75,23 @@ class DFAVisualizer:
         # Cache for gradients to avoid recalculation
         self._gradient_cache = {}
         
+        # Edge geometry keyed by (from, to), each entry stored with the
+        # endpoint positions and radii it was computed from
+        self._geometry_cache = {}
+        # Label text -> (half width, half height) as measured on the canvas
+        self._label_extent_cache = {}
+        
+        # Character trace replay: frames per second and the most frames a
+        # replay may take before steps are batched together
+        self.trace_frame_rate = 30
+        self.max_trace_frames = 600
+        self._trace_frames = None
+        self._trace_job = None
+        self._trace_on_frame = None
+        
+        # Span recorder (gui.instrument.Instrumentation) timing draws and frames, if any
+        self.instrumentation = None
+        
     def setup_canvas(self):
         """Initialize the canvas with a clean, subtle background (no grid)"""
         self.canvas.configure(bg=self.colors['background'])
@@ -80,6 +109,11 @@ class DFAVisualizer:
         
     def add_state(self, state_id: str, is_final: bool = False):
         """Add a state to the visualization"""
+        self._place_state(state_id, is_final)
+        self._draw_state(state_id)
+
+    def _place_state(self, state_id: str, is_final: bool):
+        """Assign the next layout slot to a state without drawing it"""
         # Calculate position based on number of existing states
         state_count = len(self.states)
         total_width = (state_count + 1) * (self.node_radius * 3)
@@ -95,12 +129,31 @@ class DFAVisualizer:
         
         # Store state information
         self.states[state_id] = (x, y, self.node_radius, is_final)
-        self._draw_state(state_id)
         
     def add_transition(self, from_state: str, to_state: str, label: str):
         """Add a transition between states"""
         self.transitions.append((from_state, to_state, label))
         self._draw_transition(from_state, to_state, label)
+
+    def load_automaton(self, states, transitions):
+        """Replace the displayed automaton in one pass, without construction animation"""
+        self.clear()
+        for state in states:
+            if isinstance(state, tuple):
+                self._place_state(*state)
+            else:
+                self._place_state(state, False)
+        self.transitions.extend(transitions)
+        self.precompute_geometry()
+        self.redraw()
+
+    def state_for_token(self, token: Token) -> Optional[str]:
+        """Return the displayed state a token ends in, or None if it has none"""
+        type_name = token.type.value
+        state_id = self.token_type_to_state.get(type_name, type_name)
+        if state_id in self.states:
+            return state_id
+        return 'ERROR' if 'ERROR' in self.states else None
         
     def _create_gradient(self, color1, color2, steps):
         """Create a color gradient between two colors with caching"""
@@ -125,7 +178,7 @@ class DFAVisualizer:
     def _draw_state(self, state_id: str):
         """Draw a state on the canvas with a clean, minimal look"""
         x, y, radius, is_final = self.states[state_id]
-        base_color = self.colors['node'][state_id]
+        base_color = self.colors['node'].get(state_id, self.colors['node_default'])
         # Flat node (no shadow, no gradient)
         self.canvas.create_oval(
             x - radius, y - radius,
@@ -153,53 +206,34 @@ class DFAVisualizer:
                 x + radius - 6, y + radius - 6,
                 outline=self.colors['edge'], width=1, tags='final')
         
-    def _draw_transition(self, from_state: str, to_state: str, label: str):
-        """Draw a clean, precise, and visually appealing transition between states"""
-        x1, y1, r1, _ = self.states[from_state]
-        x2, y2, r2, _ = self.states[to_state]
-        edge_color = '#B0BEC5'  # Subtle, modern edge color
-        arrow_color = '#1976D2'  # Vibrant arrowhead
-        shadow_color = '#23272A'
-        arrow_width = 2.5
-        arrow_shape = (16, 22, 8)
-        if from_state != to_state:
+    def _edge_geometry(self, from_state: str, to_state: str):
+        """Return (points, shadow_points, label_x, label_y) for an edge, cached per endpoints"""
+        key = (self.states[from_state][:3], self.states[to_state][:3])
+        entry = self._geometry_cache.get((from_state, to_state))
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        geometry = self._compute_edge_geometry(*key[0], *key[1], from_state == to_state)
+        self._geometry_cache[(from_state, to_state)] = (key, geometry)
+        return geometry
+
+    @staticmethod
+    def _compute_edge_geometry(x1, y1, r1, x2, y2, r2, self_loop: bool):
+        """Compute the curve, its shadow and the label anchor for one edge"""
+        if not self_loop:
             # Calculate angle and start/end at node edge
             angle = math.atan2(y2 - y1, x2 - x1)
-            start_x = x1 + r1 * math.cos(angle)
-            start_y = y1 + r1 * math.sin(angle)
-            end_x = x2 - r2 * math.cos(angle)
-            end_y = y2 - r2 * math.sin(angle)
+            cos_a, sin_a = math.cos(angle), math.sin(angle)
+            start_x = x1 + r1 * cos_a
+            start_y = y1 + r1 * sin_a
+            end_x = x2 - r2 * cos_a
+            end_y = y2 - r2 * sin_a
             # Bezier control point for smooth curve
             ctrl_dist = 36
-            ctrl_x = (start_x + end_x) / 2 + ctrl_dist * math.sin(angle)
-            ctrl_y = (start_y + end_y) / 2 - ctrl_dist * math.cos(angle)
-            points = [start_x, start_y, ctrl_x, ctrl_y, end_x, end_y]
-            # Draw shadow for depth
-            self.canvas.create_line(
-                *[p + 1 if i % 2 else p for i, p in enumerate(points)],
-                fill=shadow_color, width=arrow_width + 2, smooth=True, arrow=tk.LAST,
-                arrowshape=arrow_shape, tags='edge_shadow')
-            # Draw main arrow
-            self.canvas.create_line(
-                *points,
-                fill=edge_color,
-                width=arrow_width,
-                smooth=True,
-                arrow=tk.LAST,
-                arrowshape=arrow_shape,
-                tags='edge')
-            # Draw arrowhead overlay for vibrancy
-            self.canvas.create_line(
-                *points,
-                fill=arrow_color,
-                width=1.2,
-                smooth=True,
-                arrow=tk.LAST,
-                arrowshape=(18, 26, 10),
-                tags='arrowhead')
+            ctrl_x = (start_x + end_x) / 2 + ctrl_dist * sin_a
+            ctrl_y = (start_y + end_y) / 2 - ctrl_dist * cos_a
             # Label
-            mid_x = (start_x + end_x) / 2 + 18 * math.sin(angle)
-            mid_y = (start_y + end_y) / 2 - 18 * math.cos(angle) - 10
+            mid_x = (start_x + end_x) / 2 + 18 * sin_a
+            mid_y = (start_y + end_y) / 2 - 18 * cos_a - 10
         else:
             # Self-loop
             angle = math.pi / 4
@@ -209,51 +243,131 @@ class DFAVisualizer:
             end_y = y1 - r1 * math.sin(angle * 3)
             ctrl_x = x1 + r1 * 1.7 * math.cos(angle)
             ctrl_y = y1 - r1 * 2.2
-            self.canvas.create_line(
-                start_x + 1, start_y + 1, ctrl_x + 1, ctrl_y + 1, end_x + 1, end_y + 1,
-                fill=shadow_color, width=arrow_width + 2, smooth=True, arrow=tk.LAST,
-                arrowshape=arrow_shape, tags='edge_shadow')
-            self.canvas.create_line(
-                start_x, start_y, ctrl_x, ctrl_y, end_x, end_y,
-                fill=edge_color, width=arrow_width, smooth=True, arrow=tk.LAST,
-                arrowshape=arrow_shape, tags='edge')
-            self.canvas.create_line(
-                start_x, start_y, ctrl_x, ctrl_y, end_x, end_y,
-                fill=arrow_color, width=1.2, smooth=True, arrow=tk.LAST,
-                arrowshape=(18, 26, 10), tags='arrowhead')
             mid_x = ctrl_x
             mid_y = ctrl_y - 10
-        # Label background (very subtle)
+        points = (start_x, start_y, ctrl_x, ctrl_y, end_x, end_y)
+        shadow = tuple(p + 1 for p in points) if self_loop else \
+            tuple(p + 1 if i % 2 else p for i, p in enumerate(points))
+        return points, shadow, mid_x, mid_y
+
+    def precompute_geometry(self):
+        """Fill the geometry cache for every edge at once, vectorized when NumPy is available"""
+        edges = [(a, b) for a, b, _ in self.transitions
+                 if a != b and (a, b) not in self._geometry_cache]
+        np = _numpy() if len(edges) >= 32 else None
+        if np is None:
+            for from_state, to_state, _ in self.transitions:
+                self._edge_geometry(from_state, to_state)
+            return
+        edges = list(dict.fromkeys(edges))
+        ends = np.array([self.states[a][:3] + self.states[b][:3] for a, b in edges], dtype=float)
+        x1, y1, r1, x2, y2, r2 = ends.T
+        angle = np.arctan2(y2 - y1, x2 - x1)
+        cos_a, sin_a = np.cos(angle), np.sin(angle)
+        start_x, start_y = x1 + r1 * cos_a, y1 + r1 * sin_a
+        end_x, end_y = x2 - r2 * cos_a, y2 - r2 * sin_a
+        mid_x, mid_y = (start_x + end_x) / 2, (start_y + end_y) / 2
+        points = np.stack([start_x, start_y, mid_x + 36 * sin_a, mid_y - 36 * cos_a,
+                           end_x, end_y], axis=1)
+        shadow = points + np.array([0, 1, 0, 1, 0, 1])
+        label_x, label_y = mid_x + 18 * sin_a, mid_y - 18 * cos_a - 10
+        for i, (a, b) in enumerate(edges):
+            key = (self.states[a][:3], self.states[b][:3])
+            self._geometry_cache[(a, b)] = (key, (tuple(points[i].tolist()),
+                                                  tuple(shadow[i].tolist()),
+                                                  float(label_x[i]), float(label_y[i])))
+        for from_state, to_state, _ in self.transitions:
+            if from_state == to_state:
+                self._edge_geometry(from_state, to_state)
+
+    def move_state(self, state_id: str, x: float, y: float):
+        """Move a state and drop the cached geometry of the edges touching it"""
+        _, _, radius, is_final = self.states[state_id]
+        self.states[state_id] = (x, y, radius, is_final)
+        for edge in [edge for edge in self._geometry_cache if state_id in edge]:
+            del self._geometry_cache[edge]
+
+    def _label_extent(self, label: str, text_item):
+        """Return the label's half width and half height, measured once per label"""
+        extent = self._label_extent_cache.get(label)
+        if extent is None:
+            bbox = self.canvas.bbox(text_item)
+            if not bbox:
+                return None
+            extent = ((bbox[2] - bbox[0]) / 2, (bbox[3] - bbox[1]) / 2)
+            self._label_extent_cache[label] = extent
+        return extent
+
+    def _draw_transition(self, from_state: str, to_state: str, label: str):
+        """Draw a clean, precise, and visually appealing transition between states"""
+        points, shadow, mid_x, mid_y = self._edge_geometry(from_state, to_state)
+        edge_color = '#B0BEC5'  # Subtle, modern edge color
+        arrow_color = '#1976D2'  # Vibrant arrowhead
+        shadow_color = '#23272A'
+        arrow_width = 2.5
+        arrow_shape = (16, 22, 8)
+        # Draw shadow for depth
+        self.canvas.create_line(
+            *shadow,
+            fill=shadow_color, width=arrow_width + 2, smooth=True, arrow=tk.LAST,
+            arrowshape=arrow_shape, tags='edge_shadow')
+        # Draw main arrow
+        self.canvas.create_line(
+            *points,
+            fill=edge_color,
+            width=arrow_width,
+            smooth=True,
+            arrow=tk.LAST,
+            arrowshape=arrow_shape,
+            tags='edge')
+        # Draw arrowhead overlay for vibrancy
+        self.canvas.create_line(
+            *points,
+            fill=arrow_color,
+            width=1.2,
+            smooth=True,
+            arrow=tk.LAST,
+            arrowshape=(18, 26, 10),
+            tags='arrowhead')
+        # Label with a very subtle background sized from the cached label extent
         text = self.canvas.create_text(
             mid_x, mid_y,
             text=label,
             fill='#23272A',
             font=('Segoe UI', 9, 'bold'),
             tags='edge_label')
-        bbox = self.canvas.bbox(text)
-        if bbox:
+        extent = self._label_extent(label, text)
+        if extent:
+            half_w, half_h = extent
             self.canvas.create_rectangle(
-                bbox[0] - 3, bbox[1] - 1,
-                bbox[2] + 3, bbox[3] + 1,
+                mid_x - half_w - 3, mid_y - half_h - 1,
+                mid_x + half_w + 3, mid_y + half_h + 1,
                 fill='#F3F3F3', outline='', tags='edge_label_bg')
             self.canvas.tag_raise(text)
             
+    def _span(self, name: str):
+        """Time a block when an instrumentation recorder is attached"""
+        if self.instrumentation is None:
+            return nullcontext()
+        return self.instrumentation.span(name, 'canvas')
+
     def redraw(self):
         """Redraw the entire visualization"""
-        # Clear the canvas
-        self.canvas.delete("all")
-        
-        # Redraw all states
-        for state_id in self.states:
-            self._draw_state(state_id)
-            
-        # Redraw all transitions
-        for from_state, to_state, label in self.transitions:
-            self._draw_transition(from_state, to_state, label)
+        with self._span('canvas draw'):
+            # Clear the canvas
+            self.canvas.delete("all")
             
-        # Highlight current state if any
-        if self.current_state:
-            self._highlight_state(self.current_state)
+            # Redraw all states
+            for state_id in self.states:
+                self._draw_state(state_id)
+                
+            # Redraw all transitions
+            for from_state, to_state, label in self.transitions:
+                self._draw_transition(from_state, to_state, label)
+                
+            # Highlight current state if any
+            if self.current_state:
+                self._highlight_state(self.current_state)
             
     def animate_token_flow(self, tokens: List[Token]):
         """Animate the flow of tokens through the DFA"""
@@ -277,10 +391,55 @@ class DFAVisualizer:
             return
             
         token = self.animation_queue.pop(0)
-        state_id = self.token_type_to_state.get(token.type.value, 'ERROR')
-        self._highlight_state(state_id)
+        state_id = self.state_for_token(token)
+        if state_id is not None:
+            with self._span('animation frame'):
+                self._highlight_state(state_id)
         self.canvas.after(int(self.animation_speed * 1000), self._process_next_token)
         
+    def replay_trace(self, trace: TransitionTrace, start: Optional[int] = None,
+                     steps_per_frame: Optional[int] = None, on_frame=None):
+        """Replay a recorded trace, batching steps so long traces stay bounded
+
+        Steps are per character, but their states are token-level: each token
+        moves START -> its type and loops there, so frames show which token
+        the scan is in rather than the states of the pattern matcher.
+        """
+        self.stop_trace()
+        start = trace.first_offset if start is None else min(max(start, trace.first_offset),
+                                                               trace.total)
+        if steps_per_frame is None:
+            remaining = trace.total - start
+            steps_per_frame = max(1, -(-remaining // self.max_trace_frames))
+        self._trace_frames = trace.frames(start, steps_per_frame)
+        self._trace_on_frame = on_frame
+        self._replay_next_frame()
+
+    def stop_trace(self):
+        """Cancel a running trace replay"""
+        if self._trace_job is not None:
+            self.canvas.after_cancel(self._trace_job)
+        self._trace_job = None
+        self._trace_frames = None
+
+    def _replay_next_frame(self):
+        """Show the state reached at the end of the next batch of trace steps"""
+        self._trace_job = None
+        frame = next(self._trace_frames, None) if self._trace_frames else None
+        if frame is None:
+            self._trace_frames = None
+            self.current_state = None
+            self.redraw()
+            return
+        offset, (_state, _char, next_state) = frame
+        state_id = self.token_type_to_state.get(next_state, next_state)
+        with self._span('animation frame'):
+            if state_id in self.states:
+                self._highlight_state(state_id)
+            if self._trace_on_frame:
+                self._trace_on_frame(offset)
+        self._trace_job = self.canvas.after(1000 // self.trace_frame_rate, self._replay_next_frame)
+        
     def _highlight_state(self, state_id: str):
         """Highlight a state with optimized animation effects"""
         if self.current_state:
@@ -329,12 +488,14 @@ class DFAVisualizer:
         
     def clear(self):
         """Clear the visualization"""
+        self.stop_trace()
         self.canvas.delete("all")
         self.states.clear()
         self.transitions.clear()
         self.current_state = None
         self.animation_queue.clear()
         self._gradient_cache.clear()
+        self._geometry_cache.clear()
 
     def animate_dfa_construction(self, states, transitions, on_complete=None, delay=350):
         """Animate DFA construction: add states and transitions step by step, then call on_complete."""
@@ -0,0 +1,135 @@
+"""
+Rendering service module for LexVi
+Runs Graphviz in the background and caches rendered output by content hash
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+class RenderError(Exception):
+    """Raised when the Graphviz ``dot`` process fails"""
+
+class RenderService:
+    """Renders DOT sources to image files on a worker pool with an on-disk cache"""
+
+    FORMATS = ('svg', 'png', 'pdf')
+
+    def __init__(self, cache_dir: Optional[str] = None, max_workers: int = 2,
+                 dot_command: str = 'dot'):
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'lexvi', 'render')
+        self.cache_dir = cache_dir
+        self.dot_command = dot_command
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='lexvi-render')
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def content_key(source: str, fmt: str) -> str:
+        """Return the cache key for a DOT source rendered to the given format"""
+        digest = hashlib.sha256()
+        digest.update(fmt.encode('ascii'))
+        digest.update(b'\0')
+        digest.update(source.encode('utf-8'))
+        return digest.hexdigest()
+
+    def cache_path(self, source: str, fmt: str = 'svg') -> str:
+        """Return the path the rendered output for this source is cached at"""
+        return os.path.join(self.cache_dir, f"{self.content_key(source, fmt)}.{fmt}")
+
+    def cached(self, source: str, fmt: str = 'svg') -> Optional[str]:
+        """Return the cached output path if this source was rendered before"""
+        path = self.cache_path(source, fmt)
+        return path if os.path.exists(path) else None
+
+    def submit(self, source: str, fmt: str = 'svg') -> Future:
+        """Render a DOT source without blocking; the future resolves to the output path"""
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unsupported render format: {fmt}")
+
+        path = self.cached(source, fmt)
+        if path is not None:
+            future = Future()
+            future.set_result(path)
+            return future
+
+        key = self.content_key(source, fmt)
+        with self._lock:
+            # Identical graphs requested concurrently share one dot process
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+            future = self._executor.submit(self._render, source, fmt)
+            self._pending[key] = future
+        # Outside the lock: a job that already finished runs the callback inline
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def render(self, source: str, fmt: str = 'svg', timeout: Optional[float] = None) -> str:
+        """Render a DOT source and wait for the output path"""
+        return self.submit(source, fmt).result(timeout)
+
+    def _forget(self, key: str, future: Future):
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def _render(self, source: str, fmt: str) -> str:
+        """Run dot in a worker thread and atomically move the output into the cache"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.cache_path(source, fmt)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=f'.{fmt}.tmp')
+        os.close(fd)
+        try:
+            result = subprocess.run(
+                [self.dot_command, f'-T{fmt}', '-o', tmp_path],
+                input=source.encode('utf-8'),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE)
+            if result.returncode != 0:
+                raise RenderError(result.stderr.decode('utf-8', 'replace').strip()
+                                  or f"{self.dot_command} exited with {result.returncode}")
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+    def export(self, source: str, filename: str, fmt: str = 'svg') -> Future:
+        """Render in the background and copy the cached output to ``filename.fmt``"""
+        target = f"{filename}.{fmt}"
+
+        def copy(path: str) -> str:
+            shutil.copyfile(path, target)
+            return target
+
+        result = Future()
+
+        def done(future: Future):
+            try:
+                result.set_result(copy(future.result()))
+            except Exception as e:
+                result.set_exception(e)
+
+        self.submit(source, fmt).add_done_callback(done)
+        return result
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pool"""
+        self._executor.shutdown(wait=wait)
+
+_default_service: Optional[RenderService] = None
+
+def get_render_service() -> RenderService:
+    """Return the process-wide render service, creating it on first use"""
+    global _default_service
+    if _default_service is None:
+        _default_service = RenderService()
+    return _default_service